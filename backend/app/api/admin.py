@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from app.database import get_db
 from app.dependencies import get_current_admin_user
@@ -9,6 +9,7 @@ from app.models.watchlist import Watchlist
 from app.models.portfolio import Portfolio
 from app.schemas.user import UserResponse
 from app.schemas.admin import AdminStats, UserStatusUpdate
+from app.services.auth_service import invalidate_principal
 
 router = APIRouter()
 
@@ -16,23 +17,27 @@ router = APIRouter()
 @router.get("/users", response_model=List[UserResponse])
 async def get_all_users(
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     skip: int = 0,
     limit: int = 100
 ):
-    users = db.query(User).offset(skip).limit(limit).all()
-    return users
+    result = await db.execute(select(User).order_by(User.id).offset(skip).limit(limit))
+    return result.scalars().all()
 
 
 @router.get("/stats", response_model=AdminStats)
 async def get_stats(
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    total_users = db.query(func.count(User.id)).scalar()
-    active_users = db.query(func.count(User.id)).filter(User.is_active == True).scalar()
-    total_watchlists = db.query(func.count(Watchlist.id)).scalar()
-    total_portfolios = db.query(func.count(Portfolio.id)).scalar()
+    # One round trip for all four counts
+    result = await db.execute(select(
+        select(func.count(User.id)).scalar_subquery(),
+        select(func.count(User.id)).where(User.is_active == True).scalar_subquery(),
+        select(func.count(Watchlist.id)).scalar_subquery(),
+        select(func.count(Portfolio.id)).scalar_subquery()
+    ))
+    total_users, active_users, total_watchlists, total_portfolios = result.one()
     
     return AdminStats(
         total_users=total_users,
@@ -47,7 +52,7 @@ async def update_user_status(
     user_id: int,
     status_update: UserStatusUpdate,
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     if user_id == current_user.id:
         raise HTTPException(
@@ -55,7 +60,7 @@ async def update_user_status(
             detail="Cannot modify your own status"
         )
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -67,7 +72,9 @@ async def update_user_status(
     if status_update.is_admin is not None:
         user.is_admin = status_update.is_admin
     
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
+    # Deactivation and role changes apply to the user's next request
+    invalidate_principal(user.id)
     return user
 
@@ -0,0 +1,140 @@
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from app.database import get_db
+from app.api.stream import close_stream, open_stream, sse_response
+from app.dependencies import get_current_user, get_stream_user
+from app.models.price_alert import PriceAlert
+from app.models.user import User
+from app.models.watchlist import Watchlist
+from app.schemas.alert import AlertNotification, PriceAlertCreate, PriceAlertResponse
+from app.services.alert_engine import (
+    subscribe_notifications, track_alert, unsubscribe_notifications, untrack_alert
+)
+
+router = APIRouter()
+
+MAX_NOTIFICATIONS = 100
+
+
+@router.get("", response_model=List[PriceAlertResponse])
+async def get_alerts(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    result = await db.scalars(select(PriceAlert).where(
+        PriceAlert.user_id == current_user.id
+    ).order_by(PriceAlert.created_at.desc()))
+    return result.all()
+
+
+@router.post("", response_model=PriceAlertResponse, status_code=status.HTTP_201_CREATED)
+async def create_alert(
+    alert_data: PriceAlertCreate,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    symbol = alert_data.stock_symbol.upper()
+    
+    # Alerts are set on watchlist symbols
+    result = await db.execute(select(Watchlist.id).where(
+        Watchlist.user_id == current_user.id,
+        Watchlist.stock_symbol == symbol
+    ))
+    on_watchlist = result.first()
+    if not on_watchlist:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Add the stock to your watchlist before setting an alert"
+        )
+    
+    alert = PriceAlert(
+        user_id=current_user.id,
+        stock_symbol=symbol,
+        direction=alert_data.direction,
+        threshold=alert_data.threshold,
+        is_active=True
+    )
+    db.add(alert)
+    await db.commit()
+    await db.refresh(alert)
+    
+    track_alert(alert)
+    return alert
+
+
+@router.delete("/{alert_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_alert(
+    alert_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    result = await db.execute(select(PriceAlert).where(
+        PriceAlert.id == alert_id,
+        PriceAlert.user_id == current_user.id
+    ))
+    alert = result.scalars().first()
+    
+    if not alert:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Alert not found"
+        )
+    
+    untrack_alert(alert.id)
+    await db.delete(alert)
+    await db.commit()
+    return None
+
+
+@router.get("/notifications", response_model=List[AlertNotification])
+async def get_notifications(
+    since: Optional[datetime] = Query(None, description="Only alerts triggered after this time"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Pollable feed of triggered alerts, oldest first"""
+    query = select(PriceAlert).where(
+        PriceAlert.user_id == current_user.id,
+        PriceAlert.triggered_at.isnot(None)
+    )
+    if since is not None:
+        query = query.where(PriceAlert.triggered_at > since)
+    
+    alerts = (await db.scalars(query.order_by(PriceAlert.triggered_at).limit(MAX_NOTIFICATIONS))).all()
+    return [
+        AlertNotification(
+            alert_id=alert.id,
+            stock_symbol=alert.stock_symbol,
+            direction=alert.direction,
+            threshold=alert.threshold,
+            triggered_price=alert.triggered_price,
+            triggered_at=alert.triggered_at
+        )
+        for alert in alerts
+    ]
+
+
+@router.get("/notifications/stream")
+async def stream_notifications(
+    request: Request,
+    current_user: User = Depends(get_stream_user)
+):
+    """Triggered alerts as Server-Sent Events while the client is connected.
+    
+    Authenticate with a bearer header or `?token=<JWT>` (EventSource cannot
+    set headers).
+    """
+    user_id = current_user.id
+    slot = open_stream(user_id)
+    if slot is None:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Too many open streams")
+    queue = subscribe_notifications(user_id)
+    
+    def close():
+        unsubscribe_notifications(user_id, queue)
+        close_stream(user_id, slot)
+    
+    return sse_response(request, queue, "alert", close)
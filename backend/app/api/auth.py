@@ -1,11 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 from app.database import get_db
 from app.dependencies import get_current_user
 from app.models.user import User
 from app.schemas.auth import UserCreate, UserLogin, Token, UserResponse, UserUpdate
-from app.services.auth_service import register_user, authenticate_user
+from app.services.auth_service import register_user, authenticate_user, get_user_by_id, invalidate_principal
 from app.utils.security import create_access_token
 from app.config import settings
 
@@ -13,14 +14,14 @@ router = APIRouter()
 
 
 @router.post("/signup", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def signup(user_data: UserCreate, db: Session = Depends(get_db)):
-    user = register_user(db, user_data)
+async def signup(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
+    user = await register_user(db, user_data)
     return user
 
 
 @router.post("/login", response_model=Token)
-async def login(credentials: UserLogin, db: Session = Depends(get_db)):
-    user = authenticate_user(db, credentials.email, credentials.password)
+async def login(credentials: UserLogin, db: AsyncSession = Depends(get_db)):
+    user = await authenticate_user(db, credentials.email, credentials.password)
     
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
@@ -40,24 +41,28 @@ async def get_current_user_info(current_user: User = Depends(get_current_user)):
 async def update_profile(
     user_update: UserUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
+    # current_user may come from the principal cache; modify the stored row
+    user = await get_user_by_id(db, current_user.id)
     if user_update.full_name:
-        current_user.full_name = user_update.full_name
+        user.full_name = user_update.full_name
     if user_update.email:
         # Check if email is already taken
-        existing = db.query(User).filter(
+        result = await db.execute(select(User).where(
             User.email == user_update.email,
-            User.id != current_user.id
-        ).first()
+            User.id != user.id
+        ))
+        existing = result.scalars().first()
         if existing:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email already in use"
             )
-        current_user.email = user_update.email
+        user.email = user_update.email
     
-    db.commit()
-    db.refresh(current_user)
-    return current_user
+    await db.commit()
+    await db.refresh(user)
+    invalidate_principal(user.id)
+    return user
 
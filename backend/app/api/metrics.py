@@ -0,0 +1,37 @@
+import hmac
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException, Response, status
+from prometheus_client import CONTENT_TYPE_LATEST
+from app.config import settings
+from app.database import async_engine, engine
+from app.services.market_data import get_yahoo_finance_blocked_until
+from app.utils.metrics import CIRCUIT_BREAKER_OPEN, latest_metrics, record_pool
+
+router = APIRouter()
+
+
+def _scrape_allowed(authorization: Optional[str]) -> bool:
+    token = settings.METRICS_TOKEN
+    if not token or not authorization:
+        return False
+    scheme, _, credentials = authorization.partition(" ")
+    return scheme.lower() == "bearer" and hmac.compare_digest(credentials.encode(), token.encode())
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics(authorization: Optional[str] = Header(None)):
+    """Prometheus scrape endpoint.
+
+    Disabled (404) unless METRICS_TOKEN is set, and then only served to
+    `Authorization: Bearer <METRICS_TOKEN>`.
+    """
+    if not _scrape_allowed(authorization):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    blocked_until = get_yahoo_finance_blocked_until()
+    CIRCUIT_BREAKER_OPEN.labels("yahoo").set(1 if blocked_until and blocked_until > datetime.now() else 0)
+    record_pool("async", async_engine.sync_engine)
+    record_pool("sync", engine)
+    
+    # Set as a header: media_type would append a second charset
+    return Response(content=latest_metrics(), headers={"Content-Type": CONTENT_TYPE_LATEST})
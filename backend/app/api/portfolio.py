@@ -1,88 +1,173 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from datetime import date
+import asyncio
+import io
+from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, Query, Request, Response, UploadFile, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from app.config import settings
 from app.database import get_db
 from app.dependencies import get_current_user
 from app.models.user import User
 from app.models.portfolio import Portfolio
-from app.schemas.portfolio import PortfolioCreate, PortfolioResponse, PortfolioItem
-from app.services.stock_service import get_real_time_price, get_stock_info
+from app.schemas.portfolio import PortfolioCreate, PortfolioResponse, PortfolioItem, PortfolioValuation, PortfolioHistory, PortfolioRisk, PortfolioImportResult
+from app.services.portfolio_service import (
+    value_portfolio,
+    portfolio_value_series,
+    get_portfolio_risk,
+    portfolio_version
+)
+from app.services.fx_service import CURRENCIES
+from app.services.portfolio_import import ImportFormatError, import_portfolio_csv
+from app.services.symbol_registry import INVALID, UNKNOWN, claim_verifications, lookup as lookup_symbol, verify_symbol
+from app.utils.http_cache import conditional_response, PRIVATE_REVALIDATE
 
 router = APIRouter()
 
 
+async def get_user_portfolio(db: AsyncSession, user_id: int) -> List[Portfolio]:
+    result = await db.scalars(select(Portfolio).where(Portfolio.user_id == user_id))
+    return result.all()
+
+
+def validate_base_currency(base_currency: Optional[str]) -> Optional[str]:
+    """Upper-cased base currency, or 400 if the FX table does not carry it"""
+    if not base_currency:
+        return None
+    base_currency = base_currency.upper()
+    if base_currency not in CURRENCIES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported base currency {base_currency}. Supported: {', '.join(CURRENCIES)}"
+        )
+    return base_currency
+
+
+async def validate_symbol(stock_symbol: str, background_tasks: BackgroundTasks) -> str:
+    """Normalized symbol for a portfolio write, or 400/404.
+
+    Checked against the local symbol registry (no upstream call; its Redis
+    reads run off the event loop); unknown symbols are accepted and verified
+    in the background.
+    """
+    symbol = stock_symbol.upper().strip()
+    
+    # Basic validation - check symbol format
+    if not symbol or len(symbol) < 1 or len(symbol) > 20:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid stock symbol format"
+        )
+    
+    symbol_status = await asyncio.to_thread(lookup_symbol, symbol)
+    if symbol_status == INVALID:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Stock not found"
+        )
+    if symbol_status == UNKNOWN:
+        for claimed in await asyncio.to_thread(claim_verifications, [symbol], 1):
+            background_tasks.add_task(verify_symbol, claimed)
+    return symbol
+
+
+async def _valuation_or_not_modified(
+    request: Request,
+    response: Response,
+    base_currency: Optional[str],
+    current_user: User,
+    db: AsyncSession
+):
+    """Valuation of the user's portfolio, or a 304 response for a matching ETag"""
+    base_currency = validate_base_currency(base_currency)
+    portfolio_items = await get_user_portfolio(db, current_user.id)
+    
+    # Quotes and FX rates are fetched with blocking calls
+    valuation = await asyncio.to_thread(value_portfolio, portfolio_items, base_currency)
+    
+    # Lots plus the per-symbol prices fully determine the valuation; the path
+    # keeps the list and full-valuation representations apart
+    version = (
+        request.url.path,
+        current_user.id,
+        portfolio_version(portfolio_items),
+        base_currency,
+        [(s["stock_symbol"], s["current_price"]) for s in valuation["symbols"]]
+    )
+    not_modified = conditional_response(request, response, version, PRIVATE_REVALIDATE)
+    if not_modified:
+        return not_modified
+    return valuation
+
+
 @router.get("", response_model=List[PortfolioItem])
 async def get_portfolio(
+    request: Request,
+    response: Response,
+    base_currency: Optional[str] = Query(None, min_length=3, max_length=3),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    portfolio_items = db.query(Portfolio).filter(
-        Portfolio.user_id == current_user.id
-    ).all()
-    
-    result = []
-    for item in portfolio_items:
-        try:
-            stock_info = get_stock_info(item.stock_symbol)
-            current_price = stock_info.current_price
-            stock_name = stock_info.name
-            total_cost = item.quantity * item.purchase_price
-            current_value = item.quantity * current_price
-            profit_loss = current_value - total_cost
-            profit_loss_percent = (profit_loss / total_cost * 100) if total_cost > 0 else 0
-            
-            result.append(PortfolioItem(
-                id=item.id,
-                stock_symbol=item.stock_symbol,
-                stock_name=stock_name,
-                quantity=item.quantity,
-                purchase_price=item.purchase_price,
-                purchase_date=item.purchase_date,
-                current_price=current_price,
-                total_cost=total_cost,
-                current_value=current_value,
-                profit_loss=profit_loss,
-                profit_loss_percent=profit_loss_percent
-            ))
-        except Exception:
-            result.append(PortfolioItem(
-                id=item.id,
-                stock_symbol=item.stock_symbol,
-                stock_name=None,
-                quantity=item.quantity,
-                purchase_price=item.purchase_price,
-                purchase_date=item.purchase_date
-            ))
+    """Valued lots; GET /portfolio/valuation adds per-symbol and overall totals"""
+    result = await _valuation_or_not_modified(request, response, base_currency, current_user, db)
+    if isinstance(result, Response):
+        return result
+    return result["positions"]
+
+
+@router.get("/valuation", response_model=PortfolioValuation)
+async def get_portfolio_valuation(
+    request: Request,
+    response: Response,
+    base_currency: Optional[str] = Query(None, min_length=3, max_length=3),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    return await _valuation_or_not_modified(request, response, base_currency, current_user, db)
+
+
+@router.get("/history", response_model=PortfolioHistory)
+async def get_portfolio_history(
+    period: str = Query("1y", regex="^(1mo|3mo|6mo|1y|2y|5y)$"),
+    base_currency: Optional[str] = Query(None, min_length=3, max_length=3),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    base_currency = validate_base_currency(base_currency)
+    portfolio_items = await get_user_portfolio(db, current_user.id)
     
-    return result
+    try:
+        return await asyncio.to_thread(portfolio_value_series, portfolio_items, period, base_currency)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/risk", response_model=PortfolioRisk)
+async def get_portfolio_risk_metrics(
+    benchmark: str = Query("^GSPC", min_length=1, max_length=20),
+    period: str = Query("1y", regex="^(3mo|6mo|1y|2y|5y)$"),
+    base_currency: Optional[str] = Query(None, min_length=3, max_length=3),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    base_currency = validate_base_currency(base_currency)
+    portfolio_items = await get_user_portfolio(db, current_user.id)
+    
+    try:
+        return await asyncio.to_thread(
+            get_portfolio_risk, current_user.id, portfolio_items, benchmark, period, base_currency
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("", response_model=PortfolioResponse, status_code=status.HTTP_201_CREATED)
 async def add_to_portfolio(
     portfolio_data: PortfolioCreate,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    symbol = portfolio_data.stock_symbol.upper().strip()
-    
-    # Basic validation - check symbol format
-    if not symbol or len(symbol) < 1 or len(symbol) > 20:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid stock symbol format"
-        )
-    
-    # Skip API validation - user already selected from search dropdown
-    # The search dropdown only shows valid stocks, so we can trust the input
-    # This also avoids issues with Yahoo Finance rate limiting
-    # 
-    # If you want to re-enable validation, uncomment the block below:
-    # try:
-    #     get_stock_info(symbol)
-    # except Exception as e:
-    #     print(f"Warning: Could not verify stock {symbol}: {e}")
-    #     # Proceed anyway since user selected from valid search
+    symbol = await validate_symbol(portfolio_data.stock_symbol, background_tasks)
     
     portfolio_item = Portfolio(
         user_id=current_user.id,
@@ -93,23 +178,55 @@ async def add_to_portfolio(
     )
     
     db.add(portfolio_item)
-    db.commit()
-    db.refresh(portfolio_item)
+    await db.commit()
+    await db.refresh(portfolio_item)
     
     return portfolio_item
 
 
+@router.post("/import", response_model=PortfolioImportResult)
+async def import_portfolio(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(..., description="CSV with symbol, quantity, price and date columns"),
+    current_user: User = Depends(get_current_user)
+):
+    """Bulk-add portfolio lots from a brokerage CSV export.
+
+    Valid rows are committed together; invalid rows are skipped and listed
+    in the error report.
+    """
+    # Decode the spooled upload lazily, line by line
+    lines = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        # Parsing is CPU-bound; the import writes through its own sync session
+        result = await asyncio.to_thread(import_portfolio_csv, current_user.id, lines)
+    except ImportFormatError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="The file must be UTF-8 encoded CSV")
+    finally:
+        lines.detach()
+    
+    # Bounded, and skipping symbols another request is already verifying
+    for symbol in await asyncio.to_thread(claim_verifications, result["unverified_symbols"], settings.IMPORT_VERIFY_LIMIT):
+        background_tasks.add_task(verify_symbol, symbol)
+    
+    return result
+
+
 @router.put("/{item_id}", response_model=PortfolioResponse)
 async def update_portfolio(
     item_id: int,
     portfolio_data: PortfolioCreate,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    portfolio_item = db.query(Portfolio).filter(
+    result = await db.execute(select(Portfolio).where(
         Portfolio.id == item_id,
         Portfolio.user_id == current_user.id
-    ).first()
+    ))
+    portfolio_item = result.scalars().first()
     
     if not portfolio_item:
         raise HTTPException(
@@ -117,13 +234,15 @@ async def update_portfolio(
             detail="Portfolio item not found"
         )
     
-    portfolio_item.stock_symbol = portfolio_data.stock_symbol.upper()
+    # Lots keep their symbol through edits even if it has since verified invalid
+    if portfolio_data.stock_symbol.upper().strip() != portfolio_item.stock_symbol:
+        portfolio_item.stock_symbol = await validate_symbol(portfolio_data.stock_symbol, background_tasks)
     portfolio_item.quantity = portfolio_data.quantity
     portfolio_item.purchase_price = portfolio_data.purchase_price
     portfolio_item.purchase_date = portfolio_data.purchase_date
     
-    db.commit()
-    db.refresh(portfolio_item)
+    await db.commit()
+    await db.refresh(portfolio_item)
     
     return portfolio_item
 
@@ -132,12 +251,13 @@ async def update_portfolio(
 async def remove_from_portfolio(
     item_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    portfolio_item = db.query(Portfolio).filter(
+    result = await db.execute(select(Portfolio).where(
         Portfolio.id == item_id,
         Portfolio.user_id == current_user.id
-    ).first()
+    ))
+    portfolio_item = result.scalars().first()
     
     if not portfolio_item:
         raise HTTPException(
@@ -145,7 +265,7 @@ async def remove_from_portfolio(
             detail="Portfolio item not found"
         )
     
-    db.delete(portfolio_item)
-    db.commit()
+    await db.delete(portfolio_item)
+    await db.commit()
     return None
 
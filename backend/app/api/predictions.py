@@ -1,18 +1,30 @@
-from fastapi import APIRouter, HTTPException, Query
+import asyncio
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 from typing import List, Dict
 from app.schemas.prediction import PredictionResponse, PredictionAccuracy
-from app.services.prediction_service import predict_stock_price, get_prediction_accuracy
+from app.services.prediction_service import MAX_PREDICTION_DAYS, predict_stock_price, get_prediction_accuracy
+from app.utils.http_cache import conditional_response, PUBLIC_LONG
 
 router = APIRouter()
 
 
 @router.get("/{symbol}", response_model=List[PredictionResponse])
 async def get_predictions(
+    request: Request,
+    response: Response,
     symbol: str,
-    days: int = Query(30, ge=7, le=90)
+    days: int = Query(30, ge=7, le=MAX_PREDICTION_DAYS)
 ):
     try:
-        predictions = predict_stock_price(symbol.upper(), days)
+        # Untracked symbols are fitted on demand, which takes seconds
+        predictions = await asyncio.to_thread(predict_stock_price, symbol.upper(), days)
+        
+        # A new forecast run changes the first and last predicted points
+        version = (symbol.upper(), days, predictions[0] if predictions else None, predictions[-1] if predictions else None)
+        not_modified = conditional_response(request, response, version, PUBLIC_LONG)
+        if not_modified:
+            return not_modified
+        
         return [
             PredictionResponse(
                 date=pred["date"],
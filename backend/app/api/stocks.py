@@ -1,13 +1,23 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 from typing import List
-from app.schemas.stock import StockInfo, StockSearchResult, StockHistory, CurrencyConversion, NewsItem
+from app.schemas.stock import (
+    StockInfo,
+    StockSearchResult,
+    StockHistory,
+    CurrencyConversion,
+    BatchCurrencyConversion,
+    BatchCurrencyConversionRequest,
+    NewsItem
+)
 from app.services.stock_service import (
     search_stocks,
     get_stock_info,
     get_stock_history,
     get_news,
-    convert_currency
+    convert_currency,
+    convert_currency_batch
 )
+from app.utils.http_cache import conditional_response, PUBLIC_SHORT
 
 router = APIRouter()
 
@@ -38,11 +48,20 @@ async def get_stock(symbol: str):
 
 @router.get("/{symbol}/history", response_model=StockHistory)
 async def get_history(
+    request: Request,
+    response: Response,
     symbol: str,
     period: str = Query("1mo", regex="^(1d|5d|1mo|3mo|6mo|1y|2y|5y)$")
 ):
     try:
         data = get_stock_history(symbol.upper(), period)
+        
+        # The cached series only changes when a new bar arrives or the last one updates
+        version = (symbol.upper(), period, len(data), data[0] if data else None, data[-1] if data else None)
+        not_modified = conditional_response(request, response, version, PUBLIC_SHORT)
+        if not_modified:
+            return not_modified
+        
         return StockHistory(symbol=symbol.upper(), period=period, data=data)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -66,6 +85,20 @@ async def convert_currency_endpoint(
     try:
         result = convert_currency(amount, from_currency.upper(), to_currency.upper())
         return CurrencyConversion(**result)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+
+@router.post("/convert/batch", response_model=BatchCurrencyConversion)
+async def convert_currency_batch_endpoint(request: BatchCurrencyConversionRequest):
+    try:
+        return convert_currency_batch(
+            [item.model_dump() for item in request.items],
+            request.to_currency.upper()
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,210 @@
+import asyncio
+import json
+from typing import Callable, Dict, List, Optional, Set
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.dependencies import authenticate_token, get_stream_user
+from app.models.user import User
+from app.services.quote_hub import SubscriptionLimitExceeded, quote_hub
+from app.services.symbol_registry import INVALID, UNKNOWN, claim_verifications, lookup_many, verify_symbol
+
+router = APIRouter()
+
+SSE_KEEPALIVE_SECONDS = 20
+
+# Seconds a WebSocket client has to send its auth message
+WS_AUTH_TIMEOUT_SECONDS = 10
+
+# Open stream connections (quotes and alert notifications) per user id, this process
+_connections: Dict[int, Set[object]] = {}
+
+
+def open_stream(user_id: int) -> Optional[object]:
+    """Reserve a stream slot for a user; None if they are at the limit"""
+    slots = _connections.setdefault(user_id, set())
+    if len(slots) >= settings.STREAM_MAX_CONNECTIONS:
+        return None
+    slot = object()
+    slots.add(slot)
+    return slot
+
+
+def close_stream(user_id: int, slot: object) -> None:
+    slots = _connections.get(user_id)
+    if slots is None:
+        return
+    slots.discard(slot)
+    if not slots:
+        del _connections[user_id]
+
+
+def sse_response(request: Request, queue: asyncio.Queue, event: str, close: Callable[[], None]) -> StreamingResponse:
+    """Server-Sent Events stream of the items put on `queue`, as `event` events.
+
+    Sends a keepalive comment after SSE_KEEPALIVE_SECONDS without items and
+    stops when the client disconnects. `close` releases the caller's stream
+    slot and subscription; it runs when the stream ends and again as a
+    background task (in case the client leaves before the first event), so it
+    must be idempotent.
+    """
+    async def events():
+        try:
+            while not await request.is_disconnected():
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                    yield f"event: {event}\ndata: {json.dumps(item)}\n\n"
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+        finally:
+            close()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(close)
+    )
+
+
+def _parse_symbols(symbols) -> list:
+    return [s.strip().upper() for s in symbols if isinstance(s, str) and s.strip()]
+
+
+async def _invalid_symbols(symbols: List[str]) -> List[str]:
+    """Symbols the registry knows to be invalid.
+
+    Unknown symbols are accepted, as POST /portfolio does, and a bounded
+    number of them is verified in the background; the hub stops refreshing
+    any that turn out invalid.
+    """
+    # Registry reads go to Redis, so they run off the event loop
+    statuses = await asyncio.to_thread(lookup_many, symbols)
+    invalid = sorted(symbol for symbol, symbol_status in statuses.items() if symbol_status == INVALID)
+    if invalid:
+        return invalid
+    unknown = [symbol for symbol, symbol_status in statuses.items() if symbol_status == UNKNOWN]
+    loop = asyncio.get_running_loop()
+    for symbol in await asyncio.to_thread(claim_verifications, unknown, settings.IMPORT_VERIFY_LIMIT):
+        loop.run_in_executor(None, verify_symbol, symbol)
+    return []
+
+
+async def _authenticate_ws(websocket: WebSocket) -> Optional[User]:
+    """User for a WebSocket: `?token=` or a first {"action": "auth", "token": ...} message"""
+    token = websocket.query_params.get("token")
+    if not token:
+        try:
+            message = await asyncio.wait_for(websocket.receive_json(), timeout=WS_AUTH_TIMEOUT_SECONDS)
+        except (asyncio.TimeoutError, json.JSONDecodeError):
+            return None
+        if isinstance(message, dict) and message.get("action") == "auth":
+            token = message.get("token")
+    if not isinstance(token, str):
+        return None
+
+    async with AsyncSessionLocal() as db:
+        try:
+            return await authenticate_token(token, db)
+        except HTTPException:
+            return None
+
+
+@router.websocket("/ws")
+async def stream_quotes_ws(websocket: WebSocket):
+    """Live quotes over WebSocket.
+
+    Authenticate with `?token=<JWT>` or a first message
+    {"action": "auth", "token": "<JWT>"}. Then send
+    {"action": "subscribe" | "unsubscribe", "symbols": [...]} and receive one
+    JSON quote message per changed quote. Invalid messages, subscriptions
+    with known-invalid symbols and subscriptions past the symbol limits get
+    an error message back, and nothing from them is subscribed.
+    """
+    await websocket.accept()
+    user = await _authenticate_ws(websocket)
+    if user is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Could not validate credentials")
+        return
+
+    slot = open_stream(user.id)
+    if slot is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Too many open streams")
+        return
+
+    queue = quote_hub.new_queue()
+
+    async def send_quotes():
+        while True:
+            quote = await queue.get()
+            await websocket.send_json({"type": "quote", "data": quote})
+
+    sender = asyncio.create_task(send_quotes())
+    try:
+        while True:
+            message = await websocket.receive_json()
+            if not isinstance(message, dict) or not isinstance(message.get("symbols"), list):
+                await websocket.send_json({"type": "error", "detail": 'Expected {"action": ..., "symbols": [...]}'})
+                continue
+            symbols = _parse_symbols(message["symbols"])
+            if message.get("action") == "unsubscribe":
+                quote_hub.unsubscribe(queue, symbols)
+                continue
+            invalid = await _invalid_symbols(symbols)
+            if invalid:
+                await websocket.send_json({"type": "error", "detail": f"Stock not found: {', '.join(invalid)}"})
+                continue
+            try:
+                quote_hub.subscribe(queue, symbols)
+            except SubscriptionLimitExceeded as e:
+                await websocket.send_json({"type": "error", "detail": str(e)})
+    except (WebSocketDisconnect, json.JSONDecodeError):
+        pass
+    finally:
+        sender.cancel()
+        quote_hub.unsubscribe(queue)
+        close_stream(user.id, slot)
+
+
+@router.get("/quotes")
+async def stream_quotes_sse(
+    request: Request,
+    symbols: str = Query(..., min_length=1),
+    current_user: User = Depends(get_stream_user)
+):
+    """Live quotes as Server-Sent Events for a comma-separated symbol list.
+
+    Authenticate with a bearer header or `?token=<JWT>`.
+    """
+    symbol_list = _parse_symbols(symbols.split(","))
+    if len(set(symbol_list)) > quote_hub.max_symbols:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {quote_hub.max_symbols} symbols per stream"
+        )
+    invalid = await _invalid_symbols(symbol_list)
+    if invalid:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Stock not found: {', '.join(invalid)}"
+        )
+
+    user_id = current_user.id
+    slot = open_stream(user_id)
+    if slot is None:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Too many open streams")
+
+    queue = quote_hub.new_queue()
+    try:
+        quote_hub.subscribe(queue, symbol_list)
+    except SubscriptionLimitExceeded as e:
+        close_stream(user_id, slot)
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+
+    def close():
+        quote_hub.unsubscribe(queue)
+        close_stream(user_id, slot)
+
+    return sse_response(request, queue, "quote", close)
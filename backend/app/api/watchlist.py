@@ -1,29 +1,88 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+import asyncio
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, Response, status
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
+from typing import List, Optional
 from app.database import get_db
 from app.dependencies import get_current_user
+from app.models.price_alert import PriceAlert
 from app.models.user import User
 from app.models.watchlist import Watchlist
 from app.schemas.watchlist import WatchlistCreate, WatchlistResponse, WatchlistItem
-from app.services.stock_service import get_real_time_price, get_stock_info
+from app.services.alert_engine import untrack_alert
+from app.services.cache_service import get_cache_many
+from app.services.portfolio_service import get_quotes
+from app.services.symbol_registry import (
+    INVALID,
+    UNKNOWN,
+    VALID,
+    claim_verifications,
+    lookup as lookup_symbol,
+    lookup_many as lookup_symbols,
+    verify_symbol
+)
+from app.utils.http_cache import conditional_response, PRIVATE_REVALIDATE
 
 router = APIRouter()
 
 
+def _watchlist_version(user_id: int, watchlist_items, quotes: List[Optional[dict]], statuses: List[str]):
+    """ETag version from the rows and the quote fields each item shows"""
+    return (user_id, [
+        (item.id, item.stock_symbol, item.added_at, item.notes, status,
+         quote and (quote.get("current_price"), quote.get("change"), quote.get("change_percent")))
+        for item, quote, status in zip(watchlist_items, quotes, statuses)
+    ])
+
+
 @router.get("", response_model=List[WatchlistItem])
 async def get_watchlist(
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    watchlist_items = db.query(Watchlist).filter(
+    watchlist_items = (await db.scalars(select(Watchlist).where(
         Watchlist.user_id == current_user.id
-    ).all()
+    ))).all()
+    
+    # Symbols that verified invalid after they were added are flagged, not
+    # quoted. Registry and cache reads go to Redis, so they run off the loop
+    statuses = await asyncio.to_thread(lookup_symbols, [item.stock_symbol for item in watchlist_items])
+    item_statuses = [statuses[item.stock_symbol.upper()] for item in watchlist_items]
+    
+    # When every quote is already cached the validator is known before any
+    # quote lookup, so an unchanged watchlist is answered with a bare 304
+    cached_quotes = await asyncio.to_thread(get_cache_many, [
+        f"stock_info:{item.stock_symbol.upper()}"
+        for item, symbol_status in zip(watchlist_items, item_statuses)
+        if symbol_status != INVALID
+    ])
+    if cached_quotes is not None and all(cached_quotes):
+        quotes = iter(cached_quotes)
+        version = _watchlist_version(
+            current_user.id,
+            watchlist_items,
+            [None if symbol_status == INVALID else next(quotes) for symbol_status in item_statuses],
+            [INVALID if symbol_status == INVALID else VALID for symbol_status in item_statuses]
+        )
+        not_modified = conditional_response(request, response, version, PRIVATE_REVALIDATE)
+        if not_modified:
+            return not_modified
+    
+    # Quote lookups block (retries, request spacing), so each unique symbol
+    # is priced once, concurrently, off the event loop
+    quotes = await asyncio.to_thread(get_quotes, sorted({
+        item.stock_symbol.upper()
+        for item, symbol_status in zip(watchlist_items, item_statuses)
+        if symbol_status != INVALID
+    }))
     
     result = []
-    for item in watchlist_items:
-        try:
-            stock_info = get_stock_info(item.stock_symbol)
+    for item, symbol_status in zip(watchlist_items, item_statuses):
+        stock_info = quotes.get(item.stock_symbol.upper())
+        if stock_info:
             result.append(WatchlistItem(
                 id=item.id,
                 stock_symbol=item.stock_symbol,
@@ -31,30 +90,44 @@ async def get_watchlist(
                 notes=item.notes,
                 current_price=stock_info.current_price,
                 change=stock_info.change,
-                change_percent=stock_info.change_percent
+                change_percent=stock_info.change_percent,
+                symbol_status=VALID
             ))
-        except Exception:
+        else:
             result.append(WatchlistItem(
                 id=item.id,
                 stock_symbol=item.stock_symbol,
                 added_at=item.added_at,
-                notes=item.notes
+                notes=item.notes,
+                symbol_status=symbol_status
             ))
     
+    version = _watchlist_version(
+        current_user.id,
+        watchlist_items,
+        [item.model_dump() if item.current_price is not None else None for item in result],
+        [item.symbol_status for item in result]
+    )
+    not_modified = conditional_response(request, response, version, PRIVATE_REVALIDATE)
+    if not_modified:
+        return not_modified
+    
     return result
 
 
 @router.post("", response_model=WatchlistResponse, status_code=status.HTTP_201_CREATED)
 async def add_to_watchlist(
     watchlist_data: WatchlistCreate,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     # Check if already in watchlist
-    existing = db.query(Watchlist).filter(
+    result = await db.execute(select(Watchlist.id).where(
         Watchlist.user_id == current_user.id,
         Watchlist.stock_symbol == watchlist_data.stock_symbol.upper()
-    ).first()
+    ))
+    existing = result.first()
     
     if existing:
         raise HTTPException(
@@ -62,14 +135,17 @@ async def add_to_watchlist(
             detail="Stock already in watchlist"
         )
     
-    # Verify stock exists
-    try:
-        get_stock_info(watchlist_data.stock_symbol.upper())
-    except Exception:
+    # Verify stock exists against the local registry; unknown symbols are
+    # accepted and checked upstream after the response is sent
+    symbol_status = await asyncio.to_thread(lookup_symbol, watchlist_data.stock_symbol)
+    if symbol_status == INVALID:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Stock not found"
         )
+    if symbol_status == UNKNOWN:
+        for claimed in await asyncio.to_thread(claim_verifications, [watchlist_data.stock_symbol], 1):
+            background_tasks.add_task(verify_symbol, claimed)
     
     watchlist_item = Watchlist(
         user_id=current_user.id,
@@ -78,8 +154,16 @@ async def add_to_watchlist(
     )
     
     db.add(watchlist_item)
-    db.commit()
-    db.refresh(watchlist_item)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Concurrent add of the same symbol hit the unique index
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Stock already in watchlist"
+        )
+    await db.refresh(watchlist_item)
     
     return watchlist_item
 
@@ -88,12 +172,13 @@ async def add_to_watchlist(
 async def remove_from_watchlist(
     item_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    watchlist_item = db.query(Watchlist).filter(
+    result = await db.execute(select(Watchlist).where(
         Watchlist.id == item_id,
         Watchlist.user_id == current_user.id
-    ).first()
+    ))
+    watchlist_item = result.scalars().first()
     
     if not watchlist_item:
         raise HTTPException(
@@ -101,7 +186,22 @@ async def remove_from_watchlist(
             detail="Watchlist item not found"
         )
     
-    db.delete(watchlist_item)
-    db.commit()
+    # Alerts are set on watchlist symbols, so the symbol's active alerts are
+    # retired with the entry; triggered ones stay in the user's history
+    alert_ids = (await db.scalars(select(PriceAlert.id).where(
+        PriceAlert.user_id == current_user.id,
+        PriceAlert.stock_symbol == watchlist_item.stock_symbol.upper(),
+        PriceAlert.is_active.is_(True)
+    ))).all()
+    if alert_ids:
+        await db.execute(update(PriceAlert).where(
+            PriceAlert.id.in_(alert_ids)
+        ).values(is_active=False))
+    
+    await db.delete(watchlist_item)
+    await db.commit()
+    
+    for alert_id in alert_ids:
+        untrack_alert(alert_id)
     return None
 
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import List
+from typing import List, Optional
 import os
 
 
@@ -7,6 +7,12 @@ class Settings(BaseSettings):
     # Database
     DATABASE_URL: str
     
+    # Async connection pool used by request handlers; size it to the number
+    # of requests a worker serves concurrently
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: int = 30
+    
     # Redis
     REDIS_URL: str = "redis://localhost:6379/0"
     
@@ -15,11 +21,81 @@ class Settings(BaseSettings):
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 1440
     
+    # Password hashing: bcrypt work factor, worker threads and how many
+    # hash/verify calls may wait before new ones are rejected with 503
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_QUEUE_LIMIT: int = 32
+    
     # API Keys
     ALPHA_VANTAGE_API_KEY: str = ""
     FINNHUB_API_KEY: str = ""
     EXCHANGE_RATE_API_KEY: str = ""
     
+    # Plan request limits used by provider routing (free tiers by default)
+    ALPHA_VANTAGE_REQUESTS_PER_DAY: int = 25
+    FINNHUB_REQUESTS_PER_MINUTE: int = 60
+    
+    # Shared request budget for all Yahoo Finance calls (per process)
+    YAHOO_REQUESTS_PER_MINUTE: int = 60
+    
+    # Annual risk-free rate used for Sharpe ratios
+    RISK_FREE_RATE: float = 0.04
+    
+    # Forecast pipeline
+    FORECAST_WORKERS: int = 2
+    
+    # Live quote streaming: seconds between bulk upstream refreshes of every
+    # streamed or alerted symbol (one Yahoo request per refresh)
+    QUOTE_REFRESH_SECONDS: int = 15
+    
+    # Per-connection symbol cap for quote streams, per-process cap on the
+    # symbols streams may have refreshed, and per-user cap on open quote and
+    # alert streams
+    QUOTE_STREAM_MAX_SYMBOLS: int = 50
+    QUOTE_HUB_MAX_SYMBOLS: int = 200
+    STREAM_MAX_CONNECTIONS: int = 5
+    
+    # FX rate table refresh interval, and the shorter one used while any
+    # rate is a built-in fallback because the providers failed
+    FX_REFRESH_SECONDS: int = 3600
+    FX_FALLBACK_REFRESH_SECONDS: int = 60
+    
+    # Optional CSV of known-valid symbols used to seed the symbol registry
+    SYMBOL_MASTER_PATH: str = ""
+    
+    # Seconds a symbol verified as invalid stays rejected before it is checked again
+    SYMBOL_INVALID_TTL_SECONDS: int = 86400
+    
+    # Unknown symbols verified upstream per portfolio import or stream
+    # subscription; the rest are checked lazily
+    IMPORT_VERIFY_LIMIT: int = 20
+    
+    # Bearer token Prometheus must send to scrape /metrics; "" disables the
+    # endpoint, since it exposes routes, pool state and circuit breakers
+    METRICS_TOKEN: str = ""
+    
+    # Responses smaller than this many bytes are sent uncompressed
+    GZIP_MINIMUM_SIZE: int = 1024
+    GZIP_COMPRESS_LEVEL: int = 6
+    
+    # Request traces: "" (off), "log", or a collector URL that accepts JSON
+    # POSTs; only requests slower than TRACE_EXPORT_MIN_MS are exported
+    TRACE_EXPORT: str = ""
+    TRACE_EXPORT_MIN_MS: float = 0
+    
+    # Finish startup (database, Redis, symbol registry, alerts) before
+    # serving requests; by default it runs in the background and /ready
+    # reports when it is done
+    STARTUP_BLOCKING: bool = False
+    
+    # Upstream cassettes: "record" saves every provider response (with its
+    # latency) to CASSETTE_DIR, "replay" serves them without network access.
+    # Replays use the recorded latency unless CASSETTE_LATENCY_MS is set.
+    CASSETTE_MODE: str = ""
+    CASSETTE_DIR: str = "cassettes"
+    CASSETTE_LATENCY_MS: Optional[float] = None
+    
     # CORS
     CORS_ORIGINS: str = "http://localhost:5173,http://localhost:3000"
     
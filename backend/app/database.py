@@ -1,7 +1,9 @@
 from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.config import settings
+from app.utils.tracing import instrument_engine
 import urllib.parse
 
 # Parse database URL and handle MySQL
@@ -48,15 +50,57 @@ except Exception as e:
     print(f"✗ Database URL format: {database_url[:60]}...")
     raise
 
+# Async drivers for the same databases, used by request handlers
+ASYNC_DRIVERS = {
+    "mysql+pymysql": "mysql+aiomysql",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def to_async_url(url: str) -> str:
+    scheme, sep, rest = url.partition("://")
+    return ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+
+try:
+    async_database_url = to_async_url(database_url)
+    async_engine_args = {}
+    if not async_database_url.startswith("sqlite"):
+        async_engine_args = {
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_timeout": settings.DB_POOL_TIMEOUT,
+            "connect_args": connect_args,
+        }
+    async_engine = create_async_engine(
+        async_database_url,
+        pool_pre_ping=True,
+        pool_recycle=3600,
+        echo=False,
+        **async_engine_args
+    )
+except Exception as e:
+    print(f"✗ Error creating async database engine: {e}")
+    raise
+
+# Queries show up as `db` spans in request traces
+instrument_engine(engine, "sync")
+instrument_engine(async_engine.sync_engine, "async")
+
+# Synchronous sessions for background work (forecast pipeline, alert and
+# prediction writers) and startup tasks
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Request handlers use async sessions so queries never block the event loop.
+# Objects stay usable after commit; relationships must be loaded explicitly.
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
@@ -1,23 +1,43 @@
-from fastapi import Depends, HTTPException, status
+import asyncio
+from typing import Optional
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_db
 from app.models.user import User
+from app.services.auth_service import cache_principal, get_cached_principal
 from app.utils.security import decode_token
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login", auto_error=False)
 
 
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> User:
+    return await authenticate_token(token, db)
+
+
+async def get_stream_user(
+    header_token: Optional[str] = Depends(optional_oauth2_scheme),
+    token: Optional[str] = Query(None, description="JWT, for clients (EventSource) that cannot set headers"),
+    db: AsyncSession = Depends(get_db)
+) -> User:
+    return await authenticate_token(header_token or token, db)
+
+
+async def authenticate_token(token: Optional[str], db: AsyncSession) -> User:
+    """Active user for a bearer token; raises 401/403 HTTPException otherwise"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     
+    if not token:
+        raise credentials_exception
+    
     payload = decode_token(token)
     if payload is None:
         raise credentials_exception
@@ -32,9 +52,15 @@ async def get_current_user(
     except (ValueError, TypeError):
         raise credentials_exception
     
-    user = db.query(User).filter(User.id == user_id).first()
+    # The version is read before the database so that a concurrent
+    # invalidation makes this request's cache write stale. Every request
+    # authenticates, so the Redis round trips run off the event loop
+    user, principal_version = await asyncio.to_thread(get_cached_principal, user_id)
     if user is None:
-        raise credentials_exception
+        user = await db.get(User, user_id)
+        if user is None:
+            raise credentials_exception
+        await asyncio.to_thread(cache_principal, user, principal_version)
     
     if not user.is_active:
         raise HTTPException(
@@ -1,11 +1,23 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from app.config import settings
-from app.database import engine, Base
-from app.api import auth, stocks, watchlist, portfolio, predictions, admin
+from app.database import async_engine, engine, Base
+from app.migrations import run_migrations
+from app.api import auth, stocks, watchlist, portfolio, predictions, admin, stream, alerts, metrics
+from app.services.alert_engine import start_alert_engine, stop_alert_engine
+from app.services.cache_service import init_redis
+from app.services.quote_hub import quote_hub
+from app.services.symbol_registry import load_symbol_master
+from app.utils.compression import SelectiveGZipMiddleware
+from app.utils.metrics import MetricsMiddleware, mark_process_dead
+from app.utils.tracing import TracingMiddleware
 
 # Import all models to ensure they're registered with Base
-from app.models import User, Watchlist, Portfolio, Prediction
+from app.models import User, Watchlist, Portfolio, Prediction, PredictionMetric, PriceAlert
 
 # Create database tables (with error handling)
 def create_tables():
@@ -21,6 +33,9 @@ def create_tables():
         # Create all tables
         Base.metadata.create_all(bind=engine)
         print("✓ Database tables created successfully!")
+        
+        # Bring existing tables up to date with the models
+        run_migrations(engine)
         return True
     except Exception as e:
         print(f"✗ Error creating database tables: {e}")
@@ -30,13 +45,102 @@ def create_tables():
         traceback.print_exc()
         return False
 
-# Create tables on startup
-create_tables()
+
+# Seconds between attempts to reach the database while it is unavailable
+DATABASE_RETRY_SECONDS = (2, 5, 15, 30, 60)
+
+# Longest a blocking startup waits before serving anyway
+STARTUP_BLOCKING_TIMEOUT = 60
+
+
+def warm_imports():
+    """Import the market-data client ahead of the first request that needs it"""
+    from app.services.market_data import _yfinance
+    _yfinance()
+
+
+async def initialize(app: FastAPI):
+    """Connect dependencies and load startup data.
+    
+    The database and Redis are reached concurrently; nothing here runs at
+    import time, so a slow dependency delays readiness, not the process.
+    """
+    state = app.state.startup
+    started = time.perf_counter()
+    
+    database_ok, redis_client = await asyncio.gather(
+        asyncio.to_thread(create_tables),
+        asyncio.to_thread(init_redis)
+    )
+    state["redis"] = redis_client is not None
+    
+    attempt = 0
+    while not database_ok:
+        await asyncio.sleep(DATABASE_RETRY_SECONDS[min(attempt, len(DATABASE_RETRY_SECONDS) - 1)])
+        attempt += 1
+        database_ok = await asyncio.to_thread(create_tables)
+    state["database"] = True
+    
+    try:
+        await asyncio.to_thread(load_symbol_master)
+        state["symbols"] = True
+    except Exception as e:
+        print(f"✗ Error loading symbol master: {e}")
+    
+    try:
+        start_alert_engine()
+        state["alerts"] = True
+    except Exception as e:
+        print(f"✗ Error loading price alerts: {e}")
+    
+    state["ready"] = True
+    state["startup_seconds"] = round(time.perf_counter() - started, 3)
+    print(f"✓ Startup completed in {state['startup_seconds']:.2f}s")
+    
+    # Not needed for readiness; keeps the import off the first quote request
+    try:
+        await asyncio.to_thread(warm_imports)
+    except Exception as e:
+        print(f"✗ Error importing market data client: {e}")
+
+
+def new_startup_state() -> dict:
+    """Readiness flags filled in by initialize() and reported by /ready"""
+    return {
+        "ready": False,
+        "database": False,
+        "redis": False,
+        "symbols": False,
+        "alerts": False,
+        "startup_seconds": None
+    }
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.startup = new_startup_state()
+    init_task = asyncio.create_task(initialize(app))
+    if settings.STARTUP_BLOCKING:
+        # Bounded, so an unreachable database cannot hang the worker forever
+        await asyncio.wait([init_task], timeout=STARTUP_BLOCKING_TIMEOUT)
+    
+    yield
+    
+    init_task.cancel()
+    await asyncio.gather(init_task, return_exceptions=True)
+    await stop_alert_engine()
+    await quote_hub.close()
+    await async_engine.dispose()
+    mark_process_dead()
+
 
 app = FastAPI(
     title="Stock Analysis & Prediction API",
     description="Backend API for stock analysis and prediction platform",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    # orjson renders large history/prediction payloads several times faster
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
@@ -47,8 +151,21 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Trace-Id", "Server-Timing"],
 )
 
+# Compress large JSON bodies (5y histories, predictions); event streams are left alone
+app.add_middleware(
+    SelectiveGZipMiddleware,
+    minimum_size=settings.GZIP_MINIMUM_SIZE,
+    compresslevel=settings.GZIP_COMPRESS_LEVEL,
+    exclude_paths=("/stream/", "/alerts/notifications/stream")
+)
+
+# Outermost, so latency includes compression and CORS handling
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware)
+
 # Include routers
 app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 app.include_router(stocks.router, prefix="/stocks", tags=["Stocks"])
@@ -56,6 +173,9 @@ app.include_router(watchlist.router, prefix="/watchlist", tags=["Watchlist"])
 app.include_router(portfolio.router, prefix="/portfolio", tags=["Portfolio"])
 app.include_router(predictions.router, prefix="/predictions", tags=["Predictions"])
 app.include_router(admin.router, prefix="/admin", tags=["Admin"])
+app.include_router(stream.router, prefix="/stream", tags=["Streaming"])
+app.include_router(alerts.router, prefix="/alerts", tags=["Alerts"])
+app.include_router(metrics.router, tags=["Monitoring"])
 
 
 @app.get("/")
@@ -67,3 +187,11 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 200 once the database is reachable and startup data is loaded"""
+    state = dict(getattr(app.state, "startup", {"ready": False}))
+    if not state["ready"]:
+        return ORJSONResponse(status_code=503, content={"status": "starting", **state})
+    return {"status": "ready", **state}
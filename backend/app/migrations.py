@@ -0,0 +1,130 @@
+"""
+Schema migrations.
+
+`Base.metadata.create_all` creates missing tables (with their indexes) but
+never changes existing ones. Each migration below brings an existing
+database up to the current models; applied versions are recorded in
+`schema_migrations` so every migration runs once. Migrations must be safe
+on a freshly created schema, where they are effectively no-ops.
+
+Every worker runs this at startup. On MySQL a named lock serializes them,
+so one worker applies a migration while the others wait and then find it
+recorded.
+
+Add new migrations to the end of MIGRATIONS; never reorder or rename them.
+"""
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Iterator, List, Tuple
+from sqlalchemy import Column, DateTime, MetaData, String, Table, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from app.models import Portfolio, Prediction, Watchlist
+
+_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    _metadata,
+    Column("version", String(64), primary_key=True),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def add_missing_columns(conn: Connection, table: Table) -> List[str]:
+    """Add nullable model columns that are missing from an existing table"""
+    inspector = inspect(conn)
+    if not inspector.has_table(table.name):
+        return []
+
+    existing = {column["name"] for column in inspector.get_columns(table.name)}
+    added = []
+    for column in table.columns:
+        if column.name in existing or not column.nullable:
+            continue
+        column_type = column.type.compile(dialect=conn.dialect)
+        conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+        added.append(column.name)
+    return added
+
+
+def create_missing_indexes(conn: Connection, table: Table) -> List[str]:
+    """Create the model's declared indexes that the table does not have yet"""
+    existing = {index["name"] for index in inspect(conn).get_indexes(table.name)}
+    created = []
+    for index in table.indexes:
+        if index.name not in existing:
+            index.create(conn)
+            created.append(index.name)
+    return created
+
+
+def _0001_prediction_runs(conn: Connection) -> None:
+    # run_id, training_cutoff and interval bounds for versioned forecasts
+    add_missing_columns(conn, Prediction.__table__)
+
+
+def _0002_hot_table_indexes(conn: Connection) -> None:
+    # Keep the oldest row of any duplicate watchlist entries so the unique
+    # (user_id, stock_symbol) index can be built
+    conn.execute(text(
+        "DELETE FROM watchlist WHERE id NOT IN ("
+        "SELECT keep_id FROM ("
+        "SELECT MIN(id) AS keep_id FROM watchlist GROUP BY user_id, stock_symbol"
+        ") AS keep)"
+    ))
+    for table in (Watchlist.__table__, Portfolio.__table__, Prediction.__table__):
+        create_missing_indexes(conn, table)
+
+
+MIGRATIONS: List[Tuple[str, Callable[[Connection], None]]] = [
+    ("0001_prediction_runs", _0001_prediction_runs),
+    ("0002_hot_table_indexes", _0002_hot_table_indexes),
+]
+
+
+MIGRATION_LOCK = "schema_migrations"
+MIGRATION_LOCK_TIMEOUT = 300  # seconds; index builds on large tables are slow
+
+
+@contextmanager
+def _migration_lock(engine: Engine) -> Iterator[None]:
+    """Hold a server-wide named lock while migrating (MySQL only)
+
+    GET_LOCK belongs to the session, so it is taken and released on one
+    connection kept open for the whole run. SQLite needs no lock: its
+    writers are already serialized on the database file.
+    """
+    if engine.dialect.name != "mysql":
+        yield
+        return
+    with engine.connect() as conn:
+        acquired = conn.execute(
+            text("SELECT GET_LOCK(:name, :timeout)"),
+            {"name": MIGRATION_LOCK, "timeout": MIGRATION_LOCK_TIMEOUT}
+        ).scalar()
+        if acquired != 1:
+            raise RuntimeError(f"Timed out waiting for the {MIGRATION_LOCK} lock held by another worker")
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": MIGRATION_LOCK})
+
+
+def run_migrations(engine: Engine) -> List[str]:
+    """Apply pending migrations in order; returns the versions applied"""
+    newly_applied = []
+    with _migration_lock(engine):
+        schema_migrations.create(engine, checkfirst=True)
+        # Read under the lock: a worker that waited sees what the holder applied
+        with engine.connect() as conn:
+            applied = set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+        for version, migrate in MIGRATIONS:
+            if version in applied:
+                continue
+            # One transaction per migration (DDL auto-commits on MySQL)
+            with engine.begin() as conn:
+                migrate(conn)
+                conn.execute(schema_migrations.insert().values(version=version, applied_at=datetime.utcnow()))
+            newly_applied.append(version)
+            print(f"✓ Applied migration {version}")
+    return newly_applied
@@ -2,6 +2,7 @@ from app.models.user import User
 from app.models.watchlist import Watchlist
 from app.models.portfolio import Portfolio
 from app.models.prediction import Prediction
+from app.models.prediction_metric import PredictionMetric
+from app.models.price_alert import PriceAlert
 
-__all__ = ["User", "Watchlist", "Portfolio", "Prediction"]
-
+__all__ = ["User", "Watchlist", "Portfolio", "Prediction", "PredictionMetric", "PriceAlert"]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Date
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Date, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -6,6 +6,9 @@ from app.database import Base
 
 class Portfolio(Base):
     __tablename__ = "portfolio"
+    __table_args__ = (
+        Index("ix_portfolio_user_symbol", "user_id", "stock_symbol"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
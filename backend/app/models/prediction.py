@@ -1,15 +1,23 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Date
+from sqlalchemy import Column, Integer, String, Float, DateTime, Date, Index
 from sqlalchemy.sql import func
 from app.database import Base
 
 
 class Prediction(Base):
     __tablename__ = "predictions"
+    __table_args__ = (
+        Index("ix_predictions_symbol_date", "stock_symbol", "predicted_date"),
+        # Latest-run lookups and incremental accuracy scoring
+        Index("ix_predictions_symbol_run_date", "stock_symbol", "run_id", "predicted_date"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     stock_symbol = Column(String(20), nullable=False, index=True)
+    run_id = Column(String(36), nullable=True, index=True)
+    training_cutoff = Column(Date, nullable=True)
     predicted_date = Column(Date, nullable=False)
     predicted_price = Column(Float, nullable=False)
+    lower_bound = Column(Float, nullable=True)
+    upper_bound = Column(Float, nullable=True)
     confidence = Column(Float, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-
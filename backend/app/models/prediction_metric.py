@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, Date, UniqueConstraint
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class PredictionMetric(Base):
+    __tablename__ = "prediction_metrics"
+    __table_args__ = (
+        UniqueConstraint("stock_symbol", "run_id", name="uq_prediction_metrics_symbol_run"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    stock_symbol = Column(String(20), nullable=False, index=True)
+    run_id = Column(String(36), nullable=False)
+    samples = Column(Integer, nullable=False, default=0)
+    # Running sums so new actual prices can be folded in incrementally
+    sum_abs_pct_error = Column(Float, nullable=False, default=0.0)
+    sum_squared_error = Column(Float, nullable=False, default=0.0)
+    covered = Column(Integer, nullable=False, default=0)
+    mape = Column(Float, nullable=True)
+    rmse = Column(Float, nullable=True)
+    coverage = Column(Float, nullable=True)
+    last_actual_date = Column(Date, nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Index
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from app.database import Base
+
+
+class PriceAlert(Base):
+    __tablename__ = "price_alerts"
+    __table_args__ = (
+        # Startup loads every active alert; users list and poll their own
+        Index("ix_price_alerts_active_symbol", "is_active", "stock_symbol"),
+        Index("ix_price_alerts_user_triggered", "user_id", "triggered_at"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    stock_symbol = Column(String(20), nullable=False)
+    direction = Column(String(5), nullable=False)  # "above" or "below"
+    threshold = Column(Float, nullable=False)
+    is_active = Column(Boolean, nullable=False, default=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    triggered_at = Column(DateTime(timezone=True), nullable=True)
+    triggered_price = Column(Float, nullable=True)
+    
+    user = relationship("User", backref="price_alerts")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -6,6 +6,10 @@ from app.database import Base
 
 class Watchlist(Base):
     __tablename__ = "watchlist"
+    __table_args__ = (
+        # Every query filters on user_id; add_to_watchlist also on the symbol
+        Index("uq_watchlist_user_symbol", "user_id", "stock_symbol", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -0,0 +1,32 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import Literal, Optional
+
+
+class PriceAlertCreate(BaseModel):
+    stock_symbol: str
+    direction: Literal["above", "below"]
+    threshold: float = Field(..., gt=0)
+
+
+class PriceAlertResponse(BaseModel):
+    id: int
+    stock_symbol: str
+    direction: str
+    threshold: float
+    is_active: bool
+    created_at: datetime
+    triggered_at: Optional[datetime] = None
+    triggered_price: Optional[float] = None
+    
+    class Config:
+        from_attributes = True
+
+
+class AlertNotification(BaseModel):
+    alert_id: int
+    stock_symbol: str
+    direction: str
+    threshold: float
+    triggered_price: float
+    triggered_at: datetime
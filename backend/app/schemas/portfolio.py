@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import date
-from typing import Optional
+from typing import Dict, List, Optional
 
 
 class PortfolioCreate(BaseModel):
@@ -25,12 +25,95 @@ class PortfolioItem(BaseModel):
     id: int
     stock_symbol: str
     stock_name: Optional[str] = None
+    currency: Optional[str] = None
     quantity: float
-    purchase_price: float
+    purchase_price: Optional[float] = None
     purchase_date: date
     current_price: Optional[float] = None
     total_cost: Optional[float] = None
     current_value: Optional[float] = None
     profit_loss: Optional[float] = None
     profit_loss_percent: Optional[float] = None
+    symbol_status: Optional[str] = None
+
+
+
+class PortfolioSymbolSummary(BaseModel):
+    stock_symbol: str
+    stock_name: Optional[str] = None
+    currency: Optional[str] = None
+    lots: int
+    quantity: float
+    average_cost: float
+    current_price: Optional[float] = None
+    total_cost: float
+    current_value: Optional[float] = None
+    profit_loss: Optional[float] = None
+    profit_loss_percent: Optional[float] = None
+    symbol_status: Optional[str] = None
+
+
+class PortfolioTotals(BaseModel):
+    currency: Optional[str] = None
+    positions: int
+    symbols: int
+    priced_symbols: int
+    total_cost: float
+    current_value: float
+    profit_loss: float
+    profit_loss_percent: float
+
+
+class PortfolioValuation(BaseModel):
+    positions: List[PortfolioItem]
+    symbols: List[PortfolioSymbolSummary]
+    totals: PortfolioTotals
+
+
+class PortfolioHistoryPoint(BaseModel):
+    date: str
+    value: float
+    cost_basis: float
+
+
+class PortfolioHistory(BaseModel):
+    period: str
+    currency: Optional[str] = None
+    points: List[PortfolioHistoryPoint]
+    missing_symbols: List[str] = []
+
+
+class CorrelationMatrix(BaseModel):
+    symbols: List[str]
+    matrix: List[List[float]]
+
+
+class PortfolioRisk(BaseModel):
+    period: str
+    benchmark: str
+    currency: Optional[str] = None
+    observations: int
+    annual_return: Optional[float] = None
+    volatility: Optional[float] = None
+    beta: Optional[float] = None
+    sharpe_ratio: Optional[float] = None
+    max_drawdown: Optional[float] = None
+    value_at_risk_95: Optional[float] = None
+    value_at_risk_95_amount: Optional[float] = None
+    weights: Dict[str, float] = {}
+    correlation: CorrelationMatrix
+    missing_symbols: List[str] = []
+
+
+class PortfolioImportError(BaseModel):
+    row: int
+    stock_symbol: Optional[str] = None
+    error: str
+
 
+class PortfolioImportResult(BaseModel):
+    imported: int
+    failed: int
+    errors: List[PortfolioImportError]
+    errors_truncated: bool = False
+    unverified_symbols: List[str] = []
@@ -12,6 +12,8 @@ class PredictionResponse(BaseModel):
 class PredictionAccuracy(BaseModel):
     accuracy: float
     mape: Optional[float] = None
+    rmse: Optional[float] = None
+    coverage: Optional[float] = None
     samples: Optional[int] = None
+    runs: Optional[int] = None
     message: Optional[str] = None
-
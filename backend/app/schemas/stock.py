@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List, Dict
 from datetime import datetime
 
@@ -35,6 +35,29 @@ class CurrencyConversion(BaseModel):
     exchange_rate: float
 
 
+class CurrencyAmount(BaseModel):
+    amount: float
+    from_currency: str = Field(..., min_length=3, max_length=3)
+
+
+class BatchCurrencyConversionRequest(BaseModel):
+    to_currency: str = Field(..., min_length=3, max_length=3)
+    items: List[CurrencyAmount]
+
+
+class ConvertedAmount(BaseModel):
+    amount: float
+    from_currency: str
+    exchange_rate: float
+    converted_amount: float
+
+
+class BatchCurrencyConversion(BaseModel):
+    to_currency: str
+    items: List[ConvertedAmount]
+    total: float
+
+
 class NewsItem(BaseModel):
     headline: str
     summary: Optional[str] = None
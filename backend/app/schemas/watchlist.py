@@ -26,4 +26,6 @@ class WatchlistItem(BaseModel):
     current_price: Optional[float] = None
     change: Optional[float] = None
     change_percent: Optional[float] = None
+    # "valid", "unknown" (not verified yet) or "invalid" (verified to have no data)
+    symbol_status: Optional[str] = None
 
@@ -0,0 +1,448 @@
+"""
+Price-alert evaluation.
+
+Active alerts are kept in memory in two sorted lists per symbol. Every
+changed quote from the quote hub finds its triggered alerts with one binary
+search per list, O(log n + k) for k triggered alerts, instead of checking
+every alert on every tick. "above" thresholds are stored negated so that in
+both lists the triggered alerts form a suffix, which is cut off without
+shifting the rest of the list.
+
+One worker evaluates alerts: the one holding the LEADER_KEY lease in Redis.
+It loads the active alerts when it takes the lease and is the only one
+pinning their symbols in its quote hub, so refresh cost does not grow with
+the number of workers. The others take over when the lease expires. New and
+deleted alerts, and triggered-alert notifications, are published on
+EVENTS_CHANNEL: the evaluating worker applies alert changes made through any
+worker, and every worker delivers notifications to its own streams. Without
+Redis each worker evaluates and notifies on its own.
+
+The evaluator's book may still hold an alert deleted (or already fired)
+elsewhere. Before notifying, each triggered alert is marked in the database
+only if its row is still active, and only those alerts are delivered.
+"""
+import asyncio
+import json
+import threading
+import uuid
+from bisect import bisect_left, insort
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+from sqlalchemy import update
+from app.database import SessionLocal
+from app.models.price_alert import PriceAlert
+from app.services.cache_service import get_redis
+from app.services.quote_hub import quote_hub
+
+ABOVE = "above"
+BELOW = "below"
+
+NOTIFICATION_QUEUE_SIZE = 100
+
+LEADER_KEY = "alerts:leader"
+EVENTS_CHANNEL = "alerts:events"
+
+# The lease outlives a few missed renewals, and a dead leader is replaced
+# within LEADER_TTL_SECONDS
+LEADER_TTL_SECONDS = 30
+LEADER_RENEW_SECONDS = 10
+
+# Extend or release the lease only if this worker still holds it
+_RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('expire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+@dataclass(frozen=True)
+class Alert:
+    id: int
+    user_id: int
+    symbol: str
+    direction: str
+    threshold: float
+
+
+class AlertBook:
+    """Active alerts indexed by symbol and threshold"""
+
+    def __init__(self):
+        # symbol -> sorted [(key, alert_id)], key = -threshold for ABOVE, threshold for BELOW
+        self._above: Dict[str, List[Tuple[float, int]]] = {}
+        self._below: Dict[str, List[Tuple[float, int]]] = {}
+        self._alerts: Dict[int, Alert] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._alerts)
+
+    @staticmethod
+    def _entry(alert: Alert) -> Tuple[float, int]:
+        key = -alert.threshold if alert.direction == ABOVE else alert.threshold
+        return (key, alert.id)
+
+    def _side(self, direction: str) -> Dict[str, List[Tuple[float, int]]]:
+        return self._above if direction == ABOVE else self._below
+
+    def add(self, alert: Alert) -> None:
+        with self._lock:
+            if alert.id in self._alerts:
+                return
+            self._alerts[alert.id] = alert
+            insort(self._side(alert.direction).setdefault(alert.symbol, []), self._entry(alert))
+
+    def remove(self, alert_id: int) -> Optional[Alert]:
+        with self._lock:
+            alert = self._alerts.pop(alert_id, None)
+            if alert is None:
+                return None
+            side = self._side(alert.direction)
+            entries = side[alert.symbol]
+            entry = self._entry(alert)
+            index = bisect_left(entries, entry)
+            if index < len(entries) and entries[index] == entry:
+                del entries[index]
+            if not entries:
+                del side[alert.symbol]
+            return alert
+
+    def clear(self) -> None:
+        with self._lock:
+            self._above.clear()
+            self._below.clear()
+            self._alerts.clear()
+
+    def has_symbol(self, symbol: str) -> bool:
+        return symbol in self._above or symbol in self._below
+
+    def symbols(self) -> Set[str]:
+        with self._lock:
+            return set(self._above) | set(self._below)
+
+    def pop_triggered(self, symbol: str, price: float) -> List[Alert]:
+        """Remove and return the alerts of `symbol` crossed by `price`"""
+        triggered = []
+        with self._lock:
+            # ABOVE fires when threshold <= price, i.e. -threshold >= -price;
+            # BELOW fires when threshold >= price
+            for side, key in ((self._above, -price), (self._below, price)):
+                entries = side.get(symbol)
+                if not entries:
+                    continue
+                index = bisect_left(entries, (key, float("-inf")))
+                if index == len(entries):
+                    continue
+                triggered.extend(self._alerts.pop(alert_id) for _, alert_id in entries[index:])
+                del entries[index:]
+                if not entries:
+                    del side[symbol]
+        return triggered
+
+
+alert_book = AlertBook()
+
+# user_id -> notification queues of connected streams
+_subscribers: Dict[int, Set[asyncio.Queue]] = {}
+
+# Single writer so trigger bookkeeping never blocks the quote fan-out
+_persist_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="alert-writer")
+
+_worker_id = uuid.uuid4().hex
+_is_leader = False
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_leader_task: Optional[asyncio.Task] = None
+
+# Whether the event listener is subscribed, and the signal that stops it
+_listening = threading.Event()
+_stopping = threading.Event()
+
+
+def _to_alert(row: PriceAlert) -> Alert:
+    return Alert(
+        id=row.id,
+        user_id=row.user_id,
+        symbol=row.stock_symbol.upper(),
+        direction=row.direction,
+        threshold=row.threshold
+    )
+
+
+def start_alert_engine() -> None:
+    """Start listening for alert events and competing for the evaluator lease.
+
+    Must run inside the event loop (the quote hub refresher and the lease
+    keeper are asyncio tasks). Alerts are loaded once this worker holds the
+    lease.
+    """
+    global _loop, _leader_task
+    _loop = asyncio.get_running_loop()
+    _stopping.clear()
+    quote_hub.add_listener(evaluate_quote)
+    threading.Thread(target=_listen, name="alert-events", daemon=True).start()
+    _leader_task = asyncio.create_task(_lead())
+
+
+async def stop_alert_engine() -> None:
+    """Stop evaluating and hand the lease to another worker right away"""
+    global _leader_task, _is_leader
+    _stopping.set()
+    task, _leader_task = _leader_task, None
+    if task:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+    if _is_leader:
+        _is_leader = False
+        await asyncio.to_thread(_release_lease)
+
+
+def _hold_lease() -> bool:
+    """Take or renew the evaluator lease; True while this worker holds it.
+
+    Without Redis there is nothing to coordinate with, so every worker
+    evaluates. A Redis error keeps the current role rather than flapping.
+    """
+    client = get_redis()
+    if client is None:
+        return True
+    try:
+        if client.eval(_RENEW_SCRIPT, 1, LEADER_KEY, _worker_id, LEADER_TTL_SECONDS):
+            return True
+        return bool(client.set(LEADER_KEY, _worker_id, nx=True, ex=LEADER_TTL_SECONDS))
+    except Exception as e:
+        print(f"✗ Alert lease error: {e}")
+        return _is_leader
+
+
+def _release_lease() -> None:
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        client.eval(_RELEASE_SCRIPT, 1, LEADER_KEY, _worker_id)
+    except Exception as e:
+        print(f"✗ Alert lease error: {e}")
+
+
+def _load_active_alerts() -> List[Alert]:
+    db = SessionLocal()
+    try:
+        rows = db.query(PriceAlert).filter(PriceAlert.is_active.is_(True)).all()
+        return [_to_alert(row) for row in rows]
+    finally:
+        db.close()
+
+
+async def _lead() -> None:
+    """Keep the evaluator lease, loading the alert book on taking it and
+    dropping it on losing it"""
+    global _is_leader
+    while True:
+        try:
+            leading = await asyncio.to_thread(_hold_lease)
+            if leading and not _is_leader:
+                # Set first, so alerts created during the load are tracked too
+                _is_leader = True
+                try:
+                    alerts = await asyncio.to_thread(_load_active_alerts)
+                except Exception:
+                    _is_leader = False
+                    _drop_book()
+                    raise
+                for alert in alerts:
+                    _track(alert)
+                print(f"✓ Evaluating {len(alert_book)} price alerts on this worker")
+            elif not leading and _is_leader:
+                _is_leader = False
+                _drop_book()
+                print("✓ Price alerts handed over to another worker")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"✗ Error loading price alerts: {e}")
+        await asyncio.sleep(LEADER_RENEW_SECONDS)
+
+
+def _drop_book() -> None:
+    for symbol in alert_book.symbols():
+        quote_hub.unpin(symbol)
+    alert_book.clear()
+
+
+def _listen() -> None:
+    """Hand events published by any worker to this worker's event loop"""
+    while not _stopping.is_set():
+        client = get_redis()
+        if client is None:
+            _stopping.wait(LEADER_RENEW_SECONDS)
+            continue
+        pubsub = None
+        try:
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(EVENTS_CHANNEL)
+            _listening.set()
+            while not _stopping.is_set():
+                message = pubsub.get_message(timeout=1.0)
+                if message and message.get("type") == "message":
+                    _loop.call_soon_threadsafe(_handle_event, json.loads(message["data"]))
+        except Exception as e:
+            print(f"✗ Alert event subscription error: {e}")
+            _stopping.wait(1)
+        finally:
+            _listening.clear()
+            if pubsub is not None:
+                pubsub.close()
+
+
+def _publish(event: Dict) -> None:
+    """Send an event to every worker; handled here alone without Redis.
+
+    Safe to call from any thread.
+    """
+    if _loop is None:
+        return
+    client = get_redis()
+    if client is not None and _listening.is_set():
+        try:
+            client.publish(EVENTS_CHANNEL, json.dumps(event))
+            return
+        except Exception as e:
+            print(f"✗ Error publishing alert event: {e}")
+    _loop.call_soon_threadsafe(_handle_event, event)
+
+
+def _handle_event(event: Dict) -> None:
+    kind = event.get("type")
+    if kind == "notify":
+        _notify(event["user_id"], event["notification"])
+    elif not _is_leader:
+        return
+    elif kind == "track":
+        _track(Alert(**event["alert"]))
+    elif kind == "untrack":
+        _untrack(event["alert_id"])
+
+
+def track_alert(row: PriceAlert) -> None:
+    """Start evaluating a newly created alert"""
+    _publish({"type": "track", "alert": asdict(_to_alert(row))})
+
+
+def untrack_alert(alert_id: int) -> None:
+    _publish({"type": "untrack", "alert_id": alert_id})
+
+
+def _track(alert: Alert) -> None:
+    alert_book.add(alert)
+    quote_hub.pin(alert.symbol)
+
+    # The quote may already be past the threshold and not change again soon
+    latest = quote_hub.latest(alert.symbol)
+    if latest:
+        evaluate_quote(alert.symbol, latest)
+
+
+def _untrack(alert_id: int) -> None:
+    alert = alert_book.remove(alert_id)
+    if alert and not alert_book.has_symbol(alert.symbol):
+        quote_hub.unpin(alert.symbol)
+
+
+def evaluate_quote(symbol: str, quote: Dict) -> None:
+    """Quote hub listener: fire every alert the new price has crossed"""
+    price = quote.get("current_price")
+    if price is None:
+        return
+
+    triggered = alert_book.pop_triggered(symbol, price)
+    if not triggered:
+        return
+
+    triggered_at = datetime.utcnow()
+    notifications = [
+        {
+            "alert_id": alert.id,
+            "stock_symbol": alert.symbol,
+            "direction": alert.direction,
+            "threshold": alert.threshold,
+            "triggered_price": price,
+            "triggered_at": triggered_at.isoformat()
+        }
+        for alert in triggered
+    ]
+    _persist_executor.submit(_fire, [alert.user_id for alert in triggered], notifications)
+
+    if not alert_book.has_symbol(symbol):
+        quote_hub.unpin(symbol)
+
+
+def _mark_triggered(notifications: List[Dict]) -> List[bool]:
+    """Deactivate the alerts' rows; False for rows already gone or inactive"""
+    db = SessionLocal()
+    try:
+        marked = []
+        for n in notifications:
+            result = db.execute(
+                update(PriceAlert)
+                .where(PriceAlert.id == n["alert_id"], PriceAlert.is_active.is_(True))
+                .values(
+                    is_active=False,
+                    triggered_price=n["triggered_price"],
+                    triggered_at=datetime.fromisoformat(n["triggered_at"])
+                )
+            )
+            marked.append(result.rowcount == 1)
+        db.commit()
+        return marked
+    except Exception as e:
+        db.rollback()
+        print(f"✗ Error saving triggered alerts: {e}")
+        return [False] * len(notifications)
+    finally:
+        db.close()
+
+
+def _fire(user_ids: List[int], notifications: List[Dict]) -> None:
+    """Persist triggered alerts, then notify every worker for those whose row was still active"""
+    for user_id, notification, marked in zip(user_ids, notifications, _mark_triggered(notifications)):
+        if marked:
+            _publish({"type": "notify", "user_id": user_id, "notification": notification})
+
+
+def _notify(user_id: int, notification: Dict) -> None:
+    for queue in list(_subscribers.get(user_id, ())):
+        _offer(queue, notification)
+
+
+def _offer(queue: asyncio.Queue, notification: Dict) -> None:
+    # Slow consumers lose their oldest notification rather than blocking quotes
+    if queue.full():
+        try:
+            queue.get_nowait()
+        except asyncio.QueueEmpty:
+            pass
+    queue.put_nowait(notification)
+
+
+def subscribe_notifications(user_id: int) -> asyncio.Queue:
+    queue = asyncio.Queue(maxsize=NOTIFICATION_QUEUE_SIZE)
+    _subscribers.setdefault(user_id, set()).add(queue)
+    return queue
+
+
+def unsubscribe_notifications(user_id: int, queue: asyncio.Queue) -> None:
+    queues = _subscribers.get(user_id)
+    if queues is None:
+        return
+    queues.discard(queue)
+    if not queues:
+        del _subscribers[user_id]
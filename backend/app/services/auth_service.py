@@ -1,12 +1,93 @@
-from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status
 from app.models.user import User
+from app.services.cache_service import delete_cache, get_cache_many, increment, set_cache
 from app.schemas.auth import UserCreate
-from app.utils.security import hash_password, verify_password
+from app.utils.security import (
+    PasswordHasherBusy, hash_password_async, needs_rehash, verify_password_async
+)
 from app.utils.validators import validate_email, validate_password
 
 
-def register_user(db: Session, user_data: UserCreate) -> User:
+# Authenticated users are cached briefly so most requests skip the users
+# query; status and profile changes invalidate the entry immediately
+PRINCIPAL_CACHE_TTL = 60
+
+# Each invalidation bumps the user's principal version. Entries carry the
+# version read before the user was loaded, so an entry written by a request
+# that loaded the user before an invalidation is never served after it. The
+# counter only has to outlive the entries.
+PRINCIPAL_VERSION_TTL = 86400
+
+
+def principal_cache_key(user_id: int) -> str:
+    return f"principal:{user_id}"
+
+
+def principal_version_key(user_id: int) -> str:
+    return f"principal_version:{user_id}"
+
+
+def cache_principal(user: User, version: int) -> None:
+    """Cache a user loaded after reading `version` from get_cached_principal"""
+    # Never cache the password hash
+    set_cache(principal_cache_key(user.id), {
+        "version": version,
+        "id": user.id,
+        "email": user.email,
+        "full_name": user.full_name,
+        "is_active": user.is_active,
+        "is_admin": user.is_admin,
+        "created_at": user.created_at.isoformat() if user.created_at else None
+    }, PRINCIPAL_CACHE_TTL)
+
+
+def get_cached_principal(user_id: int) -> Tuple[Optional[User], int]:
+    """Detached User built from the principal cache (None on a miss or an
+    invalidated entry), and the principal version to cache a reload with.
+
+    The instance is not attached to any session; load the user from the
+    database before modifying it.
+    """
+    values = get_cache_many([principal_cache_key(user_id), principal_version_key(user_id)])
+    if values is None:
+        return None, 0
+    cached, version = values[0], values[1] or 0
+    if not cached or cached.get("version") != version:
+        return None, version
+    created_at = cached.get("created_at")
+    return User(
+        id=cached["id"],
+        email=cached["email"],
+        full_name=cached["full_name"],
+        is_active=cached["is_active"],
+        is_admin=cached["is_admin"],
+        created_at=datetime.fromisoformat(created_at) if created_at else None
+    ), version
+
+
+def invalidate_principal(user_id: int) -> None:
+    increment(principal_version_key(user_id), PRINCIPAL_VERSION_TTL)
+    delete_cache(principal_cache_key(user_id))
+
+
+def _hasher_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server is busy, please try again",
+        headers={"Retry-After": "1"}
+    )
+
+
+async def get_user_by_email(db: AsyncSession, email: str) -> User:
+    result = await db.execute(select(User).where(User.email == email))
+    return result.scalars().first()
+
+
+async def register_user(db: AsyncSession, user_data: UserCreate) -> User:
     # Validate email
     if not validate_email(user_data.email):
         raise HTTPException(
@@ -23,7 +104,7 @@ def register_user(db: Session, user_data: UserCreate) -> User:
         )
     
     # Check if user exists
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
+    existing_user = await get_user_by_email(db, user_data.email)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -31,7 +112,10 @@ def register_user(db: Session, user_data: UserCreate) -> User:
         )
     
     # Create new user
-    hashed_password = hash_password(user_data.password)
+    try:
+        hashed_password = await hash_password_async(user_data.password)
+    except PasswordHasherBusy:
+        raise _hasher_busy()
     db_user = User(
         email=user_data.email,
         hashed_password=hashed_password,
@@ -41,21 +125,25 @@ def register_user(db: Session, user_data: UserCreate) -> User:
     )
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     
     return db_user
 
 
-def authenticate_user(db: Session, email: str, password: str) -> User:
-    user = db.query(User).filter(User.email == email).first()
+async def authenticate_user(db: AsyncSession, email: str, password: str) -> User:
+    user = await get_user_by_email(db, email)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
         )
     
-    if not verify_password(password, user.hashed_password):
+    try:
+        password_ok = await verify_password_async(password, user.hashed_password)
+    except PasswordHasherBusy:
+        raise _hasher_busy()
+    if not password_ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
@@ -67,11 +155,19 @@ def authenticate_user(db: Session, email: str, password: str) -> User:
             detail="User account is inactive"
         )
     
+    # Upgrade hashes made with an older work factor while we have the password
+    if needs_rehash(user.hashed_password):
+        try:
+            user.hashed_password = await hash_password_async(password)
+            await db.commit()
+        except PasswordHasherBusy:
+            pass  # try again on a later login
+    
     return user
 
 
-def get_user_by_id(db: Session, user_id: int) -> User:
-    user = db.query(User).filter(User.id == user_id).first()
+async def get_user_by_id(db: AsyncSession, user_id: int) -> User:
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
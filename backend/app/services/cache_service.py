@@ -1,13 +1,22 @@
 import redis
 import json
-from typing import Optional, Any
+import threading
+import time
+from typing import Optional, Any, List
 from app.config import settings
+from app.utils.metrics import record_cache_lookup
+from app.utils.tracing import span
 
 redis_client = None
 
+# After a failed connection attempt, cache calls skip Redis for this long
+REDIS_RETRY_SECONDS = 60
+_next_connect_attempt = 0.0
+_connect_lock = threading.Lock()
+
 def init_redis():
     """Initialize Redis connection with proper TLS handling for Upstash"""
-    global redis_client
+    global redis_client, _next_connect_attempt
     
     if redis_client is not None:
         return redis_client
@@ -41,63 +50,163 @@ def init_redis():
         print(f"✗ Redis connection failed: Connection error - {str(e)}")
         print("  → Caching will be disabled. This is optional and won't affect app functionality.")
         redis_client = None
+        _next_connect_attempt = time.monotonic() + REDIS_RETRY_SECONDS
         return None
     except redis.TimeoutError as e:
         print(f"✗ Redis connection failed: Timeout - {str(e)}")
         print("  → Caching will be disabled. This is optional and won't affect app functionality.")
         redis_client = None
+        _next_connect_attempt = time.monotonic() + REDIS_RETRY_SECONDS
         return None
     except Exception as e:
         print(f"✗ Redis connection failed: {str(e)}")
         print("  → Caching will be disabled. This is optional and won't affect app functionality.")
         print("  → Tip: Check your REDIS_URL in .env file. Use 'rediss://' (with double s) for TLS.")
         redis_client = None
+        _next_connect_attempt = time.monotonic() + REDIS_RETRY_SECONDS
         return None
 
-# Initialize Redis on module import
-redis_client = init_redis()
+
+def get_redis():
+    """Redis client, connecting on first use instead of at import time.
+
+    Returns None while Redis is unavailable; reconnection is attempted at
+    most every REDIS_RETRY_SECONDS so cache calls fail fast meanwhile.
+    """
+    if redis_client is not None:
+        return redis_client
+    if time.monotonic() < _next_connect_attempt:
+        return None
+    with _connect_lock:
+        if redis_client is None and time.monotonic() >= _next_connect_attempt:
+            init_redis()
+    return redis_client
 
 
 def get_cache(key: str) -> Optional[Any]:
-    if redis_client is None:
+    client = get_redis()
+    if client is None:
+        record_cache_lookup(key, "unavailable")
         return None
     try:
-        value = redis_client.get(key)
+        with span("cache.get", "cache", key=key):
+            value = client.get(key)
         if value:
+            record_cache_lookup(key, "hit")
             return json.loads(value)
+        record_cache_lookup(key, "miss")
     except Exception:
-        pass
+        record_cache_lookup(key, "unavailable")
     return None
 
 
 def set_cache(key: str, value: Any, ttl: int = 900) -> bool:
-    if redis_client is None:
+    client = get_redis()
+    if client is None:
         return False
     try:
-        redis_client.setex(key, ttl, json.dumps(value))
+        payload = json.dumps(value)
+        with span("cache.set", "cache", key=key, bytes=len(payload)):
+            client.setex(key, ttl, payload)
         return True
     except Exception:
         return False
 
 
-def delete_cache(key: str) -> bool:
-    if redis_client is None:
+def delete_cache(*keys: str) -> bool:
+    client = get_redis()
+    if client is None or not keys:
         return False
     try:
-        redis_client.delete(key)
+        client.delete(*keys)
         return True
     except Exception:
         return False
 
 
+def increment(key: str, ttl: int) -> Optional[int]:
+    """Add one to a counter and reset its TTL; None when the cache is unavailable"""
+    client = get_redis()
+    if client is None:
+        return None
+    try:
+        pipe = client.pipeline()
+        pipe.incr(key)
+        pipe.expire(key, ttl)
+        return int(pipe.execute()[0])
+    except Exception:
+        return None
+
+
+def get_cache_many(keys: List[str]) -> Optional[List[Optional[Any]]]:
+    """get_cache for many keys in one round trip, or None when the cache is unavailable"""
+    client = get_redis()
+    if client is None or not keys:
+        return None
+    try:
+        with span("cache.mget", "cache", keys=len(keys)):
+            values = client.mget(keys)
+    except Exception:
+        for key in keys:
+            record_cache_lookup(key, "unavailable")
+        return None
+    for key, value in zip(keys, values):
+        record_cache_lookup(key, "hit" if value else "miss")
+    return [json.loads(value) if value else None for value in values]
+
+
 def delete_cache_pattern(pattern: str) -> bool:
-    if redis_client is None:
+    client = get_redis()
+    if client is None:
         return False
     try:
-        keys = redis_client.keys(pattern)
+        keys = client.keys(pattern)
         if keys:
-            redis_client.delete(*keys)
+            client.delete(*keys)
         return True
     except Exception:
         return False
 
+
+def add_to_set(key: str, *members: str) -> bool:
+    client = get_redis()
+    if client is None or not members:
+        return False
+    try:
+        client.sadd(key, *members)
+        return True
+    except Exception:
+        return False
+
+
+def remove_from_set(key: str, *members: str) -> bool:
+    client = get_redis()
+    if client is None or not members:
+        return False
+    try:
+        client.srem(key, *members)
+        return True
+    except Exception:
+        return False
+
+
+def is_set_member(key: str, member: str) -> Optional[bool]:
+    """Set membership, or None when the cache is unavailable"""
+    client = get_redis()
+    if client is None:
+        return None
+    try:
+        return bool(client.sismember(key, member))
+    except Exception:
+        return None
+
+
+def are_set_members(key: str, members: List[str]) -> Optional[List[bool]]:
+    """Membership of many members in one round trip, or None when the cache is unavailable"""
+    client = get_redis()
+    if client is None or not members:
+        return None
+    try:
+        return [bool(flag) for flag in client.smismember(key, members)]
+    except Exception:
+        return None
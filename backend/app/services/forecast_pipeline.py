@@ -0,0 +1,109 @@
+"""
+Nightly batch forecast pipeline.
+
+Runs after market close over every distinct symbol that appears in a
+watchlist or portfolio: history is loaded through the market data repository
+(cache first, then one bulk request for the rest), Prophet
+fits run in parallel worker processes, and the results are written to the
+prediction cache and the predictions table so interactive reads are lookups.
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List
+import pandas as pd
+from sqlalchemy import union
+from app.config import settings
+from app.database import SessionLocal
+from app.models.watchlist import Watchlist
+from app.models.portfolio import Portfolio
+from app.services.cache_service import set_cache
+from app.services.market_data import get_history_frames
+from app.services.forecasters import fit_forecast, history_to_prophet_frame
+from app.services.prediction_service import (
+    FORECAST_HORIZON_DAYS,
+    PREDICTION_CACHE_TTL,
+    prediction_cache_key,
+    save_prediction_run,
+    update_prediction_metrics,
+)
+
+
+def get_tracked_symbols() -> List[str]:
+    """Distinct symbols across all watchlists and portfolios"""
+    db = SessionLocal()
+    try:
+        query = union(
+            db.query(Watchlist.stock_symbol).statement,
+            db.query(Portfolio.stock_symbol).statement,
+        )
+        symbols = {row[0].upper() for row in db.execute(query) if row[0]}
+        return sorted(symbols)
+    finally:
+        db.close()
+
+
+def run_batch_forecasts(symbols: List[str] = None, workers: int = None) -> Dict:
+    """Fit and store forecasts for every tracked symbol.
+
+    Returns a summary with per-symbol failures and throughput figures.
+    """
+    started = time.perf_counter()
+    symbols = symbols or get_tracked_symbols()
+    workers = workers or settings.FORECAST_WORKERS
+    total = len(symbols)
+    print(f"▶ Forecast pipeline: {total} symbols, {workers} workers")
+
+    # Cached histories are reused; the rest arrive in one bulk request
+    histories = {
+        symbol: hist
+        for symbol, hist in get_history_frames(symbols, "2y").items()
+        if len(hist) >= 30
+    }
+    load_seconds = time.perf_counter() - started
+    print(f"✓ Loaded history for {len(histories)}/{total} symbols in {load_seconds:.1f}s")
+
+    # Score earlier runs against the closes that arrived since the last run
+    scored = 0
+    for symbol, hist in histories.items():
+        scored += update_prediction_metrics(symbol, pd.Series(hist['Close'].to_numpy(), index=hist.index.date))
+    print(f"✓ Scored {scored} matured predictions")
+
+    failed = {symbol: "Insufficient historical data" for symbol in symbols if symbol not in histories}
+    completed = 0
+
+    fit_started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(fit_forecast, frame, FORECAST_HORIZON_DAYS): (symbol, frame['ds'].max().date())
+            for symbol, frame in (
+                (symbol, history_to_prophet_frame(hist)) for symbol, hist in histories.items()
+            )
+        }
+        for future in as_completed(futures):
+            symbol, training_cutoff = futures[future]
+            try:
+                predictions = future.result()
+                if save_prediction_run(symbol, predictions, training_cutoff) is None:
+                    raise RuntimeError("Failed to persist forecast")
+                set_cache(prediction_cache_key(symbol), predictions, ttl=PREDICTION_CACHE_TTL)
+                completed += 1
+            except Exception as e:
+                failed[symbol] = str(e)
+
+            done = completed + len(failed)
+            elapsed = time.perf_counter() - fit_started
+            rate = done / elapsed if elapsed > 0 else 0.0
+            print(f"  [{done}/{total}] {symbol} ({rate:.2f} symbols/s)")
+
+    elapsed = time.perf_counter() - started
+    summary = {
+        "symbols": total,
+        "completed": completed,
+        "failed": failed,
+        "scored_predictions": scored,
+        "load_seconds": round(load_seconds, 2),
+        "total_seconds": round(elapsed, 2),
+        "symbols_per_second": round(completed / elapsed, 3) if elapsed > 0 else 0.0,
+    }
+    print(f"✓ Forecast pipeline finished: {completed} ok, {len(failed)} failed in {elapsed:.1f}s")
+    return summary
@@ -0,0 +1,141 @@
+"""
+Forecasting engines.
+
+Each engine is a (fit, predict) pair working on a Prophet-style ds/y frame.
+This module does no I/O and imports nothing from the configuration,
+database, cache or metrics layers, so it can be used from worker processes
+and the offline backtest harness (benchmarks/backtest.py). Callers that
+want fit timings register an observer with add_fit_observer.
+"""
+import time
+from typing import Any, Callable, Dict, List, Tuple
+import numpy as np
+import pandas as pd
+from app.utils.tracing import span
+
+DEFAULT_ENGINE = "prophet"
+
+# Called as observer(engine, seconds) after every fit_forecast
+_fit_observers: List[Callable[[str, float], None]] = []
+
+
+def add_fit_observer(observer: Callable[[str, float], None]) -> None:
+    if observer not in _fit_observers:
+        _fit_observers.append(observer)
+
+
+def history_to_prophet_frame(hist: pd.DataFrame) -> pd.DataFrame:
+    """Convert a yfinance history frame into Prophet's ds/y layout"""
+    # Prepare data for Prophet - remove timezone from dates
+    df = pd.DataFrame({
+        'ds': hist.index.tz_localize(None) if hist.index.tz else hist.index,
+        'y': hist['Close'].values
+    })
+    df.reset_index(drop=True, inplace=True)
+    return df
+
+
+def _forecast_records(dates, yhat, lower, upper) -> List[Dict]:
+    return [
+        {
+            "date": ds.strftime("%Y-%m-%d"),
+            "predicted_price": float(y),
+            "lower_bound": float(lo),
+            "upper_bound": float(hi)
+        }
+        for ds, y, lo, hi in zip(dates, yhat, lower, upper)
+    ]
+
+
+def _future_dates(df: pd.DataFrame, days: int) -> pd.DatetimeIndex:
+    # Calendar days, matching Prophet's make_future_dataframe
+    return pd.date_range(df['ds'].max() + pd.Timedelta(days=1), periods=days, freq='D')
+
+
+def prophet_fit(df: pd.DataFrame) -> Any:
+    from prophet import Prophet
+
+    # Train Prophet model - suppress logging
+    import logging
+    import warnings
+    warnings.filterwarnings('ignore')
+    logging.getLogger('prophet').setLevel(logging.ERROR)
+    logging.getLogger('cmdstanpy').setLevel(logging.ERROR)
+
+    try:
+        model = Prophet(
+            yearly_seasonality=True,
+            weekly_seasonality=True,
+            daily_seasonality=False,
+            changepoint_prior_scale=0.05
+        )
+    except AttributeError:
+        # Workaround for stan_backend issue in Prophet 1.2.1
+        model = Prophet(
+            yearly_seasonality=True,
+            weekly_seasonality=True,
+            daily_seasonality=False,
+            changepoint_prior_scale=0.05
+        )
+        # Manually set stan_backend to avoid the error
+        if not hasattr(model, 'stan_backend'):
+            model.stan_backend = None
+
+    model.fit(df)
+    return model
+
+
+def prophet_predict(model: Any, df: pd.DataFrame, days: int) -> List[Dict]:
+    # Make future predictions
+    future = model.make_future_dataframe(periods=days)
+    forecast = model.predict(future)
+
+    # Get predictions for future dates only
+    future_rows = forecast[forecast['ds'] > df['ds'].max()]
+    return _forecast_records(
+        future_rows['ds'], future_rows['yhat'],
+        future_rows['yhat_lower'], future_rows['yhat_upper']
+    )[:days]
+
+
+def naive_fit(df: pd.DataFrame) -> Dict:
+    """Last observed value with a random-walk interval"""
+    y = df['y'].to_numpy(dtype=float)
+    steps = np.diff(y)
+    return {"last": y[-1], "drift": 0.0, "sigma": float(steps.std()) if len(steps) > 1 else 0.0}
+
+
+def drift_fit(df: pd.DataFrame) -> Dict:
+    """Random walk with the average historical step as drift"""
+    model = naive_fit(df)
+    y = df['y'].to_numpy(dtype=float)
+    model["drift"] = float((y[-1] - y[0]) / (len(y) - 1)) if len(y) > 1 else 0.0
+    return model
+
+
+def random_walk_predict(model: Dict, df: pd.DataFrame, days: int) -> List[Dict]:
+    dates = _future_dates(df, days)
+    h = np.arange(1, days + 1)
+    yhat = model["last"] + model["drift"] * h
+    # 80% interval, same width Prophet reports by default
+    width = 1.2816 * model["sigma"] * np.sqrt(h)
+    return _forecast_records(dates, yhat, yhat - width, yhat + width)
+
+
+FORECASTERS: Dict[str, Tuple[Callable, Callable]] = {
+    "prophet": (prophet_fit, prophet_predict),
+    "naive": (naive_fit, random_walk_predict),
+    "drift": (drift_fit, random_walk_predict),
+}
+
+
+def fit_forecast(df: pd.DataFrame, days: int, engine: str = DEFAULT_ENGINE) -> List[Dict]:
+    """Fit an engine on a ds/y frame and return the future-only forecast"""
+    fit, predict = FORECASTERS[engine]
+    started = time.perf_counter()
+    with span("forecast.fit", "fit", engine=engine, rows=len(df)):
+        forecast = predict(fit(df), df, days)
+    elapsed = time.perf_counter() - started
+    for observer in _fit_observers:
+        observer(engine, elapsed)
+    return forecast
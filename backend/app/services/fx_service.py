@@ -0,0 +1,242 @@
+"""
+FX rate table.
+
+All rates are held as one USD-based vector (1 USD = rate units of currency),
+refreshed with a single bulk request to the best-scoring provider (see
+provider_router), and cross rates are triangulated through USD. Batch
+conversion looks every amount up in that vector, so valuing a
+mixed-currency portfolio needs no per-pair network calls. A currency the
+table does not carry is fetched on its own the first time it is asked for.
+"""
+import threading
+import time
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+from app.config import settings
+from app.services.cache_service import get_cache, set_cache
+from app.services.market_data import provider_get, yahoo_budget_remaining, yahoo_download, yahoo_finance_open
+from app.services.provider_router import Adapter, ProviderError, ProviderRouter
+
+FX_CACHE_KEY = "fx:usd_rates"
+
+# Currencies always included in the table
+CURRENCIES = ["USD", "INR", "EUR", "GBP", "JPY", "AUD", "CAD", "CHF", "CNY", "HKD", "SGD"]
+
+# Last-resort USD rates if every provider fails
+FALLBACK_USD_RATES = {
+    "USD": 1.0,
+    "INR": 83.5,
+    "EUR": 0.92,
+    "GBP": 0.79,
+}
+
+# Yahoo Finance symbol suffix -> trading currency
+SUFFIX_CURRENCIES = {
+    "NS": "INR",
+    "BO": "INR",
+    "BSE": "INR",
+    "NSE": "INR",
+    "L": "GBP",
+    "T": "JPY",
+    "AX": "AUD",
+    "TO": "CAD",
+    "HK": "HKD",
+    "SI": "SGD",
+    "SW": "CHF",
+    "SS": "CNY",
+    "SZ": "CNY",
+    "PA": "EUR",
+    "DE": "EUR",
+    "AS": "EUR",
+    "MI": "EUR",
+    "MC": "EUR",
+}
+
+_rates: Dict[str, float] = {}
+_fetched_at = 0.0
+# True while the table has currencies no provider returned
+_stale = False
+# One refresh at a time; requests arriving meanwhile wait for its table
+_refresh_lock = threading.Lock()
+
+# Currencies fetched on demand: currency -> (USD rate, or None when no
+# provider has it, fetched_at)
+_extra_rates: Dict[str, Tuple[Optional[float], float]] = {}
+
+
+def currency_for_symbol(symbol: str) -> str:
+    """Trading currency of a symbol, inferred from its exchange suffix"""
+    if '.' in symbol:
+        return SUFFIX_CURRENCIES.get(symbol.upper().rsplit('.', 1)[1], "USD")
+    return "USD"
+
+
+def _fetch_exchange_rate_api(currencies: Sequence[str]) -> Dict[str, float]:
+    """Full USD table in one request; `currencies` is ignored"""
+    url = f"https://v6.exchangerate-api.com/v6/{settings.EXCHANGE_RATE_API_KEY}/latest/USD"
+    response = provider_get("exchangerate", "latest_rates", url, timeout=10)
+    if response.status_code != 200:
+        raise ProviderError(f"ExchangeRate-API returned HTTP {response.status_code}")
+    data = response.json()
+    if data.get('result') != 'success':
+        raise ProviderError(f"ExchangeRate-API: {data.get('error-type', 'unknown error')}")
+    return {k.upper(): float(v) for k, v in data.get('conversion_rates', {}).items()}
+
+
+def _fetch_yahoo(currencies: Sequence[str]) -> Dict[str, float]:
+    pairs = {f"USD{c}=X": c for c in currencies if c != "USD"}
+    if not pairs:
+        return {}
+    data = yahoo_download(list(pairs), "5d")
+
+    rates = {}
+    for pair, currency in pairs.items():
+        try:
+            closes = data[pair]['Close'].dropna()
+            if len(closes) > 0:
+                rates[currency] = float(closes.iloc[-1])
+        except KeyError:
+            continue
+    return rates
+
+
+fx_router = ProviderRouter("fx", [
+    Adapter("exchangerate", _fetch_exchange_rate_api, available=lambda: bool(settings.EXCHANGE_RATE_API_KEY)),
+    Adapter("yahoo", _fetch_yahoo, available=yahoo_finance_open, quota=yahoo_budget_remaining),
+])
+
+
+def _max_age(stale: bool) -> int:
+    return settings.FX_FALLBACK_REFRESH_SECONDS if stale else settings.FX_REFRESH_SECONDS
+
+
+def refresh_fx_rates() -> Dict[str, float]:
+    """Fetch the USD rate table: one bulk call to the best-scoring provider,
+    then the others for any gaps.
+
+    Currencies no provider returned get FALLBACK_USD_RATES, and the table is
+    marked stale so it is fetched again after FX_FALLBACK_REFRESH_SECONDS.
+    """
+    global _rates, _fetched_at, _stale
+
+    rates = {}
+    for provider in fx_router.ranked():
+        missing = [c for c in CURRENCIES if c not in rates]
+        if not missing:
+            break
+        try:
+            rates.update(fx_router.call(provider, missing))
+        except Exception as e:
+            print(f"✗ {provider} FX rates error: {e}")
+    rates["USD"] = 1.0
+    stale = any(c not in rates for c in CURRENCIES)
+    for currency, rate in FALLBACK_USD_RATES.items():
+        rates.setdefault(currency, rate)
+
+    _rates, _fetched_at, _stale = rates, time.time(), stale
+    set_cache(
+        FX_CACHE_KEY,
+        {"rates": rates, "fetched_at": _fetched_at, "stale": stale},
+        ttl=_max_age(stale) * 4
+    )
+    return rates
+
+
+def _fresh_rates() -> Optional[Dict[str, float]]:
+    """The in-process or cached table if it is still fresh"""
+    global _rates, _fetched_at, _stale
+
+    if _rates and time.time() - _fetched_at < _max_age(_stale):
+        return _rates
+
+    cached = get_cache(FX_CACHE_KEY)
+    if cached and time.time() - cached["fetched_at"] < _max_age(cached.get("stale", False)):
+        _rates, _fetched_at, _stale = cached["rates"], cached["fetched_at"], cached.get("stale", False)
+        return _rates
+    return None
+
+
+def get_usd_rates() -> Dict[str, float]:
+    """Current USD rate table, refreshed every FX_REFRESH_SECONDS (sooner when stale)"""
+    rates = _fresh_rates()
+    if rates is not None:
+        return rates
+
+    with _refresh_lock:
+        # Another thread may have refreshed while this one waited
+        rates = _fresh_rates()
+        if rates is not None:
+            return rates
+        return refresh_fx_rates()
+
+
+def _extra_usd_rate(currency: str) -> Optional[float]:
+    """USD rate for a currency outside the table, fetched on demand.
+
+    Kept for FX_REFRESH_SECONDS; a currency no provider has is remembered
+    for FX_FALLBACK_REFRESH_SECONDS so it is not looked up on every request.
+    """
+    entry = _extra_rates.get(currency)
+    if entry and time.time() - entry[1] < _max_age(entry[0] is None):
+        return entry[0]
+
+    cache_key = f"{FX_CACHE_KEY}:{currency}"
+    cached = get_cache(cache_key)
+    if cached and time.time() - cached["fetched_at"] < _max_age(cached["rate"] is None):
+        _extra_rates[currency] = (cached["rate"], cached["fetched_at"])
+        return cached["rate"]
+
+    rate = None
+    if len(currency) == 3 and currency.isalpha():
+        rate = (fx_router.first([currency]) or {}).get(currency)
+    fetched_at = time.time()
+    _extra_rates[currency] = (rate, fetched_at)
+    set_cache(cache_key, {"rate": rate, "fetched_at": fetched_at}, ttl=_max_age(rate is None))
+    return rate
+
+
+def _usd_rate(rates: Dict[str, float], currency: str) -> float:
+    currency = currency.upper()
+    if currency in rates:
+        return rates[currency]
+    rate = _extra_usd_rate(currency)
+    return np.nan if rate is None else rate
+
+
+def rate_vector(currencies: Sequence[str], to_currency: str) -> np.ndarray:
+    """Rates converting each currency into to_currency, via USD.
+
+    Currencies outside the table are fetched once each; those no provider
+    has get NaN.
+    """
+    rates = get_usd_rates()
+    usd_rates = {c.upper(): _usd_rate(rates, c) for c in set(currencies)}
+    usd_per_unit = np.array([1 / usd_rates[c.upper()] for c in currencies])
+    return usd_per_unit * _usd_rate(rates, to_currency)
+
+
+def rate_matrix(currencies: Sequence[str] = CURRENCIES) -> Tuple[List[str], np.ndarray]:
+    """Full cross-rate matrix; matrix[i, j] converts currencies[i] to currencies[j]"""
+    rates = get_usd_rates()
+    currencies = [c.upper() for c in currencies if c.upper() in rates]
+    usd = np.array([rates[c] for c in currencies])
+    return currencies, np.outer(1 / usd, usd)
+
+
+def get_rate(from_currency: str, to_currency: str) -> float:
+    if from_currency.upper() == to_currency.upper():
+        return 1.0
+    rate = rate_vector([from_currency], to_currency)[0]
+    if np.isnan(rate):
+        raise ValueError(f"No exchange rate for {from_currency.upper()}/{to_currency.upper()}")
+    return float(rate)
+
+
+def convert_amounts(amounts: Sequence[float], from_currencies: Sequence[str], to_currency: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Convert many amounts into one currency.
+
+    Returns (converted amounts, rate applied to each amount); NaN where the
+    source currency is unknown.
+    """
+    rates = rate_vector(from_currencies, to_currency)
+    return np.asarray(amounts, dtype=float) * rates, rates
@@ -0,0 +1,433 @@
+"""
+Market data repository.
+
+Single access layer for Yahoo Finance price data shared by stock_service,
+prediction_service and the forecast pipeline. Every Yahoo call goes through
+here so they share one cache, one circuit breaker and one request budget.
+HTTP calls to the other providers go through provider_get so every upstream
+is measured, and can be recorded or replayed (see utils/cassettes), the same
+way.
+"""
+import threading
+import time
+import requests
+import pandas as pd
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+from zoneinfo import ZoneInfo
+from app.config import settings
+from app.services.cache_service import get_cache, set_cache
+from app.services.provider_router import record_provider_request
+from app.utils.cassettes import request_key, upstream_call
+from app.utils.metrics import CIRCUIT_BREAKER_TRIPS, UPSTREAM_ERRORS, track_upstream
+from app.utils.tracing import traced_sleep
+
+HISTORY_CACHE_TTL = 900
+
+# Ordered shortest to longest; longer cached periods can serve shorter ones
+HISTORY_PERIODS = ["1d", "5d", "1mo", "3mo", "6mo", "1y", "2y", "5y"]
+PERIOD_DAYS = {"1mo": 30, "3mo": 91, "6mo": 182, "1y": 365, "2y": 730, "5y": 1826}
+
+# Yahoo Finance symbol suffix -> exchange timezone; no suffix means a US listing
+SUFFIX_TIMEZONES = {
+    "NS": "Asia/Kolkata",
+    "BO": "Asia/Kolkata",
+    "BSE": "Asia/Kolkata",
+    "NSE": "Asia/Kolkata",
+    "L": "Europe/London",
+    "T": "Asia/Tokyo",
+    "AX": "Australia/Sydney",
+    "TO": "America/Toronto",
+    "HK": "Asia/Hong_Kong",
+    "SI": "Asia/Singapore",
+    "SW": "Europe/Zurich",
+    "SS": "Asia/Shanghai",
+    "SZ": "Asia/Shanghai",
+    "PA": "Europe/Paris",
+    "DE": "Europe/Berlin",
+    "AS": "Europe/Amsterdam",
+    "MI": "Europe/Rome",
+    "MC": "Europe/Madrid",
+}
+
+RATE_LIMIT_KEYWORDS = ["429", "Too Many Requests", "Expecting value", "rate limit", "No price data"]
+
+# Circuit breaker for Yahoo Finance rate limiting
+_yahoo_finance_blocked_until = None
+_yahoo_finance_failure_count = 0
+_last_successful_request = None
+
+
+class YahooBudgetExhausted(Exception):
+    """Raised when the shared Yahoo Finance request budget is spent"""
+
+
+class SymbolNotFound(ValueError):
+    """The provider answered, but has no data for the symbol"""
+
+
+class UpstreamUnavailable(ValueError):
+    """No answer from the provider (network error, rate limit, spent budget,
+    open circuit breaker); says nothing about whether the symbol exists"""
+
+
+def check_yahoo_finance_availability() -> bool:
+    """Check if Yahoo Finance is available (circuit breaker)"""
+    global _yahoo_finance_blocked_until, _yahoo_finance_failure_count, _last_successful_request
+
+    # If we have a successful request recently, reset failure count
+    if _last_successful_request:
+        time_since_success = (datetime.now() - _last_successful_request).total_seconds()
+        if time_since_success < 300:  # 5 minutes
+            _yahoo_finance_failure_count = max(0, _yahoo_finance_failure_count - 1)  # Gradually reduce
+            if _yahoo_finance_failure_count == 0:
+                _yahoo_finance_blocked_until = None
+
+    # If blocked, check if block period has passed
+    if _yahoo_finance_blocked_until:
+        if datetime.now() < _yahoo_finance_blocked_until:
+            remaining = (_yahoo_finance_blocked_until - datetime.now()).total_seconds() / 60
+            print(f"🚫 Yahoo Finance still blocked. Wait {remaining:.1f} more minutes.")
+            return False  # Still blocked
+        else:
+            # Block period passed, reset
+            print("✅ Yahoo Finance block period expired. Trying again...")
+            _yahoo_finance_blocked_until = None
+            _yahoo_finance_failure_count = 0
+
+    return True
+
+
+def mark_yahoo_finance_failure():
+    """Mark Yahoo Finance as failed and set block period"""
+    global _yahoo_finance_blocked_until, _yahoo_finance_failure_count
+
+    _yahoo_finance_failure_count += 1
+    CIRCUIT_BREAKER_TRIPS.labels("yahoo").inc()
+
+    # Block for increasing periods: 15min, 30min, 45min, 60min (more aggressive)
+    block_minutes = min(15 * _yahoo_finance_failure_count, 60)
+    _yahoo_finance_blocked_until = datetime.now() + timedelta(minutes=block_minutes)
+    print(f"⚠️ Yahoo Finance blocked for {block_minutes} minutes due to rate limiting (until {_yahoo_finance_blocked_until.strftime('%H:%M:%S')})")
+    print(f"   Please wait {block_minutes} minutes before trying again.")
+
+
+def mark_yahoo_finance_success():
+    """Mark Yahoo Finance as working"""
+    global _yahoo_finance_failure_count, _last_successful_request, _yahoo_finance_blocked_until
+
+    if _yahoo_finance_failure_count > 0:
+        print(f"✅ Yahoo Finance is working again! (was blocked for {_yahoo_finance_failure_count} failures)")
+
+    _yahoo_finance_failure_count = 0
+    _yahoo_finance_blocked_until = None
+    _last_successful_request = datetime.now()
+
+
+def get_yahoo_finance_blocked_until() -> Optional[datetime]:
+    return _yahoo_finance_blocked_until
+
+
+def yahoo_finance_open() -> bool:
+    """Circuit breaker state without the side effects of the full check"""
+    return _yahoo_finance_blocked_until is None or datetime.now() >= _yahoo_finance_blocked_until
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    return any(keyword in str(error) for keyword in RATE_LIMIT_KEYWORDS)
+
+
+class _RequestBudget:
+    """Token bucket shared by every Yahoo Finance call in the process"""
+
+    def __init__(self, per_minute: int):
+        self.capacity = max(1, per_minute)
+        self.tokens = float(self.capacity)
+        self.rate = self.capacity / 60.0
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def remaining(self) -> float:
+        """Share of the budget currently available, 0.0 - 1.0"""
+        with self.lock:
+            refilled = self.tokens + (time.monotonic() - self.updated) * self.rate
+            return min(1.0, refilled / self.capacity)
+
+    def acquire(self, max_wait: float = 5.0) -> bool:
+        deadline = time.monotonic() + max_wait
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if time.monotonic() + wait > deadline:
+                return False
+            traced_sleep(wait, "yahoo_budget")
+
+
+_yahoo_budget = _RequestBudget(settings.YAHOO_REQUESTS_PER_MINUTE)
+
+
+def _spend_yahoo_budget():
+    if not _yahoo_budget.acquire():
+        raise YahooBudgetExhausted("Yahoo Finance request budget exhausted")
+
+
+def yahoo_budget_remaining() -> float:
+    return _yahoo_budget.remaining()
+
+
+def _yfinance():
+    # Imported on first use: yfinance pulls in curl_cffi and friends, which
+    # the API does not need to start serving
+    import yfinance
+    return yfinance
+
+
+def yahoo_history(symbol: str, period: str, timeout: int = 30) -> pd.DataFrame:
+    _spend_yahoo_budget()
+    with track_upstream("yahoo", "history", is_rate_limit_error):
+        return upstream_call(
+            "yahoo", "history", f"{symbol}:{period}",
+            lambda: _yfinance().Ticker(symbol).history(period=period, timeout=timeout)
+        )
+
+
+def yahoo_info(symbol: str) -> Dict:
+    _spend_yahoo_budget()
+    with track_upstream("yahoo", "info", is_rate_limit_error):
+        return upstream_call("yahoo", "info", symbol, lambda: _yfinance().Ticker(symbol).info)
+
+
+def yahoo_news(symbol: str) -> List[Dict]:
+    _spend_yahoo_budget()
+    with track_upstream("yahoo", "news", is_rate_limit_error):
+        return upstream_call("yahoo", "news", symbol, lambda: _yfinance().Ticker(symbol).news)
+
+
+def yahoo_download(symbols: List[str], period: str) -> pd.DataFrame:
+    """Bulk history for many symbols; one budget token per request.
+
+    Columns are always (symbol, field), even for a single symbol. Prices are
+    adjusted like Ticker.history's, so both fill the same history cache.
+    """
+    _spend_yahoo_budget()
+    with track_upstream("yahoo", "download", is_rate_limit_error):
+        return upstream_call(
+            "yahoo", "download", f"{','.join(sorted(symbols))}:{period}",
+            lambda: _yfinance().download(
+                symbols,
+                period=period,
+                group_by="ticker",
+                multi_level_index=True,
+                auto_adjust=True,
+                threads=True,
+                progress=False,
+            )
+        )
+
+
+def provider_get(provider: str, operation: str, url: str, **kwargs) -> requests.Response:
+    """requests.get to a REST provider, timed and counted per provider.
+
+    Error statuses are counted as upstream errors but returned unchanged.
+    """
+    record_provider_request(provider)
+    with track_upstream(provider, operation):
+        response = upstream_call(
+            provider, operation, request_key(url, kwargs.get("params")),
+            lambda: requests.get(url, **kwargs)
+        )
+    if response.status_code >= 400:
+        kind = "rate_limit" if response.status_code == 429 else "http_error"
+        UPSTREAM_ERRORS.labels(provider, operation, kind).inc()
+    return response
+
+
+def exchange_today(symbol: str) -> date:
+    """Current date where the symbol trades; daily bars are dated in that timezone"""
+    suffix = symbol.upper().rsplit('.', 1)[1] if '.' in symbol else None
+    return datetime.now(ZoneInfo(SUFFIX_TIMEZONES.get(suffix, "America/New_York"))).date()
+
+
+def symbol_variants(symbol: str) -> List[str]:
+    """Yahoo Finance spellings to try for a symbol, most likely first"""
+    # Handle exchange suffixes - try different formats for international stocks
+    variants = [symbol.upper()]
+
+    # If symbol has .BSE suffix, try .BO (Bombay Stock Exchange in yfinance)
+    if '.BSE' in symbol.upper():
+        base_symbol = symbol.upper().replace('.BSE', '')
+        variants.extend([
+            f"{base_symbol}.BO",  # BSE format
+            f"{base_symbol}.NS",   # NSE format (more common)
+            base_symbol            # Without suffix
+        ])
+    # If symbol has other exchange suffixes, try common alternatives
+    elif '.' in symbol.upper():
+        base_symbol = symbol.upper().split('.')[0]
+        suffix = symbol.upper().split('.')[1]
+        # Map common exchange suffixes
+        exchange_map = {
+            'BSE': ['.BO', '.NS', ''],
+            'NSE': ['.NS', '.BO', ''],
+            'LSE': ['.L', ''],
+            'TSE': ['.T', ''],
+            'ASX': ['.AX', '']
+        }
+        if suffix in exchange_map:
+            variants.extend([f"{base_symbol}{s}" for s in exchange_map[suffix]])
+        else:
+            variants.append(base_symbol)
+
+    return variants
+
+
+def history_cache_key(symbol: str, period: str) -> str:
+    return f"stock_history:{symbol.upper()}:{period}"
+
+
+def frame_to_records(hist: pd.DataFrame) -> List[Dict]:
+    """Convert a yfinance history frame to the cached/API record format"""
+    dates = hist.index.strftime("%Y-%m-%d")
+    volume = hist['Volume'].fillna(0).astype(int) if 'Volume' in hist.columns else [0] * len(hist)
+    return [
+        {
+            "date": d,
+            "open": float(o),
+            "high": float(h),
+            "low": float(l),
+            "close": float(c),
+            "volume": int(v)
+        }
+        for d, o, h, l, c, v in zip(dates, hist['Open'], hist['High'], hist['Low'], hist['Close'], volume)
+    ]
+
+
+def records_to_frame(records: List[Dict]) -> pd.DataFrame:
+    """Inverse of frame_to_records, with yfinance column names"""
+    frame = pd.DataFrame.from_records(records)
+    if frame.empty:
+        return frame
+    frame.index = pd.DatetimeIndex(pd.to_datetime(frame.pop("date")), name="Date")
+    return frame.rename(columns=str.capitalize)
+
+
+def _from_longer_cached_period(symbol: str, period: str) -> Optional[List[Dict]]:
+    """Serve a period by slicing an already-cached longer period"""
+    if period not in PERIOD_DAYS:
+        return None
+    for longer in HISTORY_PERIODS[HISTORY_PERIODS.index(period) + 1:]:
+        cached = get_cache(history_cache_key(symbol, longer))
+        if cached:
+            last = datetime.strptime(cached[-1]["date"], "%Y-%m-%d")
+            cutoff = (last - timedelta(days=PERIOD_DAYS[period])).strftime("%Y-%m-%d")
+            return [row for row in cached if row["date"] > cutoff]
+    return None
+
+
+def get_history_records(symbol: str, period: str = "1mo") -> List[Dict]:
+    """Daily OHLCV records for a symbol, served from cache when possible"""
+    cache_key = history_cache_key(symbol, period)
+    cached = get_cache(cache_key)
+    if cached:
+        return cached
+
+    sliced = _from_longer_cached_period(symbol, period)
+    if sliced:
+        set_cache(cache_key, sliced, ttl=HISTORY_CACHE_TTL)
+        return sliced
+
+    # Check circuit breaker before going upstream
+    if not check_yahoo_finance_availability():
+        return []  # Return empty list instead of raising error for history
+
+    # Retry with exponential backoff
+    for attempt in range(2):  # Reduced attempts for history
+        for variant in symbol_variants(symbol):
+            try:
+                if attempt > 0:
+                    traced_sleep(min(2 ** attempt, 5), "retry_backoff")  # 2s, 5s delays
+
+                hist = yahoo_history(variant, period, timeout=30)
+
+                if hist.empty or len(hist) == 0:
+                    continue  # Try next variant
+
+                data = frame_to_records(hist)
+                set_cache(cache_key, data, ttl=HISTORY_CACHE_TTL)
+                mark_yahoo_finance_success()  # Mark as successful
+                return data
+            except Exception as e:
+                # If rate limited, mark failure and stop
+                if "429" in str(e) or "Too Many Requests" in str(e) or "Expecting value" in str(e):
+                    if attempt >= 1:  # After 1 failed attempt for history
+                        mark_yahoo_finance_failure()
+                        break
+                    if attempt < 1:
+                        traced_sleep(min(2 ** (attempt + 2), 10), "rate_limit_backoff")
+                        break
+                continue  # Try next variant
+
+        if attempt < 1:
+            traced_sleep(1, "retry_backoff")
+
+    # Return empty list if all attempts failed (don't raise error for history)
+    return []
+
+
+def get_history_frame(symbol: str, period: str = "1mo") -> pd.DataFrame:
+    """History for one symbol as a DataFrame indexed by date"""
+    return records_to_frame(get_history_records(symbol, period))
+
+
+def get_history_frames(symbols: List[str], period: str = "2y") -> Dict[str, pd.DataFrame]:
+    """History for many symbols: cached symbols are reused, the rest are
+    fetched in one bulk request, and symbols it has no data for are retried
+    under their other spellings"""
+    frames = {}
+    missing = []
+    for symbol in symbols:
+        records = get_cache(history_cache_key(symbol, period)) or _from_longer_cached_period(symbol, period)
+        if records:
+            frames[symbol] = records_to_frame(records)
+        else:
+            missing.append(symbol)
+
+    if not missing or not check_yahoo_finance_availability():
+        return frames
+
+    try:
+        data = yahoo_download(missing, period)
+        mark_yahoo_finance_success()
+    except Exception as e:
+        if is_rate_limit_error(e):
+            mark_yahoo_finance_failure()
+        print(f"✗ Bulk history download failed: {e}")
+        return frames
+
+    unresolved = []
+    for symbol in missing:
+        try:
+            hist = data[symbol].dropna(subset=["Close"])
+        except KeyError:
+            hist = None
+        if hist is None or hist.empty:
+            unresolved.append(symbol)
+            continue
+        records = frame_to_records(hist)
+        set_cache(history_cache_key(symbol, period), records, ttl=HISTORY_CACHE_TTL)
+        frames[symbol] = records_to_frame(records)
+
+    # The bulk request only tries each symbol as given; other spellings
+    # (.BSE -> .BO/.NS, ...) go through the single-symbol path
+    for symbol in unresolved:
+        if len(symbol_variants(symbol)) > 1:
+            records = get_history_records(symbol, period)
+            if records:
+                frames[symbol] = records_to_frame(records)
+    return frames
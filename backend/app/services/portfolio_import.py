@@ -0,0 +1,200 @@
+"""
+Bulk portfolio import from brokerage CSV exports.
+
+The upload is read row by row (never fully in memory) and processed in
+batches: each batch's symbols are checked against the symbol registry in one
+call and its valid rows are written with one bulk INSERT. All batches share
+a single transaction, so an import is committed whole or not at all; rows
+that fail validation are skipped and reported instead.
+"""
+import csv
+import math
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import insert
+from app.database import SessionLocal
+from app.models.portfolio import Portfolio
+from app.services.symbol_registry import INVALID, UNKNOWN, lookup_many
+
+IMPORT_BATCH_SIZE = 1000
+MAX_IMPORT_ROWS = 50000
+MAX_REPORTED_ERRORS = 1000
+
+# Accepted header names (lower-cased) for each field, as used by common brokers
+COLUMN_ALIASES = {
+    "stock_symbol": ["stock_symbol", "symbol", "ticker", "instrument"],
+    "quantity": ["quantity", "qty", "shares", "units"],
+    "purchase_price": ["purchase_price", "price", "cost_per_share", "cost basis per share", "avg price", "average price"],
+    "purchase_date": ["purchase_date", "date", "trade date", "acquired", "date acquired"],
+}
+
+DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%Y/%m/%d", "%d-%b-%Y")
+
+
+class ImportFormatError(ValueError):
+    """The file cannot be imported at all (missing columns, too many rows)"""
+
+
+def _resolve_columns(header: List[str]) -> Dict[str, int]:
+    normalized = [h.strip().lower() for h in header]
+    columns = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in normalized:
+                columns[field] = normalized.index(alias)
+                break
+    missing = [field for field in COLUMN_ALIASES if field not in columns]
+    if missing:
+        raise ImportFormatError(f"Missing required column(s): {', '.join(missing)}")
+    return columns
+
+
+def _parse_number(value: str) -> float:
+    number = float(value.strip().replace(",", "").replace("$", ""))
+    # float() also accepts "nan" and "inf", which would poison valuation sums
+    if not math.isfinite(number):
+        raise ValueError(value)
+    return number
+
+
+def _parse_date(value: str) -> date:
+    value = value.strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognized date '{value}'")
+
+
+def parse_row(cells: List[str], columns: Dict[str, int]) -> Dict:
+    """Validate one CSV row into portfolio column values; raises ValueError"""
+    def cell(field: str) -> str:
+        index = columns[field]
+        return cells[index] if index < len(cells) else ""
+
+    symbol = cell("stock_symbol").strip().upper()
+    if not symbol or len(symbol) > 20:
+        raise ValueError("Invalid stock symbol format")
+
+    try:
+        quantity = _parse_number(cell("quantity"))
+    except ValueError:
+        raise ValueError(f"Invalid quantity '{cell('quantity')}'")
+    if quantity <= 0:
+        raise ValueError("Quantity must be positive")
+
+    try:
+        purchase_price = _parse_number(cell("purchase_price"))
+    except ValueError:
+        raise ValueError(f"Invalid purchase price '{cell('purchase_price')}'")
+    if purchase_price < 0:
+        raise ValueError("Purchase price cannot be negative")
+
+    purchase_date = _parse_date(cell("purchase_date"))
+    if purchase_date > date.today():
+        raise ValueError("Purchase date is in the future")
+
+    return {
+        "stock_symbol": symbol,
+        "quantity": quantity,
+        "purchase_price": purchase_price,
+        "purchase_date": purchase_date
+    }
+
+
+def _read_rows(reader) -> Iterable[Tuple[int, List[str]]]:
+    """(line number, cells) for each record of a csv.reader, numbered by the
+    line the record starts on, so quoted multiline fields do not shift later
+    rows; malformed CSV aborts the import with its line number"""
+    start = 1
+    try:
+        for cells in reader:
+            yield start, cells
+            start = reader.line_num + 1
+    except csv.Error as e:
+        raise ImportFormatError(f"Row {reader.line_num}: malformed CSV ({e})")
+
+
+def _batches(rows: Iterable[Tuple[int, List[str]]], size: int) -> Iterable[List[Tuple[int, List[str]]]]:
+    batch = []
+    for count, (row_number, cells) in enumerate(rows, start=1):
+        if not any(c.strip() for c in cells):
+            continue
+        if count > MAX_IMPORT_ROWS:
+            raise ImportFormatError(f"Imports are limited to {MAX_IMPORT_ROWS} rows")
+        batch.append((row_number, cells))
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def import_portfolio_csv(
+    user_id: int,
+    lines: Iterable[str],
+    batch_size: int = IMPORT_BATCH_SIZE
+) -> Dict:
+    """Import portfolio lots from CSV text lines in a single transaction.
+
+    Returns the number of imported and failed rows, the per-row errors
+    (capped at MAX_REPORTED_ERRORS) and the symbols that still need
+    upstream verification. Raises ImportFormatError for unusable files.
+    """
+    reader = csv.reader(lines)
+    records = _read_rows(reader)
+    _, header = next(records, (1, None))
+    if not header:
+        raise ImportFormatError("The file is empty")
+    columns = _resolve_columns(header)
+
+    imported = 0
+    failed = 0
+    errors: List[Dict] = []
+    unverified = set()
+
+    def report(row_number: int, symbol: Optional[str], error: str) -> None:
+        nonlocal failed
+        failed += 1
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append({"row": row_number, "stock_symbol": symbol, "error": error})
+
+    db = SessionLocal()
+    try:
+        for batch in _batches(records, batch_size):
+            parsed = []
+            for row_number, cells in batch:
+                try:
+                    parsed.append((row_number, parse_row(cells, columns)))
+                except ValueError as e:
+                    report(row_number, None, str(e))
+
+            statuses = lookup_many(values["stock_symbol"] for _, values in parsed)
+            rows = []
+            for row_number, values in parsed:
+                symbol_status = statuses[values["stock_symbol"]]
+                if symbol_status == INVALID:
+                    report(row_number, values["stock_symbol"], "Stock not found")
+                    continue
+                if symbol_status == UNKNOWN:
+                    unverified.add(values["stock_symbol"])
+                rows.append({"user_id": user_id, **values})
+
+            if rows:
+                db.execute(insert(Portfolio), rows)
+                imported += len(rows)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    return {
+        "imported": imported,
+        "failed": failed,
+        "errors": errors,
+        "errors_truncated": failed > len(errors),
+        "unverified_symbols": sorted(unverified)
+    }
@@ -0,0 +1,383 @@
+"""
+Portfolio valuation engine.
+
+Lots are grouped by symbol, each unique symbol is priced once, and cost,
+value and P&L are computed as NumPy arrays for every lot at once. Value
+history and risk analytics are computed the same way over a close matrix
+aligned on dates.
+"""
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+import pandas as pd
+from app.config import settings
+from app.models.portfolio import Portfolio
+from app.services.cache_service import get_cache, set_cache
+from app.services.fx_service import currency_for_symbol, rate_vector
+from app.schemas.stock import StockInfo
+from app.utils.tracing import in_current_context
+from app.services.market_data import get_history_frames
+from app.services.stock_service import get_stock_info
+from app.services.symbol_registry import INVALID, VALID, lookup_many as lookup_symbols
+
+# Quote lookups are I/O bound, so unique symbols are priced concurrently
+QUOTE_WORKERS = 8
+
+TRADING_DAYS_PER_YEAR = 252
+RISK_CACHE_TTL = 900
+
+
+def _quote_or_none(symbol: str) -> Optional[StockInfo]:
+    try:
+        return get_stock_info(symbol)
+    except Exception:
+        return None
+
+
+def get_quotes(symbols: Sequence[str]) -> Dict[str, Optional[StockInfo]]:
+    """Price each symbol once; unavailable symbols map to None"""
+    if not symbols:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(QUOTE_WORKERS, len(symbols))) as executor:
+        return dict(zip(symbols, executor.map(in_current_context(_quote_or_none), symbols)))
+
+
+def _optional(value: float) -> Optional[float]:
+    return None if np.isnan(value) else float(value)
+
+
+def value_portfolio(items: List[Portfolio], base_currency: Optional[str] = None) -> Dict:
+    """Value a user's lots and aggregate them per symbol and overall.
+
+    Returns a dict matching the PortfolioValuation schema. Lots whose symbol
+    could not be priced keep their cost but have no value or P&L, and are
+    left out of the portfolio totals. Symbols that verified invalid after
+    they were added are not quoted; symbol_status flags them. With
+    `base_currency`, every amount is converted from the symbol's trading
+    currency at the current rate, so totals across exchanges are comparable.
+    """
+    if not items:
+        return {
+            "positions": [],
+            "symbols": [],
+            "totals": {
+                "currency": base_currency,
+                "positions": 0, "symbols": 0, "priced_symbols": 0,
+                "total_cost": 0.0, "current_value": 0.0,
+                "profit_loss": 0.0, "profit_loss_percent": 0.0
+            }
+        }
+
+    symbols = np.array([item.stock_symbol.upper() for item in items])
+    quantity = np.array([item.quantity for item in items], dtype=float)
+    purchase_price = np.array([item.purchase_price for item in items], dtype=float)
+
+    unique_symbols, lot_symbol = np.unique(symbols, return_inverse=True)
+    statuses = lookup_symbols(unique_symbols.tolist())
+    quotes = {s: None for s in unique_symbols.tolist()}
+    quotes.update(get_quotes([s for s in quotes if statuses[s] != INVALID]))
+    symbol_status = [VALID if quotes[s] else statuses[s] for s in quotes]
+    symbol_price = np.array(
+        [quotes[s].current_price if quotes[s] else np.nan for s in unique_symbols],
+        dtype=float
+    )
+
+    # Trading currency per symbol; with a base currency, rescale prices once
+    # per symbol using the FX rate table
+    symbol_currency = [currency_for_symbol(s) for s in unique_symbols]
+    if base_currency:
+        fx = rate_vector(symbol_currency, base_currency)
+        symbol_price = symbol_price * fx
+        purchase_price = purchase_price * fx[lot_symbol]
+        symbol_currency = [base_currency.upper()] * len(unique_symbols)
+
+    # Per lot
+    price = symbol_price[lot_symbol]
+    cost = quantity * purchase_price
+    value = quantity * price
+    profit_loss = value - cost
+    with np.errstate(divide="ignore", invalid="ignore"):
+        profit_loss_percent = np.where(cost > 0, profit_loss / cost * 100, 0.0)
+    profit_loss_percent[np.isnan(price)] = np.nan
+
+    # Per symbol
+    n = len(unique_symbols)
+    symbol_lots = np.bincount(lot_symbol, minlength=n)
+    symbol_quantity = np.bincount(lot_symbol, weights=quantity, minlength=n)
+    symbol_cost = np.bincount(lot_symbol, weights=cost, minlength=n)
+    symbol_value = symbol_quantity * symbol_price
+    symbol_profit_loss = symbol_value - symbol_cost
+    with np.errstate(divide="ignore", invalid="ignore"):
+        average_cost = np.where(symbol_quantity > 0, symbol_cost / symbol_quantity, 0.0)
+        symbol_profit_loss_percent = np.where(symbol_cost > 0, symbol_profit_loss / symbol_cost * 100, 0.0)
+    symbol_profit_loss_percent[np.isnan(symbol_price)] = np.nan
+
+    # Portfolio
+    priced = ~np.isnan(price)
+    total_cost = float(cost[priced].sum())
+    total_value = float(value[priced].sum())
+    total_profit_loss = total_value - total_cost
+
+    positions = [
+        {
+            "id": item.id,
+            "stock_symbol": item.stock_symbol,
+            "stock_name": quotes[symbols[i]].name if quotes[symbols[i]] else None,
+            "currency": symbol_currency[lot_symbol[i]],
+            "quantity": item.quantity,
+            "purchase_price": _optional(purchase_price[i]),
+            "purchase_date": item.purchase_date,
+            "current_price": _optional(price[i]),
+            "total_cost": _optional(cost[i]),
+            "current_value": _optional(value[i]),
+            "profit_loss": _optional(profit_loss[i]),
+            "profit_loss_percent": _optional(profit_loss_percent[i]),
+            "symbol_status": symbol_status[lot_symbol[i]]
+        }
+        for i, item in enumerate(items)
+    ]
+
+    symbol_summaries = [
+        {
+            "stock_symbol": symbol,
+            "stock_name": quotes[symbol].name if quotes[symbol] else None,
+            "currency": symbol_currency[j],
+            "lots": int(symbol_lots[j]),
+            "quantity": float(symbol_quantity[j]),
+            "average_cost": float(average_cost[j]),
+            "current_price": _optional(symbol_price[j]),
+            "total_cost": float(symbol_cost[j]),
+            "current_value": _optional(symbol_value[j]),
+            "profit_loss": _optional(symbol_profit_loss[j]),
+            "profit_loss_percent": _optional(symbol_profit_loss_percent[j]),
+            "symbol_status": symbol_status[j]
+        }
+        for j, symbol in enumerate(unique_symbols.tolist())
+    ]
+
+    return {
+        "positions": positions,
+        "symbols": symbol_summaries,
+        "totals": {
+            "currency": base_currency.upper() if base_currency else None,
+            "positions": len(items),
+            "symbols": n,
+            "priced_symbols": int((~np.isnan(symbol_price)).sum()),
+            "total_cost": total_cost,
+            "current_value": total_value,
+            "profit_loss": total_profit_loss,
+            "profit_loss_percent": (total_profit_loss / total_cost * 100) if total_cost > 0 else 0.0
+        }
+    }
+
+
+def close_matrix(symbols: Sequence[str], period: str) -> pd.DataFrame:
+    """Daily closes for the symbols aligned on a common date index.
+
+    Columns are symbols; gaps from differing exchange calendars are filled
+    from the nearest earlier close. Dates before a symbol's first close stay
+    NaN. Symbols without history are omitted.
+    """
+    frames = get_history_frames(list(symbols), period)
+    closes = {
+        symbol: frame["Close"]
+        for symbol, frame in frames.items()
+        if not frame.empty
+    }
+    if not closes:
+        return pd.DataFrame()
+    matrix = pd.concat(closes, axis=1).sort_index()
+    return matrix.ffill()
+
+
+def reporting_currency(symbols: Sequence[str], base_currency: Optional[str] = None) -> Optional[str]:
+    """Currency to aggregate the symbols' amounts in.
+
+    `base_currency` when given; otherwise the symbols' shared trading
+    currency, or USD when they trade in several. None for no symbols.
+    """
+    if base_currency:
+        return base_currency.upper()
+    currencies = {currency_for_symbol(s) for s in symbols}
+    if not currencies:
+        return None
+    return currencies.pop() if len(currencies) == 1 else "USD"
+
+
+def portfolio_value_series(items: List[Portfolio], period: str = "1y", base_currency: Optional[str] = None) -> Dict:
+    """Daily portfolio value and cost basis over a period.
+
+    A lot counts from its purchase date onward. Closes and purchase prices
+    are converted at the current rate into `base_currency` (see
+    reporting_currency), so lots on different exchanges add up. Returns a
+    dict matching the PortfolioHistory schema.
+    """
+    if not items:
+        return {"period": period, "currency": base_currency.upper() if base_currency else None,
+                "points": [], "missing_symbols": []}
+
+    symbols = np.array([item.stock_symbol.upper() for item in items])
+    unique_symbols = np.unique(symbols)
+    currency = reporting_currency(unique_symbols.tolist(), base_currency)
+    closes = close_matrix(unique_symbols.tolist(), period)
+    missing = sorted(set(unique_symbols.tolist()) - set(closes.columns))
+    if closes.empty:
+        return {"period": period, "currency": currency, "points": [], "missing_symbols": missing}
+    fx = rate_vector([currency_for_symbol(s) for s in closes.columns], currency)
+    closes = closes * fx
+
+    # Only lots whose symbol has history contribute
+    column = {symbol: j for j, symbol in enumerate(closes.columns)}
+    has_history = np.array([s in column for s in symbols])
+    lots = [item for item, keep in zip(items, has_history) if keep]
+    lot_symbol = np.array([column[s] for s in symbols[has_history]], dtype=int)
+    quantity = np.array([item.quantity for item in lots], dtype=float)
+    cost = quantity * np.array([item.purchase_price for item in lots], dtype=float) * fx[lot_symbol]
+    purchased = np.array([item.purchase_date for item in lots], dtype="datetime64[D]")
+
+    dates = closes.index.values.astype("datetime64[D]")
+    held = dates[None, :] >= purchased[:, None]  # lots x dates
+
+    # Quantity held per symbol per date, then value against the close matrix;
+    # a lot dated before its symbol's first close adds cost but no value
+    held_quantity = np.zeros((len(closes.columns), len(dates)))
+    np.add.at(held_quantity, lot_symbol, held * quantity[:, None])
+    value = (held_quantity * np.nan_to_num(closes.to_numpy()).T).sum(axis=0)
+    cost_basis = (held * cost[:, None]).sum(axis=0)
+
+    return {
+        "period": period,
+        "currency": currency,
+        "points": [
+            {"date": d, "value": float(v), "cost_basis": float(c)}
+            for d, v, c in zip(np.datetime_as_string(dates, unit="D"), value, cost_basis)
+        ],
+        "missing_symbols": missing
+    }
+
+
+def portfolio_version(items: List[Portfolio]) -> str:
+    """Stable hash of a portfolio's lots; changes whenever a lot changes"""
+    lots = sorted(
+        (item.id, item.stock_symbol.upper(), item.quantity, item.purchase_price, str(item.purchase_date))
+        for item in items
+    )
+    return hashlib.sha1(repr(lots).encode("utf-8")).hexdigest()[:16]
+
+
+def compute_portfolio_risk(
+    items: List[Portfolio],
+    benchmark: str = "^GSPC",
+    period: str = "1y",
+    base_currency: Optional[str] = None
+) -> Dict:
+    """Risk metrics from one aligned daily returns matrix.
+
+    Weights are the current value of each symbol's total holding, converted
+    into `base_currency` (see reporting_currency), which is also the currency
+    of the VaR amount. Returns a dict matching the PortfolioRisk schema.
+    """
+    benchmark = benchmark.upper()
+    symbols = np.array([item.stock_symbol.upper() for item in items])
+    unique_symbols = np.unique(symbols).tolist()
+    result = {
+        "period": period,
+        "benchmark": benchmark,
+        "currency": reporting_currency(unique_symbols, base_currency),
+        "observations": 0,
+        "weights": {},
+        "correlation": {"symbols": [], "matrix": []},
+        "missing_symbols": unique_symbols
+    }
+    if not items:
+        return result
+
+    closes = close_matrix(unique_symbols + [benchmark], period)
+    holdings = [s for s in unique_symbols if s in closes.columns]
+    result["missing_symbols"] = sorted(set(unique_symbols) - set(holdings))
+    if not holdings:
+        return result
+
+    # Each symbol's returns start after its first close. The portfolio series
+    # covers the dates on which every holding has a return.
+    returns = closes.pct_change(fill_method=None).iloc[1:]
+    common = returns[holdings].dropna()
+    if len(common) < 2:
+        return result
+    holding_returns = common.to_numpy()  # dates x holdings
+
+    # Current value weights
+    column = {symbol: j for j, symbol in enumerate(holdings)}
+    priced = np.array([s in column for s in symbols])
+    quantity = np.zeros(len(holdings))
+    np.add.at(
+        quantity,
+        [column[s] for s in symbols[priced]],
+        np.array([item.quantity for item in items], dtype=float)[priced]
+    )
+    last_close = closes[holdings].iloc[-1].to_numpy()
+    fx = rate_vector([currency_for_symbol(s) for s in holdings], result["currency"])
+    value = quantity * last_close * fx
+    total_value = float(value.sum())
+    weights = value / total_value if total_value > 0 else np.full(len(holdings), 1 / len(holdings))
+
+    portfolio_returns = holding_returns @ weights
+    mean_daily = portfolio_returns.mean()
+    volatility = portfolio_returns.std(ddof=1) * np.sqrt(TRADING_DAYS_PER_YEAR)
+    annual_return = mean_daily * TRADING_DAYS_PER_YEAR
+
+    growth = np.cumprod(1 + portfolio_returns)
+    drawdown = growth / np.maximum.accumulate(growth) - 1
+
+    # Historical one-day 95% VaR, reported as a positive loss
+    value_at_risk = max(0.0, -float(np.percentile(portfolio_returns, 5)))
+
+    beta = None
+    if benchmark in returns.columns:
+        benchmark_returns = returns[benchmark].reindex(common.index).to_numpy()
+        both = ~np.isnan(benchmark_returns)
+        if both.sum() >= 2:
+            benchmark_variance = benchmark_returns[both].var(ddof=1)
+            if benchmark_variance > 0:
+                beta = float(
+                    np.cov(portfolio_returns[both], benchmark_returns[both], ddof=1)[0, 1] / benchmark_variance
+                )
+
+    # Pairwise-complete, so each pair uses every date both symbols traded
+    correlation = returns[holdings].corr().to_numpy()
+
+    result.update({
+        "observations": int(len(portfolio_returns)),
+        "annual_return": float(annual_return),
+        "volatility": float(volatility),
+        "beta": beta,
+        "sharpe_ratio": float((annual_return - settings.RISK_FREE_RATE) / volatility) if volatility > 0 else None,
+        "max_drawdown": float(drawdown.min()),
+        "value_at_risk_95": value_at_risk,
+        "value_at_risk_95_amount": value_at_risk * total_value,
+        "weights": {symbol: float(w) for symbol, w in zip(holdings, weights)},
+        "correlation": {
+            "symbols": holdings,
+            "matrix": np.nan_to_num(correlation).round(4).tolist()
+        }
+    })
+    return result
+
+
+def get_portfolio_risk(
+    user_id: int,
+    items: List[Portfolio],
+    benchmark: str = "^GSPC",
+    period: str = "1y",
+    base_currency: Optional[str] = None
+) -> Dict:
+    """Cached compute_portfolio_risk, keyed by the portfolio's version"""
+    cache_key = f"portfolio_risk:{user_id}:{portfolio_version(items)}:{benchmark.upper()}:{period}:{base_currency or ''}"
+    cached = get_cache(cache_key)
+    if cached:
+        return cached
+
+    risk = compute_portfolio_risk(items, benchmark, period, base_currency)
+    set_cache(cache_key, risk, ttl=RISK_CACHE_TTL)
+    return risk
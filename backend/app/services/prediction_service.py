@@ -1,150 +1,315 @@
-import yfinance as yf
+import uuid
+import numpy as np
 import pandas as pd
-from prophet import Prophet
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
 from typing import List, Dict, Optional
+from sqlalchemy import and_, insert, or_
 from app.services.cache_service import get_cache, set_cache
+from app.services.forecasters import add_fit_observer, fit_forecast, history_to_prophet_frame
 from app.database import SessionLocal
 from app.models.prediction import Prediction
+from app.models.prediction_metric import PredictionMetric
+from app.services.market_data import exchange_today, get_history_frame, get_history_records
+from app.utils.metrics import record_forecast_fit
+
+add_fit_observer(record_forecast_fit)
+
+# Forecasts are always computed for the longest horizon the API serves and
+# sliced per request, so one fit answers every `days` value. Runs carry
+# STALE_RUN_DAYS of extra horizon so a stored run still covers every request
+# until the next nightly run, across weekends and a missed night.
+MAX_PREDICTION_DAYS = 90
+STALE_RUN_DAYS = 7
+FORECAST_HORIZON_DAYS = MAX_PREDICTION_DAYS + STALE_RUN_DAYS
+PREDICTION_CACHE_TTL = 86400  # 24 hours
+
+# Covers the full forecast horizon of any run still being scored
+ACCURACY_HISTORY_PERIOD = "6mo"
+
+# Single writer so on-demand forecasts are persisted after the response is sent
+_persist_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prediction-writer")
+
+
+def prediction_cache_key(symbol: str) -> str:
+    return f"prediction:{symbol.upper()}"
+
+
+def save_prediction_run(symbol: str, predictions: List[Dict], training_cutoff: date) -> Optional[str]:
+    """Persist one forecast run with a single bulk insert.
+
+    Earlier runs are kept so accuracy can be measured against them later.
+    Returns the run id, or None if the write failed.
+    """
+    run_id = uuid.uuid4().hex
+    rows = [
+        {
+            "stock_symbol": symbol.upper(),
+            "run_id": run_id,
+            "training_cutoff": training_cutoff,
+            "predicted_date": datetime.strptime(pred["date"], "%Y-%m-%d").date(),
+            "predicted_price": pred["predicted_price"],
+            "lower_bound": pred["lower_bound"],
+            "upper_bound": pred["upper_bound"],
+            "confidence": pred["upper_bound"] - pred["lower_bound"]
+        }
+        for pred in predictions
+    ]
+    if not rows:
+        return None
+
+    db = SessionLocal()
+    try:
+        db.execute(insert(Prediction), rows)
+        db.commit()
+        return run_id
+    except Exception as e:
+        db.rollback()
+        print(f"✗ Error saving predictions for {symbol.upper()}: {e}")
+        return None
+    finally:
+        db.close()
+
+
+def save_prediction_run_async(symbol: str, predictions: List[Dict], training_cutoff: date) -> None:
+    """Queue a forecast run for persistence off the request path"""
+    _persist_executor.submit(save_prediction_run, symbol, predictions, training_cutoff)
+
+
+def load_stored_predictions(symbol: str) -> List[Dict]:
+    """Read the future dates of the latest persisted run for a symbol"""
+    db = SessionLocal()
+    try:
+        latest = db.query(Prediction.run_id).filter(
+            Prediction.stock_symbol == symbol.upper(),
+            Prediction.run_id.isnot(None)
+        ).order_by(Prediction.created_at.desc(), Prediction.id.desc()).first()
+        if latest is None:
+            return []
+
+        rows = db.query(Prediction).filter(
+            Prediction.stock_symbol == symbol.upper(),
+            Prediction.run_id == latest.run_id,
+            Prediction.predicted_date > datetime.now().date()
+        ).order_by(Prediction.predicted_date).all()
+
+        return [
+            {
+                "date": row.predicted_date.strftime("%Y-%m-%d"),
+                "predicted_price": row.predicted_price,
+                "lower_bound": row.lower_bound,
+                "upper_bound": row.upper_bound
+            }
+            for row in rows
+        ]
+    except Exception:
+        return []
+    finally:
+        db.close()
+
+
+def compute_prediction(symbol: str) -> List[Dict]:
+    """Fetch history and fit a full-horizon forecast for one symbol.
+
+    The result is cached immediately; the database write happens in the
+    background.
+    """
+    # 2 years of history through the shared repository, reusing any cached copy
+    hist = get_history_frame(symbol, "2y")
+
+    if hist.empty or len(hist) < 30:
+        raise ValueError("Insufficient historical data")
+
+    df = history_to_prophet_frame(hist)
+    predictions = fit_forecast(df, FORECAST_HORIZON_DAYS)
+    save_prediction_run_async(symbol, predictions, df['ds'].max().date())
+    set_cache(prediction_cache_key(symbol), predictions, ttl=PREDICTION_CACHE_TTL)
+    return predictions
+
+
+def upcoming_predictions(predictions: List[Dict]) -> List[Dict]:
+    """Predictions dated after today; a run starts the day after its last close"""
+    today = datetime.now().strftime("%Y-%m-%d")
+    return [pred for pred in predictions if pred["date"] > today]
 
 
 def predict_stock_price(symbol: str, days: int = 30) -> List[Dict]:
-    cache_key = f"prediction:{symbol.upper()}:{days}"
+    """Return the forecast for a symbol.
+
+    Forecasts for tracked symbols are produced by the nightly batch pipeline
+    (see forecast_pipeline), so this is normally a cache or database lookup.
+    Untracked symbols fall back to an on-demand fit.
+    """
+    cache_key = prediction_cache_key(symbol)
     cached = get_cache(cache_key)
     if cached:
-        return cached
-    
+        upcoming = upcoming_predictions(cached)
+        if len(upcoming) >= days:
+            return upcoming[:days]
+
+    stored = load_stored_predictions(symbol)
+    if len(stored) >= days:
+        set_cache(cache_key, stored, ttl=PREDICTION_CACHE_TTL)
+        return stored[:days]
+
     try:
-        # Fetch 2 years of historical data
-        ticker = yf.Ticker(symbol.upper())
-        hist = ticker.history(period="2y")
-        
-        if hist.empty or len(hist) < 30:
-            raise ValueError("Insufficient historical data")
-        
-        # Prepare data for Prophet - remove timezone from dates
-        df = pd.DataFrame({
-            'ds': hist.index.tz_localize(None) if hist.index.tz else hist.index,
-            'y': hist['Close'].values
-        })
-        df.reset_index(drop=True, inplace=True)
-        
-        # Train Prophet model - suppress logging
-        import logging
-        import warnings
-        warnings.filterwarnings('ignore')
-        logging.getLogger('prophet').setLevel(logging.ERROR)
-        logging.getLogger('cmdstanpy').setLevel(logging.ERROR)
-        
-        try:
-            model = Prophet(
-                yearly_seasonality=True,
-                weekly_seasonality=True,
-                daily_seasonality=False,
-                changepoint_prior_scale=0.05
-            )
-        except AttributeError:
-            # Workaround for stan_backend issue in Prophet 1.2.1
-            model = Prophet(
-                yearly_seasonality=True,
-                weekly_seasonality=True,
-                daily_seasonality=False,
-                changepoint_prior_scale=0.05
-            )
-            # Manually set stan_backend to avoid the error
-            if not hasattr(model, 'stan_backend'):
-                model.stan_backend = None
-        
-        model.fit(df)
-        
-        # Make future predictions
-        future = model.make_future_dataframe(periods=days)
-        forecast = model.predict(future)
-        
-        # Get predictions for future dates only
-        predictions = []
-        last_historical_date = df['ds'].max()
-        
-        for _, row in forecast.iterrows():
-            if row['ds'] > last_historical_date:
-                predictions.append({
-                    "date": row['ds'].strftime("%Y-%m-%d"),
-                    "predicted_price": float(row['yhat']),
-                    "lower_bound": float(row['yhat_lower']),
-                    "upper_bound": float(row['yhat_upper'])
-                })
-        
-        # Save to database
-        db = SessionLocal()
-        try:
-            # Delete old predictions for this symbol
-            db.query(Prediction).filter(Prediction.stock_symbol == symbol.upper()).delete()
-            
-            # Save new predictions
-            for pred in predictions[:days]:
-                db_prediction = Prediction(
-                    stock_symbol=symbol.upper(),
-                    predicted_date=datetime.strptime(pred["date"], "%Y-%m-%d").date(),
-                    predicted_price=pred["predicted_price"],
-                    confidence=pred["upper_bound"] - pred["lower_bound"]
-                )
-                db.add(db_prediction)
-            db.commit()
-        except Exception:
-            db.rollback()
-        finally:
-            db.close()
-        
-        set_cache(cache_key, predictions, ttl=86400)  # 24 hours
-        return predictions
+        return upcoming_predictions(compute_prediction(symbol))[:days]
     except Exception as e:
         raise ValueError(f"Error generating prediction: {str(e)}")
 
 
+def closes_from_history(history: List[Dict]) -> pd.Series:
+    """Daily closes indexed by date from market data history records"""
+    if not history:
+        return pd.Series(dtype=float)
+    frame = pd.DataFrame.from_records(history, columns=["date", "close"])
+    return pd.Series(
+        frame["close"].to_numpy(dtype=float),
+        index=pd.to_datetime(frame["date"]).dt.date
+    )
+
+
+def update_prediction_metrics(symbol: str, closes: Optional[pd.Series] = None) -> int:
+    """Fold newly available actual closes into the per-run accuracy metrics.
+
+    Only predictions dated after a run's last evaluated date are read (the
+    bound is applied in SQL, so a pass does not grow with kept runs) and joined
+    against `closes` (a date-indexed Series), and the results are added to
+    the running sums. Today's bar is left out: during the session its close
+    is the latest trade, and once a date is scored it is never revisited.
+    Returns the number of newly scored predictions.
+    """
+    symbol = symbol.upper()
+    if closes is None:
+        closes = closes_from_history(get_history_records(symbol, ACCURACY_HISTORY_PERIOD))
+    closes = closes[closes.index < exchange_today(symbol)]
+    if closes.empty:
+        return 0
+
+    db = SessionLocal()
+    try:
+        metrics = {
+            metric.run_id: metric
+            for metric in db.query(PredictionMetric).filter(PredictionMetric.stock_symbol == symbol).all()
+        }
+        rows = db.query(
+            Prediction.run_id,
+            Prediction.predicted_date,
+            Prediction.predicted_price,
+            Prediction.lower_bound,
+            Prediction.upper_bound
+        ).outerjoin(
+            PredictionMetric,
+            and_(PredictionMetric.stock_symbol == Prediction.stock_symbol,
+                 PredictionMetric.run_id == Prediction.run_id)
+        ).filter(
+            Prediction.stock_symbol == symbol,
+            Prediction.run_id.isnot(None),
+            # Only predictions not yet folded into their run's metrics, and
+            # only dates `closes` can score
+            or_(
+                PredictionMetric.last_actual_date.is_(None),
+                Prediction.predicted_date > PredictionMetric.last_actual_date
+            ),
+            Prediction.predicted_date >= min(closes.index),
+            Prediction.predicted_date <= max(closes.index)
+        ).all()
+        if not rows:
+            return 0
+
+        predicted = pd.DataFrame.from_records(
+            rows, columns=["run_id", "date", "predicted", "lower", "upper"]
+        )
+        actual = closes.rename("actual").rename_axis("date").reset_index()
+        joined = predicted.merge(actual, on="date", how="inner")
+
+        joined = joined[joined["actual"] > 0]
+        if joined.empty:
+            return 0
+
+        error = joined["actual"].to_numpy() - joined["predicted"].to_numpy()
+        joined = joined.assign(
+            abs_pct_error=np.abs(error) / joined["actual"].to_numpy(),
+            squared_error=error ** 2,
+            covered=(
+                (joined["actual"] >= joined["lower"]) & (joined["actual"] <= joined["upper"])
+            ).astype(int)
+        )
+        per_run = joined.groupby("run_id").agg(
+            samples=("date", "size"),
+            sum_abs_pct_error=("abs_pct_error", "sum"),
+            sum_squared_error=("squared_error", "sum"),
+            covered=("covered", "sum"),
+            last_actual_date=("date", "max")
+        )
+
+        for run_id, agg in per_run.iterrows():
+            metric = metrics.get(run_id)
+            if metric is None:
+                metric = PredictionMetric(
+                    stock_symbol=symbol, run_id=run_id, samples=0,
+                    sum_abs_pct_error=0.0, sum_squared_error=0.0, covered=0
+                )
+                db.add(metric)
+            metric.samples += int(agg["samples"])
+            metric.sum_abs_pct_error += float(agg["sum_abs_pct_error"])
+            metric.sum_squared_error += float(agg["sum_squared_error"])
+            metric.covered += int(agg["covered"])
+            metric.last_actual_date = agg["last_actual_date"]
+            metric.mape = metric.sum_abs_pct_error / metric.samples * 100
+            metric.rmse = float(np.sqrt(metric.sum_squared_error / metric.samples))
+            metric.coverage = metric.covered / metric.samples * 100
+
+        db.commit()
+        return len(joined)
+    except Exception as e:
+        db.rollback()
+        print(f"✗ Error updating prediction metrics for {symbol}: {e}")
+        return 0
+    finally:
+        db.close()
+
+
 def get_prediction_accuracy(symbol: str) -> Dict:
+    """Aggregate the materialized per-run metrics for a symbol"""
+    symbol = symbol.upper()
     try:
-        ticker = yf.Ticker(symbol.upper())
-        hist = ticker.history(period="1mo")
-        
-        if hist.empty:
-            return {"accuracy": 0, "message": "Insufficient data"}
-        
-        # Get stored predictions
+        # Metrics are refreshed nightly by the forecast pipeline; symbols
+        # outside the pipeline are brought up to date at most once an hour.
+        refresh_key = f"prediction_metrics_refreshed:{symbol}"
+        if not get_cache(refresh_key):
+            update_prediction_metrics(symbol)
+            set_cache(refresh_key, True, ttl=3600)
+
         db = SessionLocal()
         try:
-            predictions = db.query(Prediction).filter(
-                Prediction.stock_symbol == symbol.upper()
+            metrics = db.query(PredictionMetric).filter(
+                PredictionMetric.stock_symbol == symbol,
+                PredictionMetric.samples > 0
             ).all()
-            
-            if not predictions:
-                return {"accuracy": 0, "message": "No predictions available"}
-            
-            # Compare with actual prices
-            actual_prices = []
-            predicted_prices = []
-            
-            for pred in predictions:
-                pred_date = pred.predicted_date
-                if pred_date in hist.index.date:
-                    actual = hist.loc[hist.index.date == pred_date, 'Close'].values
-                    if len(actual) > 0:
-                        actual_prices.append(float(actual[0]))
-                        predicted_prices.append(pred.predicted_price)
-            
-            if not actual_prices:
+            if not metrics:
+                has_predictions = db.query(Prediction.id).filter(
+                    Prediction.stock_symbol == symbol
+                ).first()
+                if not has_predictions:
+                    return {"accuracy": 0, "message": "No predictions available"}
                 return {"accuracy": 0, "message": "No matching dates found"}
-            
-            # Calculate accuracy (1 - MAPE)
-            mape = sum(abs(a - p) / a for a, p in zip(actual_prices, predicted_prices)) / len(actual_prices)
-            accuracy = max(0, (1 - mape) * 100)
-            
-            return {
-                "accuracy": round(accuracy, 2),
-                "mape": round(mape * 100, 2),
-                "samples": len(actual_prices)
-            }
         finally:
             db.close()
+
+        samples = sum(m.samples for m in metrics)
+        mape = sum(m.sum_abs_pct_error for m in metrics) / samples
+        rmse = float(np.sqrt(sum(m.sum_squared_error for m in metrics) / samples))
+        coverage = sum(m.covered for m in metrics) / samples
+        accuracy = max(0, (1 - mape) * 100)
+
+        return {
+            "accuracy": round(accuracy, 2),
+            "mape": round(mape * 100, 2),
+            "rmse": round(rmse, 4),
+            "coverage": round(coverage * 100, 2),
+            "samples": samples,
+            "runs": len(metrics)
+        }
     except Exception:
         return {"accuracy": 0, "message": "Error calculating accuracy"}
-
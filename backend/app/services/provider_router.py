@@ -0,0 +1,227 @@
+"""
+Adaptive provider routing.
+
+Search, news and FX rates are each available from several providers. A
+ProviderRouter holds one adapter per provider for a data type and orders
+them by a live score, so calls go to whichever source is currently the
+fastest and most reliable instead of a hard-coded order:
+
+- latency and error rate are exponentially weighted moving averages of the
+  router's own calls, so a provider that slows down or starts failing is
+  demoted within a few requests;
+- providers with a request quota are penalised as it runs down and skipped
+  once it is spent;
+- after repeated consecutive failures a provider is put in a cooldown and
+  only tried as a last resort until it expires;
+- a provider that has not been called for PROBE_SECONDS (or ever) is tried
+  first once, so every provider gets sampled and a demoted one can recover
+  after an outage.
+
+Probes go in registration order, so the first calls follow the previous
+hard-coded provider order.
+"""
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional
+from app.config import settings
+from app.utils.metrics import PROVIDER_SCORE
+
+# Weight of the newest sample in the moving averages
+EWMA_ALPHA = 0.2
+
+# Latency assumed for a provider with no samples yet (seconds)
+PRIOR_LATENCY = 1.0
+
+# Seconds a failed call is assumed to cost on top of its own latency (the
+# fallback to the next provider)
+FAILURE_PENALTY = 2.0
+
+# Consecutive failures before a cooldown; cooldown doubles up to the maximum
+COOLDOWN_AFTER_FAILURES = 3
+COOLDOWN_SECONDS = 30
+MAX_COOLDOWN_SECONDS = 600
+
+# Idle providers are re-probed after this long
+PROBE_SECONDS = 60
+
+# Below this share of quota left, a provider's score is scaled up
+QUOTA_LOW_WATERMARK = 0.2
+
+
+class ProviderError(Exception):
+    """An adapter got an unusable answer (error status, rate-limit notice)"""
+
+
+class RequestQuota:
+    """Sliding-window request count for a provider's plan limit (per process)"""
+
+    def __init__(self, limit: int, window_seconds: float):
+        self.limit = limit
+        self.window = window_seconds
+        self.calls: Deque[float] = deque()
+        self.lock = threading.Lock()
+
+    def _expire(self, now: float) -> None:
+        while self.calls and self.calls[0] <= now - self.window:
+            self.calls.popleft()
+
+    def record(self) -> None:
+        with self.lock:
+            now = time.monotonic()
+            self._expire(now)
+            self.calls.append(now)
+
+    def exhaust(self) -> None:
+        """The provider said the quota is spent: treat the window as full"""
+        with self.lock:
+            now = time.monotonic()
+            self._expire(now)
+            self.calls.extend([now] * max(0, self.limit - len(self.calls)))
+
+    def remaining(self) -> float:
+        """Share of the quota left in the current window, 0.0 - 1.0"""
+        if self.limit <= 0:
+            return 1.0
+        with self.lock:
+            self._expire(time.monotonic())
+            return max(0.0, 1 - len(self.calls) / self.limit)
+
+
+# Plan limits of the REST providers, shared by every router using them
+PROVIDER_QUOTAS: Dict[str, RequestQuota] = {
+    "alpha_vantage": RequestQuota(settings.ALPHA_VANTAGE_REQUESTS_PER_DAY, 86400),
+    "finnhub": RequestQuota(settings.FINNHUB_REQUESTS_PER_MINUTE, 60),
+}
+
+
+def record_provider_request(provider: str) -> None:
+    quota = PROVIDER_QUOTAS.get(provider)
+    if quota:
+        quota.record()
+
+
+def exhaust_provider_quota(provider: str) -> None:
+    quota = PROVIDER_QUOTAS.get(provider)
+    if quota:
+        quota.exhaust()
+
+
+@dataclass
+class Adapter:
+    name: str
+    fetch: Callable[..., Any]
+    # False while the provider cannot be used at all (no API key, circuit open)
+    available: Callable[[], bool] = lambda: True
+    # Share of the provider's request budget left, 0.0 - 1.0
+    quota: Optional[Callable[[], float]] = None
+    latency: Optional[float] = None
+    error_rate: float = 0.0
+    consecutive_failures: int = 0
+    cooldown_until: float = 0.0
+    last_called: float = float("-inf")
+    calls: int = 0
+
+
+class ProviderRouter:
+    """Routes calls for one data type to the best-scoring provider"""
+
+    def __init__(self, data_type: str, adapters: List[Adapter]):
+        self.data_type = data_type
+        self.adapters = {adapter.name: adapter for adapter in adapters}
+        self.lock = threading.Lock()
+        for adapter in adapters:
+            PROVIDER_SCORE.labels(data_type, adapter.name).set(self.score(adapter))
+
+    def _quota_left(self, adapter: Adapter) -> float:
+        if adapter.quota is None:
+            quota = PROVIDER_QUOTAS.get(adapter.name)
+            return quota.remaining() if quota else 1.0
+        return adapter.quota()
+
+    def score(self, adapter: Adapter) -> float:
+        """Expected seconds to an answer from this provider; lower is better"""
+        latency = PRIOR_LATENCY if adapter.latency is None else adapter.latency
+        expected = latency + adapter.error_rate * FAILURE_PENALTY
+        quota_left = self._quota_left(adapter)
+        if quota_left < QUOTA_LOW_WATERMARK:
+            expected *= QUOTA_LOW_WATERMARK / max(quota_left, 0.01)
+        return expected
+
+    def ranked(self) -> List[str]:
+        """Usable providers, best first; cooling-down providers go last"""
+        now = time.monotonic()
+        ready, cooling, idle = [], [], []
+        with self.lock:
+            for adapter in self.adapters.values():
+                quota_left = self._quota_left(adapter)
+                if not adapter.available() or quota_left <= 0:
+                    continue
+                if adapter.cooldown_until > now:
+                    cooling.append(adapter)
+                elif now - adapter.last_called > PROBE_SECONDS and quota_left >= QUOTA_LOW_WATERMARK:
+                    # Never called, or not for a while: its statistics are stale
+                    idle.append(adapter)
+                else:
+                    ready.append(adapter)
+            ready.sort(key=self.score)
+            cooling.sort(key=lambda a: a.cooldown_until)
+            # Probe at most one idle provider per call; the rest rank normally
+            if idle:
+                idle.sort(key=lambda a: a.last_called)
+                probe = idle[0]
+                probe.last_called = now
+                ready = [probe] + sorted(ready + idle[1:], key=self.score)
+        return [adapter.name for adapter in ready + cooling]
+
+    def record(self, name: str, latency: float, ok: bool) -> None:
+        with self.lock:
+            adapter = self.adapters[name]
+            adapter.calls += 1
+            adapter.last_called = time.monotonic()
+            if adapter.latency is None:
+                adapter.latency = latency
+            else:
+                adapter.latency += EWMA_ALPHA * (latency - adapter.latency)
+            adapter.error_rate += EWMA_ALPHA * ((0.0 if ok else 1.0) - adapter.error_rate)
+            if ok:
+                adapter.consecutive_failures = 0
+                adapter.cooldown_until = 0.0
+            else:
+                adapter.consecutive_failures += 1
+                extra = adapter.consecutive_failures - COOLDOWN_AFTER_FAILURES
+                if extra >= 0:
+                    cooldown = min(COOLDOWN_SECONDS * 2 ** extra, MAX_COOLDOWN_SECONDS)
+                    adapter.cooldown_until = adapter.last_called + cooldown
+            score = self.score(adapter)
+        PROVIDER_SCORE.labels(self.data_type, name).set(score)
+
+    def call(self, name: str, *args, **kwargs) -> Any:
+        """Call one provider's adapter, recording its latency and outcome"""
+        started = time.perf_counter()
+        try:
+            result = self.adapters[name].fetch(*args, **kwargs)
+        except Exception:
+            self.record(name, time.perf_counter() - started, ok=False)
+            raise
+        self.record(name, time.perf_counter() - started, ok=True)
+        return result
+
+    def first(self, *args, **kwargs) -> Any:
+        """Result of the best provider that returns a non-empty answer.
+
+        Providers are tried in ranked order; failures are logged and the
+        next provider is tried. Returns the last (empty) answer, or None,
+        when none has data.
+        """
+        result = None
+        for name in self.ranked():
+            try:
+                result = self.call(name, *args, **kwargs)
+            except Exception as e:
+                print(f"✗ {name} {self.data_type} error: {e}")
+                continue
+            if result:
+                return result
+        return result
@@ -0,0 +1,184 @@
+"""
+In-process quote fan-out hub.
+
+A single refresher task fetches every subscribed or pinned symbol upstream
+every refresh_seconds with one bulk request through stock_service (sharing
+its circuit breaker and request budget, and updating the cached quotes that
+request handlers read), and only changed quotes are pushed to subscriber
+queues. Each tick costs one upstream request however many symbols or
+clients there are. Each queue may hold at most `max_symbols` subscriptions,
+and streams may add symbols only while the hub refreshes fewer than
+`max_total_symbols`, so streaming cannot grow the bulk request without bound.
+"""
+import asyncio
+from typing import Callable, Dict, Iterable, List, Optional, Set
+from app.config import settings
+from app.services.stock_service import refresh_quotes
+from app.services.symbol_registry import INVALID, lookup_many
+from app.utils.tracing import detach_trace
+
+QUEUE_SIZE = 100
+
+
+class SubscriptionLimitExceeded(ValueError):
+    """A subscribe would take a queue, or the hub, past its symbol limit"""
+
+# Fields that define a visible quote change
+QUOTE_FIELDS = ("current_price", "change", "change_percent", "volume")
+
+
+def _fetch_quotes(symbols: List[str]) -> Dict:
+    """Bulk quotes for the symbols not known to be invalid.
+
+    Unknown symbols that verify as invalid after they were subscribed drop
+    out of the bulk request here.
+    """
+    statuses = lookup_many(symbols)
+    return refresh_quotes([symbol for symbol in symbols if statuses.get(symbol) != INVALID])
+
+
+class QuoteHub:
+    def __init__(self, refresh_seconds: float, max_symbols: int, max_total_symbols: int):
+        self.refresh_seconds = refresh_seconds
+        self.max_symbols = max_symbols
+        self.max_total_symbols = max_total_symbols
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._queue_symbols: Dict[asyncio.Queue, Set[str]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._latest: Dict[str, Dict] = {}
+        self._pinned: Set[str] = set()
+        self._listeners: List[Callable[[str, Dict], None]] = []
+
+    def add_listener(self, callback: Callable[[str, Dict], None]) -> None:
+        """Call `callback(symbol, quote)` on every changed quote"""
+        self._listeners.append(callback)
+
+    def latest(self, symbol: str) -> Optional[Dict]:
+        return self._latest.get(symbol.upper())
+
+    def symbols(self) -> List[str]:
+        return sorted(set(self._subscribers) | self._pinned)
+
+    def pin(self, symbol: str) -> None:
+        """Keep a symbol refreshing even without subscribers.
+
+        Pins are not limited by `max_total_symbols`, but count towards it.
+        """
+        self._pinned.add(symbol.upper())
+        self._ensure_refresher()
+
+    def unpin(self, symbol: str) -> None:
+        self._pinned.discard(symbol.upper())
+        self._stop_if_idle()
+
+    def subscribe(self, queue: asyncio.Queue, symbols: Iterable[str]) -> None:
+        """Add symbols to a queue's subscriptions, all or none.
+
+        Raises SubscriptionLimitExceeded if the queue would then hold more
+        than `max_symbols` symbols, or the hub would refresh more than
+        `max_total_symbols`.
+        """
+        symbols = {s.upper() for s in symbols}
+        current = self._queue_symbols.get(queue, set())
+        if len(current | symbols) > self.max_symbols:
+            raise SubscriptionLimitExceeded(
+                f"At most {self.max_symbols} symbols per connection ({len(current)} subscribed)"
+            )
+        refreshed = set(self._subscribers) | self._pinned
+        if len(refreshed | symbols) > self.max_total_symbols:
+            raise SubscriptionLimitExceeded(
+                f"The server is streaming its maximum of {self.max_total_symbols} symbols; try again later"
+            )
+        self._queue_symbols[queue] = current | symbols
+        for symbol in symbols:
+            self._subscribers.setdefault(symbol, set()).add(queue)
+            if symbol in self._latest:
+                self._offer(queue, self._latest[symbol])
+        self._ensure_refresher()
+
+    def unsubscribe(self, queue: asyncio.Queue, symbols: Optional[Iterable[str]] = None) -> None:
+        subscribed = self._queue_symbols.get(queue, set())
+        targets = {s.upper() for s in symbols} & subscribed if symbols is not None else set(subscribed)
+        remaining = subscribed - targets
+        if remaining:
+            self._queue_symbols[queue] = remaining
+        else:
+            self._queue_symbols.pop(queue, None)
+        for symbol in targets:
+            queues = self._subscribers.get(symbol)
+            if queues is None:
+                continue
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[symbol]
+        self._stop_if_idle()
+
+    def new_queue(self) -> asyncio.Queue:
+        return asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    def _ensure_refresher(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._refresh())
+
+    def _stop_if_idle(self) -> None:
+        if self._subscribers or self._pinned or self._task is None:
+            return
+        self._task.cancel()
+        self._task = None
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, quote: Dict) -> None:
+        # Slow consumers lose their oldest update rather than blocking the hub
+        if queue.full():
+            try:
+                queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+        queue.put_nowait(quote)
+
+    def publish(self, symbol: str, quote: Dict) -> bool:
+        """Fan a quote out if it differs from the last one; returns True if sent"""
+        symbol = symbol.upper()
+        previous = self._latest.get(symbol)
+        if previous and all(previous.get(f) == quote.get(f) for f in QUOTE_FIELDS):
+            return False
+
+        self._latest[symbol] = quote
+        for queue in list(self._subscribers.get(symbol, ())):
+            self._offer(queue, quote)
+        for listener in self._listeners:
+            try:
+                listener(symbol, quote)
+            except Exception as e:
+                print(f"Quote listener error for {symbol}: {e}")
+        return True
+
+    async def _refresh(self) -> None:
+        # Started from a request (stream subscribe, new alert), but outlives it
+        detach_trace()
+        while True:
+            symbols = self.symbols()
+            try:
+                # One bulk request per tick for every symbol; request handlers
+                # read the quotes this writes to the cache
+                quotes = await asyncio.to_thread(_fetch_quotes, symbols)
+                for symbol, info in quotes.items():
+                    self.publish(symbol, info.model_dump())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Quote refresh error for {len(symbols)} symbols: {e}")
+            await asyncio.sleep(self.refresh_seconds)
+
+    async def close(self) -> None:
+        task, self._task = self._task, None
+        if task:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+
+quote_hub = QuoteHub(
+    settings.QUOTE_REFRESH_SECONDS,
+    settings.QUOTE_STREAM_MAX_SYMBOLS,
+    settings.QUOTE_HUB_MAX_SYMBOLS
+)
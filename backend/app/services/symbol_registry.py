@@ -0,0 +1,213 @@
+"""
+Registry of known-valid and known-invalid stock symbols.
+
+Filled from the symbol master and from every successful quote or search,
+and shared between workers through Redis with an in-process copy in front.
+Watchlist and portfolio writes check it in constant time instead of calling
+Yahoo Finance; unknown symbols are verified in the background.
+
+Valid symbols are kept in a Redis set. An invalid verdict is kept for
+SYMBOL_INVALID_TTL_SECONDS only (one expiring key per symbol), so a symbol
+that was wrongly rejected, or that gets listed later, is checked again.
+"""
+import csv
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Set
+from app.config import settings
+from app.services.cache_service import (
+    add_to_set,
+    are_set_members,
+    delete_cache,
+    get_cache,
+    get_cache_many,
+    is_set_member,
+    set_cache
+)
+from app.services.market_data import SymbolNotFound
+
+VALID_KEY = "symbols:valid"
+INVALID_KEY_PREFIX = "symbols:invalid:"
+
+VALID = "valid"
+INVALID = "invalid"
+UNKNOWN = "unknown"
+
+# Built-in symbol master, also used by search as a last-resort match
+COMMON_STOCKS = {
+    'aapl': ('AAPL', 'Apple Inc.'),
+    'msft': ('MSFT', 'Microsoft Corporation'),
+    'googl': ('GOOGL', 'Alphabet Inc.'),
+    'tsla': ('TSLA', 'Tesla, Inc.'),
+    'amzn': ('AMZN', 'Amazon.com, Inc.'),
+    'meta': ('META', 'Meta Platforms, Inc.'),
+    'nvda': ('NVDA', 'NVIDIA Corporation'),
+    'jpm': ('JPM', 'JPMorgan Chase & Co.'),
+    'v': ('V', 'Visa Inc.'),
+    'wmt': ('WMT', 'Walmart Inc.')
+}
+
+_valid: Set[str] = set()
+# Symbol -> time.time() at which its invalid verdict expires
+_invalid: Dict[str, float] = {}
+
+# Symbols with a verification queued or running in this process
+_verifying: Set[str] = set()
+_verifying_lock = threading.Lock()
+
+
+def _invalid_key(symbol: str) -> str:
+    return f"{INVALID_KEY_PREFIX}{symbol}"
+
+
+def _known_invalid(symbol: str) -> bool:
+    expires = _invalid.get(symbol)
+    if expires is None:
+        return False
+    if expires <= time.time():
+        _invalid.pop(symbol, None)
+        return False
+    return True
+
+
+def _remember_invalid(symbol: str, expires) -> bool:
+    """Copy an invalid verdict read from Redis; False if it has expired"""
+    if not isinstance(expires, (int, float)) or expires <= time.time():
+        return False
+    _invalid[symbol] = float(expires)
+    return True
+
+
+def load_symbol_master() -> int:
+    """Seed the registry from the built-in list and SYMBOL_MASTER_PATH.
+
+    The master file is a CSV whose `symbol` column (or first column) lists
+    valid Yahoo Finance symbols. Returns the number of symbols loaded.
+    """
+    symbols = {symbol for symbol, _ in COMMON_STOCKS.values()}
+
+    path = settings.SYMBOL_MASTER_PATH
+    if path and os.path.exists(path):
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            header = [cell.strip().lower() for cell in next(reader, [])]
+            if "symbol" in header:
+                column = header.index("symbol")
+            else:
+                # No header row: the first row is data
+                column = 0
+                if header and header[0]:
+                    symbols.add(header[0].upper())
+            symbols.update(row[column].strip().upper() for row in reader if len(row) > column and row[column].strip())
+
+    record_valid(*symbols)
+    print(f"✓ Symbol registry loaded {len(symbols)} symbols")
+    return len(symbols)
+
+
+def record_valid(*symbols: str) -> None:
+    symbols = [s.upper() for s in symbols if s]
+    if not symbols:
+        return
+    _valid.update(symbols)
+    for symbol in symbols:
+        _invalid.pop(symbol, None)
+    add_to_set(VALID_KEY, *symbols)
+    delete_cache(*[_invalid_key(symbol) for symbol in symbols])
+
+
+def record_invalid(symbol: str) -> None:
+    symbol = symbol.upper()
+    if symbol in _valid:
+        return
+    ttl = settings.SYMBOL_INVALID_TTL_SECONDS
+    _invalid[symbol] = time.time() + ttl
+    set_cache(_invalid_key(symbol), _invalid[symbol], ttl=ttl)
+
+
+def lookup(symbol: str) -> str:
+    """VALID, INVALID or UNKNOWN for a symbol, without any upstream call"""
+    symbol = symbol.upper()
+    if symbol in _valid:
+        return VALID
+    if _known_invalid(symbol):
+        return INVALID
+
+    # Another worker may have learned about it
+    if is_set_member(VALID_KEY, symbol):
+        _valid.add(symbol)
+        return VALID
+    if _remember_invalid(symbol, get_cache(_invalid_key(symbol))):
+        return INVALID
+    return UNKNOWN
+
+
+def lookup_many(symbols: Iterable[str]) -> dict:
+    """lookup() for a batch of symbols, with at most two Redis round trips"""
+    result = {}
+    pending = []
+    for symbol in {s.upper() for s in symbols}:
+        if symbol in _valid:
+            result[symbol] = VALID
+        elif _known_invalid(symbol):
+            result[symbol] = INVALID
+        else:
+            pending.append(symbol)
+    if not pending:
+        return result
+
+    valid_flags = are_set_members(VALID_KEY, pending) or [False] * len(pending)
+    still_pending = []
+    for symbol, is_valid in zip(pending, valid_flags):
+        if is_valid:
+            _valid.add(symbol)
+            result[symbol] = VALID
+        else:
+            still_pending.append(symbol)
+
+    expiries = get_cache_many([_invalid_key(symbol) for symbol in still_pending]) or [None] * len(still_pending)
+    for symbol, expires in zip(still_pending, expiries):
+        result[symbol] = INVALID if _remember_invalid(symbol, expires) else UNKNOWN
+    return result
+
+
+def claim_verifications(symbols: Iterable[str], limit: int) -> List[str]:
+    """Symbols the caller should pass to verify_symbol: at most `limit`, and
+    none that is already queued or being verified.
+
+    The rest stay unknown and are verified when they are next added or
+    quoted, so one large request cannot drain the Yahoo budget.
+    """
+    claimed = []
+    with _verifying_lock:
+        for symbol in symbols:
+            if len(claimed) >= limit:
+                break
+            symbol = symbol.upper()
+            if symbol not in _verifying:
+                _verifying.add(symbol)
+                claimed.append(symbol)
+    return claimed
+
+
+def verify_symbol(symbol: str) -> str:
+    """Check an unknown symbol upstream and record the outcome.
+
+    Meant to run as a background task. Only a definite "no data for this
+    symbol" marks it invalid; network errors, rate limiting and a spent
+    budget leave it unknown so it is checked again later.
+    """
+    from app.services.stock_service import get_stock_info
+
+    try:
+        get_stock_info(symbol)  # records the symbol as valid on success
+        return VALID
+    except SymbolNotFound:
+        record_invalid(symbol)
+        return INVALID
+    except Exception:
+        return UNKNOWN
+    finally:
+        with _verifying_lock:
+            _verifying.discard(symbol.upper())
@@ -0,0 +1,202 @@
+"""
+Record/replay cassettes for upstream provider calls.
+
+With CASSETTE_MODE=record every Yahoo Finance call and provider_get request
+made through market_data is passed through and its result (or error) and
+latency appended to a gzipped JSON-lines cassette per provider in
+CASSETTE_DIR. With CASSETTE_MODE=replay the same calls are answered from
+those cassettes without network access: each response is served after its
+recorded latency, or after CASSETTE_LATENCY_MS when that is set, and
+recorded errors are raised again so rate limiting and outages reproduce.
+
+Calls are matched on provider, operation and arguments. API keys and
+date-window parameters are left out of the match so cassettes recorded
+with one key, on one day, replay with another. Repeated calls with the
+same arguments replay their recordings in order, wrapping around.
+"""
+import gzip
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+import orjson
+import pandas as pd
+from app.config import settings
+
+# Query parameters that carry credentials or move with the clock
+UNMATCHED_PARAMS = {"apikey", "token", "from", "to"}
+
+
+class CassetteMiss(Exception):
+    """Replay mode got a call that was never recorded"""
+
+
+class ReplayedError(Exception):
+    """An upstream error recorded in a cassette, raised again on replay"""
+
+
+class ReplayedResponse:
+    """The parts of requests.Response the services read"""
+
+    def __init__(self, status_code: int, text: str):
+        self.status_code = status_code
+        self.text = text
+
+    def json(self) -> Any:
+        return orjson.loads(self.text)
+
+
+def encode_frame(frame: pd.DataFrame) -> Dict:
+    columns = [list(c) if isinstance(c, tuple) else c for c in frame.columns]
+    dates = isinstance(frame.index, pd.DatetimeIndex)
+    return {
+        "index": [ts.isoformat() for ts in frame.index] if dates else frame.index.tolist(),
+        "dates": dates,
+        "index_name": frame.index.name,
+        "tz": str(frame.index.tz) if getattr(frame.index, "tz", None) else None,
+        "columns": columns,
+        "data": frame.to_numpy().tolist(),
+    }
+
+
+def decode_frame(payload: Dict) -> pd.DataFrame:
+    columns = payload["columns"]
+    if columns and isinstance(columns[0], list):
+        columns = pd.MultiIndex.from_tuples([tuple(c) for c in columns])
+    if payload["dates"]:
+        index = pd.to_datetime(payload["index"], utc=bool(payload["tz"]))
+        if payload["tz"]:
+            index = index.tz_convert(payload["tz"])
+        index = pd.DatetimeIndex(index, name=payload["index_name"])
+    else:
+        index = pd.Index(payload["index"], name=payload["index_name"])
+    frame = pd.DataFrame(payload["data"], index=index, columns=columns)
+    return frame.apply(pd.to_numeric, errors="coerce")
+
+
+def encode_result(result: Any) -> Tuple[str, Any]:
+    if isinstance(result, pd.DataFrame):
+        return "frame", encode_frame(result)
+    if hasattr(result, "status_code") and hasattr(result, "text"):
+        return "response", {"status": result.status_code, "text": result.text}
+    return "json", result
+
+
+def decode_result(kind: str, body: Any) -> Any:
+    if kind == "frame":
+        return decode_frame(body)
+    if kind == "response":
+        return ReplayedResponse(body["status"], body["text"])
+    return body
+
+
+def redact(text: str) -> str:
+    """Replace provider API keys (which appear in URLs and error messages)"""
+    for secret in (settings.EXCHANGE_RATE_API_KEY, settings.ALPHA_VANTAGE_API_KEY, settings.FINNHUB_API_KEY):
+        if secret:
+            text = text.replace(secret, "{key}")
+    return text
+
+
+def request_key(url: str, params: Optional[Dict] = None) -> str:
+    """Match key for an HTTP request, without credentials or date windows"""
+    kept = sorted((k, str(v)) for k, v in (params or {}).items() if k not in UNMATCHED_PARAMS)
+    return redact(f"{url}?{urlencode(kept)}" if kept else url)
+
+
+class CassetteStore:
+    """Cassettes of one directory: appends in record mode, lookups in replay mode"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.lock = threading.Lock()
+        self.recordings: Optional[Dict[Tuple[str, str, str], List[Dict]]] = None
+        self.positions: Dict[Tuple[str, str, str], int] = defaultdict(int)
+
+    def path(self, provider: str) -> str:
+        return os.path.join(self.directory, f"{provider}.jsonl.gz")
+
+    def append(self, entry: Dict) -> None:
+        line = orjson.dumps(entry, default=str, option=orjson.OPT_SERIALIZE_NUMPY) + b"\n"
+        with self.lock:
+            os.makedirs(self.directory, exist_ok=True)
+            # Each append is its own gzip member; readers see one stream
+            with gzip.open(self.path(entry["provider"]), "ab") as f:
+                f.write(line)
+
+    def _load(self) -> Dict[Tuple[str, str, str], List[Dict]]:
+        recordings = defaultdict(list)
+        if os.path.isdir(self.directory):
+            for name in sorted(os.listdir(self.directory)):
+                if not name.endswith(".jsonl.gz"):
+                    continue
+                with gzip.open(os.path.join(self.directory, name), "rb") as f:
+                    for line in f:
+                        entry = orjson.loads(line)
+                        recordings[(entry["provider"], entry["operation"], entry["key"])].append(entry)
+        print(f"✓ Loaded {sum(map(len, recordings.values()))} recorded upstream calls from {self.directory}")
+        return recordings
+
+    def next(self, provider: str, operation: str, key: str) -> Dict:
+        with self.lock:
+            if self.recordings is None:
+                self.recordings = self._load()
+            entries = self.recordings.get((provider, operation, key))
+            if not entries:
+                raise CassetteMiss(f"No recorded {provider} {operation} call for {key}")
+            position = self.positions[(provider, operation, key)]
+            self.positions[(provider, operation, key)] = position + 1
+            return entries[position % len(entries)]
+
+
+_store: Optional[CassetteStore] = None
+
+
+def _get_store() -> CassetteStore:
+    global _store
+    if _store is None:
+        _store = CassetteStore(settings.CASSETTE_DIR)
+    return _store
+
+
+def upstream_call(provider: str, operation: str, key: str, fetch: Callable[[], Any]) -> Any:
+    """Run `fetch`, or record or replay it, depending on CASSETTE_MODE"""
+    mode = settings.CASSETTE_MODE
+    if not mode:
+        return fetch()
+
+    if mode == "replay":
+        entry = _get_store().next(provider, operation, key)
+        latency = entry["elapsed"] if settings.CASSETTE_LATENCY_MS is None else settings.CASSETTE_LATENCY_MS / 1000
+        if latency > 0:
+            time.sleep(latency)
+        if entry["kind"] == "error":
+            raise ReplayedError(entry["body"])
+        return decode_result(entry["kind"], entry["body"])
+
+    started = time.perf_counter()
+    try:
+        result = fetch()
+    except Exception as e:
+        _record(provider, operation, key, started, "error", redact(f"{type(e).__name__}: {e}"))
+        raise
+    _record(provider, operation, key, started, *encode_result(result))
+    return result
+
+
+def _record(provider: str, operation: str, key: str, started: float, kind: str, body: Any) -> None:
+    entry = {
+        "provider": provider,
+        "operation": operation,
+        "key": key,
+        "kind": kind,
+        "body": body,
+        "elapsed": round(time.perf_counter() - started, 4),
+        "recorded_at": time.time()
+    }
+    try:
+        _get_store().append(entry)
+    except Exception as e:
+        print(f"✗ Error writing cassette: {e}")
@@ -0,0 +1,27 @@
+from typing import Iterable
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+class SelectiveGZipMiddleware(GZipMiddleware):
+    """GZip responses above `minimum_size`, except on streaming endpoints.
+
+    Server-Sent Events must reach the client as each event is written; the
+    gzip stream would hold small events back in its buffer.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 500,
+        compresslevel: int = 9,
+        exclude_paths: Iterable[str] = ()
+    ) -> None:
+        super().__init__(app, minimum_size=minimum_size, compresslevel=compresslevel)
+        self.exclude_paths = tuple(exclude_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and scope["path"].startswith(self.exclude_paths):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
@@ -0,0 +1,49 @@
+import hashlib
+from typing import Any, Optional
+from fastapi import Request, Response
+
+# Cache-Control policies for market-data responses
+PUBLIC_SHORT = "public, max-age=60"
+PUBLIC_LONG = "public, max-age=300"
+PRIVATE_REVALIDATE = "private, no-cache"
+
+
+def make_etag(version: Any) -> str:
+    """Strong ETag from a cheap version value (tuple of identifying fields)"""
+    digest = hashlib.sha1(repr(version).encode("utf-8")).hexdigest()[:32]
+    return f'"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag in candidates
+
+
+def conditional_response(
+    request: Request,
+    response: Response,
+    version: Any,
+    cache_control: str
+) -> Optional[Response]:
+    """Tag a response with an ETag derived from `version`.
+
+    Returns a bodiless 304 response when the client already has this
+    version; otherwise sets ETag/Cache-Control on `response` and returns
+    None so the endpoint builds its body as usual.
+    """
+    etag = make_etag(version)
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if cache_control.startswith("private"):
+        headers["Vary"] = "Authorization"
+
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,173 @@
+"""
+Prometheus metrics.
+
+Counters and histograms are updated where the work happens (routes, cache,
+upstream providers, forecast fits); gauges that describe current state
+(circuit breaker, DB pools) are read when /metrics is scraped. Metrics are
+per process unless PROMETHEUS_MULTIPROC_DIR is set (to an empty directory
+shared by the workers); /metrics then merges every worker's samples, and
+gauges are reported per live worker.
+"""
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterator
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.utils.tracing import span
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Cache lookups by key namespace and result (hit, miss, unavailable)",
+    ["namespace", "result"]
+)
+
+UPSTREAM_REQUEST_DURATION = Histogram(
+    "upstream_request_duration_seconds",
+    "Latency of calls to market data providers",
+    ["provider", "operation"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30)
+)
+
+UPSTREAM_ERRORS = Counter(
+    "upstream_errors_total",
+    "Failed calls to market data providers",
+    ["provider", "operation", "kind"]
+)
+
+CIRCUIT_BREAKER_OPEN = Gauge(
+    "circuit_breaker_open",
+    "1 while the provider's circuit breaker is blocking requests",
+    ["provider"],
+    multiprocess_mode="liveall"
+)
+
+CIRCUIT_BREAKER_TRIPS = Counter(
+    "circuit_breaker_trips_total",
+    "Times the provider's circuit breaker opened",
+    ["provider"]
+)
+
+PROVIDER_SCORE = Gauge(
+    "provider_score",
+    "Routing score per data type and provider: expected seconds to an answer (lower is preferred)",
+    ["data_type", "provider"],
+    multiprocess_mode="liveall"
+)
+
+FORECAST_FIT_DURATION = Histogram(
+    "forecast_fit_duration_seconds",
+    "Forecast model fit and predict time",
+    ["engine"],
+    buckets=(0.1, 0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+)
+
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections",
+    "Database pool connections by state (size, checked_out, overflow)",
+    ["engine", "state"],
+    multiprocess_mode="liveall"
+)
+
+
+def cache_namespace(key: str) -> str:
+    """Metric label for a cache key: the part before the first colon"""
+    return key.split(":", 1)[0]
+
+
+def record_cache_lookup(key: str, result: str) -> None:
+    CACHE_REQUESTS.labels(cache_namespace(key), result).inc()
+
+
+@contextmanager
+def track_upstream(provider: str, operation: str, is_rate_limit=None) -> Iterator[None]:
+    """Time and trace an upstream call and count it as an error if it raises.
+
+    `is_rate_limit(error)` classifies errors as rate_limit instead of error.
+    """
+    started = time.perf_counter()
+    try:
+        with span(f"{provider}.{operation}", "upstream", provider=provider):
+            yield
+    except Exception as e:
+        kind = "rate_limit" if is_rate_limit and is_rate_limit(e) else "error"
+        UPSTREAM_ERRORS.labels(provider, operation, kind).inc()
+        raise
+    finally:
+        UPSTREAM_REQUEST_DURATION.labels(provider, operation).observe(time.perf_counter() - started)
+
+
+def record_forecast_fit(engine: str, seconds: float) -> None:
+    """forecasters fit observer; per process, so pipeline worker fits are
+    not visible to the API's /metrics"""
+    FORECAST_FIT_DURATION.labels(engine).observe(seconds)
+
+
+def latest_metrics() -> bytes:
+    """Exposition text for a scrape, merged across workers in multiprocess mode"""
+    if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        return generate_latest()
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry)
+
+
+def mark_process_dead() -> None:
+    """Drop this worker's live gauges from the shared directory on shutdown"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(os.getpid())
+
+
+def record_pool(name: str, engine) -> None:
+    """Copy a SQLAlchemy engine's pool counters into DB_POOL_CONNECTIONS"""
+    pool = getattr(engine, "pool", None)
+    for state, reader in (("size", "size"), ("checked_out", "checkedout"), ("overflow", "overflow")):
+        read = getattr(pool, reader, None)
+        if callable(read):
+            # QueuePool reports overflow as negative until the pool is full
+            DB_POOL_CONNECTIONS.labels(name, state).set(max(0, read()))
+
+
+class MetricsMiddleware:
+    """Record request latency labelled by route template (not raw path).
+
+    Unmatched paths share one label to keep cardinality bounded; event
+    streams are skipped because their duration is the connection lifetime.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = {"code": 500, "streaming": False}
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                for name, value in message.get("headers", []):
+                    if name == b"content-type" and value.startswith(b"text/event-stream"):
+                        status["streaming"] = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if not status["streaming"]:
+                route = scope.get("route")
+                HTTP_REQUEST_DURATION.labels(
+                    scope["method"],
+                    getattr(route, "path", "unmatched"),
+                    str(status["code"])
+                ).observe(time.perf_counter() - started)
@@ -1,14 +1,27 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 import bcrypt
 from app.config import settings
 
+# bcrypt releases the GIL, so a small thread pool keeps hashing off the event loop
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash"
+)
+_pending_hashes = 0
+
+
+class PasswordHasherBusy(Exception):
+    """The password hashing pool has PASSWORD_HASH_QUEUE_LIMIT calls waiting"""
+
 
 def hash_password(password: str) -> str:
     # Use bcrypt directly for better compatibility
     password_bytes = password.encode('utf-8')
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password_bytes, salt)
     return hashed.decode('utf-8')
 
@@ -19,6 +32,37 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(password_bytes, hashed_bytes)
 
 
+def needs_rehash(hashed_password: str) -> bool:
+    """True if the hash was made with a different BCRYPT_ROUNDS"""
+    try:
+        # $2b$<rounds>$<salt+hash>
+        return int(hashed_password.split("$")[2]) != settings.BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+
+async def _run_hasher(func, *args):
+    # Only touched from the event loop thread, so no lock is needed
+    global _pending_hashes
+    if _pending_hashes >= settings.PASSWORD_HASH_QUEUE_LIMIT:
+        raise PasswordHasherBusy()
+    _pending_hashes += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, func, *args)
+    finally:
+        _pending_hashes -= 1
+
+
+async def hash_password_async(password: str) -> str:
+    """hash_password on the bounded pool; raises PasswordHasherBusy when saturated"""
+    return await _run_hasher(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password on the bounded pool; raises PasswordHasherBusy when saturated"""
+    return await _run_hasher(verify_password, plain_password, hashed_password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if expires_delta:
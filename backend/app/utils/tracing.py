@@ -0,0 +1,295 @@
+"""
+Lightweight request tracing.
+
+Each HTTP request gets a trace (id from the X-Trace-Id request header, or a
+new one) held in a context variable, so any code running for that request
+can open nested spans without passing anything around:
+
+    with span("yahoo.history", "upstream", symbol=symbol):
+        ...
+
+Spans are grouped by category (cache, db, upstream, sleep, fit). The
+response carries the trace id and a Server-Timing header with the time spent
+per category, and finished traces can be exported as JSON lines to the log
+or POSTed to a local collector (TRACE_EXPORT). Outside a request, span() is
+a no-op.
+
+Settings are read when the first trace finishes, not at import, so code
+that only opens spans (forecasters, the offline backtest) needs no app
+configuration.
+"""
+import contextvars
+import json
+import queue
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import requests
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Server-Timing entries, in header order
+CATEGORIES = ("db", "cache", "upstream", "sleep", "fit")
+
+TRACE_ID_PATTERN = re.compile(r"^[0-9a-f]{16,32}$")
+EXPORT_QUEUE_SIZE = 1000
+
+
+class Span:
+    __slots__ = ("name", "category", "span_id", "parent_id", "start", "duration", "attributes", "error")
+
+    def __init__(self, name: str, category: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.category = category
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.start = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+
+class Trace:
+    def __init__(self, trace_id: str, name: str):
+        self.trace_id = trace_id
+        self.name = name
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.status: Optional[int] = None
+        # Appended from request threads too; list.append is atomic
+        self.spans: List[Span] = []
+
+    def totals(self) -> Dict[str, Dict[str, float]]:
+        """Time and span count per category, counting only top-level spans of each category"""
+        totals = {category: {"count": 0, "dur": 0.0} for category in CATEGORIES}
+        by_id = {s.span_id: s for s in self.spans}
+        for s in self.spans:
+            if s.duration is None or s.category not in totals:
+                continue
+            # A retry sleep inside an upstream span is reported under both
+            # categories, but nested spans of the same category are not double counted
+            parent = by_id.get(s.parent_id)
+            while parent is not None and parent.category != s.category:
+                parent = by_id.get(parent.parent_id)
+            if parent is not None:
+                continue
+            totals[s.category]["count"] += 1
+            totals[s.category]["dur"] += s.duration
+        return totals
+
+    def server_timing(self) -> str:
+        entries = []
+        for category, total in self.totals().items():
+            if total["count"]:
+                entries.append(f'{category};desc="{int(total["count"])} calls";dur={total["dur"] * 1000:.1f}')
+        entries.append(f"total;dur={(time.perf_counter() - self.start) * 1000:.1f}")
+        return ", ".join(entries)
+
+    def to_dict(self) -> Dict:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": round((self.duration or 0) * 1000, 3),
+            "status": self.status,
+            "spans": [
+                {
+                    "span_id": s.span_id,
+                    "parent_id": s.parent_id,
+                    "name": s.name,
+                    "category": s.category,
+                    "offset_ms": round((s.start - self.start) * 1000, 3),
+                    "duration_ms": round(s.duration * 1000, 3),
+                    "attributes": s.attributes,
+                    "error": s.error
+                }
+                for s in self.spans if s.duration is not None
+            ]
+        }
+
+
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("current_trace", default=None)
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+
+def current_trace_id() -> Optional[str]:
+    trace = _current_trace.get()
+    return trace.trace_id if trace else None
+
+
+def detach_trace() -> None:
+    """Stop tracing in the current context.
+
+    For long-lived tasks started while handling a request: asyncio copies
+    the caller's context into the task, which would otherwise keep adding
+    spans to that request's trace.
+    """
+    _current_trace.set(None)
+    _current_span.set(None)
+
+
+def start_span(name: str, category: str, **attributes) -> Optional[Span]:
+    """Open a span without making it the parent of later spans (for event hooks)"""
+    trace = _current_trace.get()
+    if trace is None or trace.duration is not None:
+        # No request, or work outliving the request it was started from
+        return None
+    parent = _current_span.get()
+    new_span = Span(name, category, parent.span_id if parent else None, attributes)
+    trace.spans.append(new_span)
+    return new_span
+
+
+def end_span(new_span: Optional[Span], error: Optional[BaseException] = None) -> None:
+    if new_span is None or new_span.duration is not None:
+        return
+    new_span.duration = time.perf_counter() - new_span.start
+    if error is not None:
+        new_span.error = f"{type(error).__name__}: {error}"
+
+
+@contextmanager
+def span(name: str, category: str, **attributes) -> Iterator[Optional[Span]]:
+    """Time the block as a child of the current span"""
+    new_span = start_span(name, category, **attributes)
+    if new_span is None:
+        yield None
+        return
+    token = _current_span.set(new_span)
+    try:
+        yield new_span
+    except BaseException as e:
+        end_span(new_span, e)
+        raise
+    finally:
+        _current_span.reset(token)
+        end_span(new_span)
+
+
+def traced_sleep(seconds: float, reason: str) -> None:
+    """time.sleep recorded as a `sleep` span (retry backoff, rate limiting)"""
+    with span(f"sleep.{reason}", "sleep", seconds=round(seconds, 3)):
+        time.sleep(seconds)
+
+
+def in_current_context(func: Callable) -> Callable:
+    """Bind `func` to the caller's context, for executors that do not copy it"""
+    context = contextvars.copy_context()
+    # A context can only be entered by one thread at a time: copy per call
+    return lambda *args, **kwargs: context.copy().run(func, *args, **kwargs)
+
+
+def instrument_engine(engine, name: str) -> None:
+    """Record every query on a (sync) SQLAlchemy engine as a `db` span"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        operation = statement.lstrip().split(" ", 1)[0].upper()
+        context._trace_span = start_span(f"db.{operation.lower()}", "db", engine=name, statement=statement[:200])
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        end_span(getattr(context, "_trace_span", None))
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        context = exception_context.execution_context
+        if context is not None:
+            end_span(getattr(context, "_trace_span", None), exception_context.original_exception)
+
+
+class _Exporter:
+    """Writes finished traces to the log or POSTs them to a collector URL"""
+
+    def __init__(self, target: str):
+        self.target = target
+        self.queue: "queue.Queue[Dict]" = queue.Queue(maxsize=EXPORT_QUEUE_SIZE)
+        self.thread: Optional[threading.Thread] = None
+
+    def export(self, trace: Trace) -> None:
+        if self.target == "log":
+            print(f"TRACE {json.dumps(trace.to_dict())}")
+            return
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+            self.thread.start()
+        try:
+            self.queue.put_nowait(trace.to_dict())
+        except queue.Full:
+            pass  # never slow requests down for tracing
+
+    def _run(self) -> None:
+        while True:
+            payload = self.queue.get()
+            try:
+                requests.post(self.target, json=payload, timeout=2)
+            except Exception as e:
+                print(f"Trace export error: {e}")
+
+
+_exporter: Optional[_Exporter] = None
+_exporter_loaded = False
+
+
+def _get_exporter() -> Optional[_Exporter]:
+    """The TRACE_EXPORT exporter (None when export is off), created on first use"""
+    global _exporter, _exporter_loaded
+    if not _exporter_loaded:
+        from app.config import settings
+        _exporter = _Exporter(settings.TRACE_EXPORT) if settings.TRACE_EXPORT else None
+        _exporter_loaded = True
+    return _exporter
+
+
+def _export(trace: Trace, streaming: bool) -> None:
+    exporter = _get_exporter()
+    if exporter is None or streaming:
+        return
+    from app.config import settings
+    if trace.duration * 1000 >= settings.TRACE_EXPORT_MIN_MS:
+        exporter.export(trace)
+
+
+class TracingMiddleware:
+    """Open a trace per HTTP request and report it in the response headers"""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = dict(scope.get("headers", [])).get(b"x-trace-id", b"").decode("latin-1").lower()
+        trace_id = incoming if TRACE_ID_PATTERN.match(incoming) else uuid.uuid4().hex
+        trace = Trace(trace_id, f"{scope['method']} {scope['path']}")
+        streaming = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal streaming
+            if message["type"] == "http.response.start":
+                trace.status = message["status"]
+                headers = MutableHeaders(scope=message)
+                streaming = headers.get("content-type", "").startswith("text/event-stream")
+                headers["X-Trace-Id"] = trace_id
+                headers["Server-Timing"] = trace.server_timing()
+            await send(message)
+
+        trace_token = _current_trace.set(trace)
+        span_token = _current_span.set(None)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_span.reset(span_token)
+            _current_trace.reset(trace_token)
+            trace.duration = time.perf_counter() - trace.start
+            route = scope.get("route")
+            if route is not None:
+                trace.name = f"{scope['method']} {route.path}"
+            _export(trace, streaming)
@@ -0,0 +1,227 @@
+"""
+Offline walk-forward backtest and benchmark harness for the forecasting engines.
+
+Replays stored daily price series (one CSV per symbol) through every engine in
+app.services.forecasters with walk-forward splits, and reports fit time,
+predict time, peak memory and error metrics per symbol and engine.
+
+Usage:
+    # One-off, online: store 5 years of history for later offline runs
+    python benchmarks/backtest.py snapshot AAPL MSFT RELIANCE.NS
+
+    # Offline: replay the stored series
+    python benchmarks/backtest.py run AAPL MSFT --engines prophet naive drift \\
+        --splits 4 --horizon 30 --output results.jsonl
+
+Engines whose optional dependency is not installed (prophet) are reported as
+skipped and the remaining engines still run.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from app.services.forecasters import FORECASTERS  # noqa: E402
+
+DEFAULT_DATA_DIR = os.path.join(BACKEND_DIR, "benchmarks", "data")
+
+
+def series_path(data_dir: str, symbol: str) -> str:
+    return os.path.join(data_dir, f"{symbol.upper()}.csv")
+
+
+def snapshot(symbols: List[str], data_dir: str, period: str) -> None:
+    """Download and store history so later runs need no network access"""
+    import yfinance as yf
+
+    os.makedirs(data_dir, exist_ok=True)
+    for symbol in symbols:
+        hist = yf.Ticker(symbol.upper()).history(period=period)
+        if hist.empty:
+            print(f"✗ {symbol.upper()}: no data")
+            continue
+        frame = pd.DataFrame({
+            "date": hist.index.tz_localize(None) if hist.index.tz else hist.index,
+            "close": hist["Close"].to_numpy()
+        })
+        frame.to_csv(series_path(data_dir, symbol), index=False)
+        print(f"✓ {symbol.upper()}: {len(frame)} rows")
+
+
+def load_series(data_dir: str, symbol: str) -> pd.DataFrame:
+    """Read a stored series as a Prophet-style ds/y frame"""
+    frame = pd.read_csv(series_path(data_dir, symbol))
+    frame.columns = [c.lower() for c in frame.columns]
+    return pd.DataFrame({
+        "ds": pd.to_datetime(frame["date"], utc=True).dt.tz_localize(None),
+        "y": frame["close"].astype(float)
+    }).dropna().reset_index(drop=True)
+
+
+def walk_forward_cutoffs(n: int, splits: int, horizon: int, min_train: int) -> List[int]:
+    """Training-set lengths for each split, ending one horizon before the data"""
+    last = n - horizon
+    first = max(min_train, last - (splits - 1) * horizon)
+    if first > last:
+        return []
+    return sorted({int(c) for c in np.linspace(first, last, splits)})
+
+
+def score(forecast: List[Dict], actual: pd.DataFrame) -> Dict:
+    predicted = pd.DataFrame(forecast)
+    predicted["ds"] = pd.to_datetime(predicted["date"])
+    joined = actual.merge(predicted, on="ds", how="inner")
+    if joined.empty:
+        return {"samples": 0}
+
+    y = joined["y"].to_numpy()
+    error = y - joined["predicted_price"].to_numpy()
+    covered = (y >= joined["lower_bound"].to_numpy()) & (y <= joined["upper_bound"].to_numpy())
+    return {
+        "samples": int(len(joined)),
+        "mape": float(np.mean(np.abs(error) / y) * 100),
+        "rmse": float(np.sqrt(np.mean(error ** 2))),
+        "coverage": float(covered.mean() * 100)
+    }
+
+
+def run_split(engine: str, train: pd.DataFrame, test: pd.DataFrame, horizon_days: int) -> Dict:
+    fit, predict = FORECASTERS[engine]
+
+    tracemalloc.start()
+    try:
+        started = time.perf_counter()
+        model = fit(train)
+        fitted = time.perf_counter()
+        forecast = predict(model, train, horizon_days)
+        finished = time.perf_counter()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "fit_seconds": fitted - started,
+        "predict_seconds": finished - fitted,
+        "peak_memory_mb": peak / 1024 / 1024,
+        **score(forecast, test)
+    }
+
+
+def backtest_symbol(symbol: str, series: pd.DataFrame, engines: List[str],
+                    splits: int, horizon: int, min_train: int,
+                    skipped: Dict[str, str]) -> List[Dict]:
+    """Results per engine; engines that fail to import their dependency are
+    added to `skipped` (engine -> error) and left out of later symbols"""
+    results = []
+    cutoffs = walk_forward_cutoffs(len(series), splits, horizon, min_train)
+    for engine in engines:
+        if engine in skipped:
+            continue
+        split_results = []
+        try:
+            for cutoff in cutoffs:
+                train = series.iloc[:cutoff]
+                test = series.iloc[cutoff:cutoff + horizon]
+                # Horizon is in trading days; engines forecast calendar days
+                horizon_days = (test["ds"].max() - train["ds"].max()).days
+                split_results.append(run_split(engine, train, test, horizon_days))
+        except ImportError as e:
+            skipped[engine] = str(e)
+            print(f"- {engine}: skipped ({e})")
+            continue
+
+        scored = [r for r in split_results if r["samples"]]
+        results.append({
+            "symbol": symbol.upper(),
+            "engine": engine,
+            "splits": len(split_results),
+            "observations": len(series),
+            "fit_seconds": float(np.mean([r["fit_seconds"] for r in split_results])) if split_results else None,
+            "predict_seconds": float(np.mean([r["predict_seconds"] for r in split_results])) if split_results else None,
+            "peak_memory_mb": float(max(r["peak_memory_mb"] for r in split_results)) if split_results else None,
+            "mape": float(np.mean([r["mape"] for r in scored])) if scored else None,
+            "rmse": float(np.mean([r["rmse"] for r in scored])) if scored else None,
+            "coverage": float(np.mean([r["coverage"] for r in scored])) if scored else None,
+            "samples": sum(r["samples"] for r in split_results)
+        })
+    return results
+
+
+def run(args) -> int:
+    environment = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "splits": args.splits,
+        "horizon": args.horizon,
+        "min_train": args.min_train
+    }
+    out = open(args.output, "w") if args.output else None
+    failures = 0
+    skipped: Dict[str, str] = {}
+
+    print(f"{'symbol':<14}{'engine':<10}{'fit s':>8}{'pred s':>8}{'mem MB':>9}{'MAPE %':>9}{'RMSE':>10}{'cov %':>8}")
+    for symbol in args.symbols:
+        try:
+            series = load_series(args.data_dir, symbol)
+        except FileNotFoundError:
+            print(f"✗ {symbol.upper()}: no stored series in {args.data_dir} (run 'snapshot' first)")
+            failures += 1
+            continue
+
+        for result in backtest_symbol(symbol, series, args.engines, args.splits, args.horizon, args.min_train, skipped):
+            print(
+                f"{result['symbol']:<14}{result['engine']:<10}"
+                f"{result['fit_seconds'] or 0:>8.3f}{result['predict_seconds'] or 0:>8.3f}"
+                f"{result['peak_memory_mb'] or 0:>9.1f}{result['mape'] or 0:>9.2f}"
+                f"{result['rmse'] or 0:>10.3f}{result['coverage'] or 0:>8.1f}"
+            )
+            if out:
+                out.write(json.dumps({**result, "environment": environment}) + "\n")
+
+    if out:
+        out.close()
+    if skipped:
+        print(f"Skipped engines (dependency not installed): {', '.join(sorted(skipped))}")
+    max_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"Process max RSS: {max_rss_mb:.1f} MB")
+    return 1 if failures else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Walk-forward backtest for forecasting engines")
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR, help="Directory of stored <SYMBOL>.csv series")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    snap = sub.add_parser("snapshot", help="Download and store history (requires network)")
+    snap.add_argument("symbols", nargs="+")
+    snap.add_argument("--period", default="5y")
+
+    bt = sub.add_parser("run", help="Replay stored series offline")
+    bt.add_argument("symbols", nargs="+")
+    bt.add_argument("--engines", nargs="+", default=list(FORECASTERS), choices=list(FORECASTERS))
+    bt.add_argument("--splits", type=int, default=4, help="Walk-forward splits per symbol")
+    bt.add_argument("--horizon", type=int, default=30, help="Test window in trading days")
+    bt.add_argument("--min-train", type=int, default=250, help="Minimum training observations")
+    bt.add_argument("--output", help="Write JSON lines results to this file")
+
+    args = parser.parse_args()
+    if args.command == "snapshot":
+        snapshot(args.symbols, args.data_dir, args.period)
+        return 0
+    return run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""
+Summarize recorded upstream cassettes.
+
+Lists, per provider and operation, how many calls a cassette directory
+holds, how many were errors, and the recorded latency distribution, so a
+recording from a slow period can be compared with a normal one before it
+is replayed.
+
+Usage:
+    python benchmarks/cassettes.py cassettes/
+    python benchmarks/cassettes.py cassettes/ --output cassettes.json
+
+Record with CASSETTE_MODE=record (and CASSETTE_DIR) on a running server;
+replay with CASSETTE_MODE=replay or `benchmarks/load_test.py --replay DIR`.
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+from collections import defaultdict
+
+import numpy as np
+import orjson
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Upstream cassette summary")
+    parser.add_argument("directory", help="CASSETTE_DIR of a recording")
+    parser.add_argument("--output", help="Write JSON results to this file")
+    return parser.parse_args()
+
+
+def summarize(directory):
+    calls = defaultdict(list)
+    errors = defaultdict(int)
+    keys = defaultdict(set)
+    sizes = {}
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".jsonl.gz"):
+            continue
+        path = os.path.join(directory, name)
+        sizes[name] = os.path.getsize(path)
+        with gzip.open(path, "rb") as f:
+            for line in f:
+                entry = orjson.loads(line)
+                group = f"{entry['provider']}.{entry['operation']}"
+                calls[group].append(entry["elapsed"] * 1000)
+                keys[group].add(entry["key"])
+                errors[group] += entry["kind"] == "error"
+
+    summary = {}
+    for group, latencies in sorted(calls.items()):
+        ms = np.array(latencies)
+        summary[group] = {
+            "calls": len(latencies),
+            "distinct": len(keys[group]),
+            "errors": errors[group],
+            "p50_ms": float(np.percentile(ms, 50)),
+            "p99_ms": float(np.percentile(ms, 99)),
+            "max_ms": float(ms.max()),
+        }
+    return summary, sizes
+
+
+def main():
+    args = parse_args()
+    summary, sizes = summarize(args.directory)
+    print(f"{'provider.operation':<28}{'calls':>7}{'distinct':>10}{'errors':>8}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for group, s in summary.items():
+        print(f"{group:<28}{s['calls']:>7}{s['distinct']:>10}{s['errors']:>8}"
+              f"{s['p50_ms']:>9.1f}{s['p99_ms']:>9.1f}{s['max_ms']:>9.1f}")
+    print(f"\n{sum(sizes.values()) / 1024:.1f} KiB in {len(sizes)} cassette files")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"directory": args.directory, "operations": summary, "file_bytes": sizes}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
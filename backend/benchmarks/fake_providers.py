@@ -0,0 +1,414 @@
+"""
+Offline stand-ins for the market-data providers and Redis, for benchmarks.
+
+FakeMarket serves deterministic synthetic data in the shapes the services
+expect from yfinance (Ticker.history/info/news, download) and from the
+Alpha Vantage, Finnhub and ExchangeRate-API REST endpoints. Every call
+sleeps for a configurable latency and can fail at a configurable rate, per
+provider. MemoryRedis implements the Redis commands cache_service and the
+alert engine use, including publish/subscribe within the process.
+
+    market = FakeMarket(latency_ms=50, error_rates={"yahoo": 0.05})
+    install(market)   # before the app serves its first request
+"""
+import fnmatch
+import json
+import queue
+import random
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+import numpy as np
+import pandas as pd
+
+PROVIDERS = ("yahoo", "alpha_vantage", "finnhub", "exchangerate")
+
+# Trading days per yfinance period
+PERIOD_ROWS = {"1d": 1, "5d": 5, "1mo": 21, "3mo": 63, "6mo": 126, "1y": 252, "2y": 504, "5y": 1260}
+
+# Synthetic USD rates; other currencies get a deterministic value
+USD_RATES = {"USD": 1.0, "EUR": 0.92, "GBP": 0.79, "INR": 83.5, "JPY": 150.2, "CAD": 1.36, "AUD": 1.52}
+
+
+class InjectedFailure(Exception):
+    pass
+
+
+def _seed(symbol: str) -> int:
+    return zlib.crc32(symbol.upper().encode())
+
+
+@lru_cache(maxsize=4096)
+def _price_series(symbol: str) -> pd.DataFrame:
+    """Five years of daily OHLCV bars, the same for a symbol on every run"""
+    rng = np.random.default_rng(_seed(symbol))
+    rows = PERIOD_ROWS["5y"]
+    if symbol.endswith("=X"):
+        currency = symbol[3:-2]
+        start = USD_RATES.get(currency, 1 + _seed(currency) % 200)
+        sigma = 0.004
+    else:
+        start = 20 + _seed(symbol) % 480
+        sigma = 0.018
+    close = start * np.exp(np.cumsum(rng.normal(0.0002, sigma, rows)))
+    spread = close * rng.uniform(0.002, 0.02, rows)
+    index = pd.bdate_range(end=datetime.now().date(), periods=rows, tz="America/New_York", name="Date")
+    return pd.DataFrame({
+        "Open": close + rng.uniform(-0.5, 0.5, rows) * spread,
+        "High": close + spread,
+        "Low": close - spread,
+        "Close": close,
+        "Volume": rng.integers(100_000, 50_000_000, rows),
+    }, index=index)
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, payload):
+        self.status_code = status_code
+        self._payload = payload
+
+    @property
+    def text(self) -> str:
+        return json.dumps(self._payload)
+
+    def json(self):
+        return self._payload
+
+
+class FakeTicker:
+    def __init__(self, market: "FakeMarket", symbol: str):
+        self.market = market
+        self.symbol = symbol.upper()
+
+    def history(self, period: str = "1mo", timeout: Optional[int] = None, **kwargs) -> pd.DataFrame:
+        self.market.call("yahoo")
+        return _price_series(self.symbol).iloc[-PERIOD_ROWS.get(period, 21):].copy()
+
+    @property
+    def info(self) -> Dict:
+        self.market.call("yahoo")
+        return {
+            "symbol": self.symbol,
+            "longName": f"{self.symbol} Holdings Inc.",
+            "shortName": self.symbol,
+            "exchange": "NMS",
+            "currency": "USD",
+            "marketCap": (_seed(self.symbol) % 2000 + 1) * 1_000_000_000,
+            "sector": "Technology",
+            "industry": "Software",
+        }
+
+    @property
+    def news(self) -> List[Dict]:
+        self.market.call("yahoo")
+        return self.market.news_items(self.symbol, "yahoo")
+
+
+class FakeYFinance:
+    """The parts of the yfinance module the services call"""
+
+    def __init__(self, market: "FakeMarket"):
+        self.market = market
+
+    def Ticker(self, symbol: str) -> FakeTicker:
+        return FakeTicker(self.market, symbol)
+
+    def download(self, symbols, period: str = "1mo", group_by: str = "ticker", **kwargs) -> pd.DataFrame:
+        """(ticker, field) columns, even for one ticker, as yfinance 1.x returns"""
+        self.market.call("yahoo")
+        if isinstance(symbols, str):
+            symbols = symbols.split()
+        rows = PERIOD_ROWS.get(period, 21)
+        frames = {symbol.upper(): _price_series(symbol.upper()).iloc[-rows:] for symbol in symbols}
+        return pd.concat(frames, axis=1)
+
+
+class FakeHTTP:
+    """requests.get for the REST providers, dispatched on host and path"""
+
+    def __init__(self, market: "FakeMarket"):
+        self.market = market
+
+    def get(self, url: str, params: Optional[Dict] = None, timeout: Optional[float] = None, **kwargs) -> FakeResponse:
+        params = params or {}
+        parsed = urlparse(url)
+        if "alphavantage" in parsed.netloc:
+            return self.market.respond("alpha_vantage", lambda: self._alpha_vantage(params))
+        if "finnhub" in parsed.netloc:
+            symbol = params.get("symbol", "")
+            return self.market.respond("finnhub", lambda: self.market.news_items(symbol, "finnhub"))
+        if "exchangerate" in parsed.netloc:
+            return self.market.respond("exchangerate", lambda: {
+                "result": "success",
+                "base_code": "USD",
+                "conversion_rates": USD_RATES
+            })
+        return FakeResponse(404, {"error": f"no fake for {url}"})
+
+    def _alpha_vantage(self, params: Dict) -> Dict:
+        if params.get("function") == "SYMBOL_SEARCH":
+            keywords = params.get("keywords", "").upper()
+            matches = [s for s in self.market.symbols if s.startswith(keywords)] or [keywords]
+            return {"bestMatches": [
+                {"1. symbol": s, "2. name": f"{s} Holdings Inc.", "4. region": "United States"}
+                for s in matches[:10]
+            ]}
+        return {"feed": self.market.news_items(params.get("tickers", ""), "alpha_vantage")}
+
+
+class FakeMarket:
+    """Synthetic market data with per-provider latency and error injection"""
+
+    def __init__(
+        self,
+        latency_ms: float = 50,
+        jitter_ms: float = 20,
+        error_rate: float = 0.0,
+        latencies: Optional[Dict[str, float]] = None,
+        error_rates: Optional[Dict[str, float]] = None,
+        symbols: Optional[List[str]] = None,
+        seed: int = 42
+    ):
+        self.latencies = {p: latency_ms for p in PROVIDERS}
+        self.latencies.update(latencies or {})
+        self.error_rates = {p: error_rate for p in PROVIDERS}
+        self.error_rates.update(error_rates or {})
+        self.jitter_ms = jitter_ms
+        self.symbols = [s.upper() for s in symbols or []]
+        self.calls = {p: 0 for p in PROVIDERS}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.yfinance = FakeYFinance(self)
+        self.http = FakeHTTP(self)
+
+    def _draw(self, provider: str):
+        with self._lock:
+            self.calls[provider] += 1
+            delay = max(0.0, self._rng.gauss(self.latencies[provider], self.jitter_ms)) / 1000
+            failed = self._rng.random() < self.error_rates[provider]
+        return delay, failed
+
+    def call(self, provider: str) -> None:
+        """Simulate one upstream round trip; raises on an injected failure"""
+        delay, failed = self._draw(provider)
+        time.sleep(delay)
+        if failed:
+            raise InjectedFailure(f"Injected {provider} failure")
+
+    def respond(self, provider: str, payload) -> FakeResponse:
+        delay, failed = self._draw(provider)
+        time.sleep(delay)
+        if failed:
+            return FakeResponse(503, {"error": "Injected failure"})
+        return FakeResponse(200, payload())
+
+    def news_items(self, symbol: str, provider: str) -> List[Dict]:
+        now = datetime.now()
+        items = []
+        for i in range(10):
+            published = now - timedelta(hours=6 * i)
+            headline = f"{symbol.upper()} update #{i + 1}"
+            link = f"https://news.example.com/{symbol.lower()}/{i + 1}"
+            if provider == "yahoo":
+                items.append({"title": headline, "link": link, "publisher": "Example Wire",
+                              "providerPublishTime": int(published.timestamp()), "summary": headline})
+            elif provider == "finnhub":
+                items.append({"headline": headline, "url": link, "source": "Example Wire",
+                              "datetime": int(published.timestamp()), "summary": headline, "image": ""})
+            else:
+                items.append({"title": headline, "url": link, "source": "Example Wire",
+                              "time_published": published.strftime("%Y%m%dT%H%M%S"), "summary": headline})
+        return items
+
+
+class MemoryRedis:
+    """In-process stand-in for the Redis commands cache_service uses"""
+
+    def __init__(self):
+        self._data: Dict[str, object] = {}
+        self._expires: Dict[str, float] = {}
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def _live(self, key: str):
+        expires = self._expires.get(key)
+        if expires is not None and expires <= time.monotonic():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return self._data.get(key)
+
+    def ping(self) -> bool:
+        return True
+
+    def get(self, key: str):
+        with self._lock:
+            return self._live(key)
+
+    def mget(self, keys: List[str]) -> List[object]:
+        with self._lock:
+            return [self._live(key) for key in keys]
+
+    def setex(self, key: str, ttl: int, value) -> bool:
+        with self._lock:
+            self._data[key] = value
+            self._expires[key] = time.monotonic() + ttl
+        return True
+
+    def set(self, key: str, value, nx: bool = False, ex: Optional[int] = None) -> Optional[bool]:
+        with self._lock:
+            if nx and self._live(key) is not None:
+                return None
+            self._data[key] = value
+            if ex is None:
+                self._expires.pop(key, None)
+            else:
+                self._expires[key] = time.monotonic() + ex
+            return True
+
+    def eval(self, script: str, numkeys: int, *args) -> int:
+        """Only the alert engine's lease scripts: extend (`expire`) or
+        delete the key if it still holds the expected value"""
+        key, expected = args[0], args[1]
+        with self._lock:
+            if self._live(key) != expected:
+                return 0
+            if "expire" in script:
+                self._expires[key] = time.monotonic() + int(args[2])
+            else:
+                self._data.pop(key, None)
+                self._expires.pop(key, None)
+            return 1
+
+    def publish(self, channel: str, message: str) -> int:
+        with self._lock:
+            subscribers = [pubsub for pubsub in self._subscribers if channel in pubsub.channels]
+        for pubsub in subscribers:
+            pubsub.messages.put({"type": "message", "channel": channel, "data": message})
+        return len(subscribers)
+
+    def pubsub(self, ignore_subscribe_messages: bool = False) -> "MemoryPubSub":
+        return MemoryPubSub(self)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            value = int(self._live(key) or 0) + 1
+            self._data[key] = str(value)
+            return value
+
+    def expire(self, key: str, ttl: int) -> bool:
+        with self._lock:
+            if self._live(key) is None:
+                return False
+            self._expires[key] = time.monotonic() + ttl
+            return True
+
+    def pipeline(self) -> "MemoryPipeline":
+        return MemoryPipeline(self)
+
+    def delete(self, *keys: str) -> int:
+        with self._lock:
+            removed = 0
+            for key in keys:
+                removed += self._data.pop(key, None) is not None
+                self._expires.pop(key, None)
+            return removed
+
+    def keys(self, pattern: str = "*") -> List[str]:
+        with self._lock:
+            return [key for key in list(self._data) if self._live(key) is not None and fnmatch.fnmatchcase(key, pattern)]
+
+    def sadd(self, key: str, *members: str) -> int:
+        with self._lock:
+            members_set = self._data.setdefault(key, set())
+            before = len(members_set)
+            members_set.update(members)
+            return len(members_set) - before
+
+    def srem(self, key: str, *members: str) -> int:
+        with self._lock:
+            members_set = self._data.get(key, set())
+            before = len(members_set)
+            members_set.difference_update(members)
+            return before - len(members_set)
+
+    def sismember(self, key: str, member: str) -> bool:
+        with self._lock:
+            return member in self._data.get(key, set())
+
+    def smismember(self, key: str, members: List[str]) -> List[int]:
+        with self._lock:
+            members_set = self._data.get(key, set())
+            return [int(member in members_set) for member in members]
+
+    def flushall(self) -> bool:
+        with self._lock:
+            self._data.clear()
+            self._expires.clear()
+        return True
+
+
+class MemoryPipeline:
+    """Queues MemoryRedis commands and runs them in order on execute()"""
+
+    def __init__(self, redis_stand_in: MemoryRedis):
+        self._redis = redis_stand_in
+        self._commands = []
+
+    def __getattr__(self, name: str):
+        command = getattr(self._redis, name)
+
+        def queue(*args, **kwargs):
+            self._commands.append((command, args, kwargs))
+            return self
+        return queue
+
+    def execute(self) -> List[object]:
+        commands, self._commands = self._commands, []
+        return [command(*args, **kwargs) for command, args, kwargs in commands]
+
+
+class MemoryPubSub:
+    """Subscription to MemoryRedis channels"""
+
+    def __init__(self, redis_stand_in: MemoryRedis):
+        self._redis = redis_stand_in
+        self.channels = set()
+        self.messages = queue.Queue()
+
+    def subscribe(self, *channels: str) -> None:
+        self.channels.update(channels)
+        with self._redis._lock:
+            self._redis._subscribers.add(self)
+
+    def get_message(self, timeout: float = 0.0) -> Optional[Dict]:
+        try:
+            return self.messages.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self) -> None:
+        with self._redis._lock:
+            self._redis._subscribers.discard(self)
+
+
+def install_cache(redis_stand_in: Optional[MemoryRedis] = None) -> MemoryRedis:
+    """Point cache_service at an in-memory Redis"""
+    from app.services import cache_service
+
+    redis_stand_in = redis_stand_in or MemoryRedis()
+    cache_service.redis_client = redis_stand_in
+    return redis_stand_in
+
+
+def install(market: FakeMarket, redis_stand_in: Optional[MemoryRedis] = None) -> MemoryRedis:
+    """Route the app's upstream calls to `market` and its cache to an in-memory Redis"""
+    from app.services import market_data
+
+    market_data._yfinance = lambda: market.yfinance
+    market_data.requests = market.http
+    return install_cache(redis_stand_in)
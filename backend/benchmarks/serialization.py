@@ -0,0 +1,137 @@
+"""
+Response serialization benchmark for the largest API payloads.
+
+Builds synthetic payloads the size of real responses (1y/5y history, a 90-day
+prediction, a news list), serializes them the way FastAPI does for a
+`response_model` endpoint, and compares rendering with the stdlib encoder
+(JSONResponse, the previous default) against orjson (ORJSONResponse), plus
+the bytes on the wire with and without gzip.
+
+Usage:
+    python benchmarks/serialization.py
+    python benchmarks/serialization.py --repeat 500 --output serialization.json
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import List
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from fastapi.responses import JSONResponse, ORJSONResponse  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+from app.schemas.prediction import PredictionResponse  # noqa: E402
+from app.schemas.stock import NewsItem, StockHistory  # noqa: E402
+
+TRADING_DAYS = {"1y": 252, "5y": 1260}
+
+
+def history_payload(period: str) -> StockHistory:
+    rng = np.random.default_rng(42)
+    days = TRADING_DAYS[period]
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, days)))
+    start = date.today() - timedelta(days=int(days * 365 / 252))
+    return StockHistory(symbol="AAPL", period=period, data=[
+        {
+            "date": (start + timedelta(days=int(i * 365 / 252))).isoformat(),
+            "open": float(c * 0.995),
+            "high": float(c * 1.01),
+            "low": float(c * 0.99),
+            "close": float(c),
+            "volume": int(rng.integers(1_000_000, 90_000_000))
+        }
+        for i, c in enumerate(closes)
+    ])
+
+
+def prediction_payload() -> List[PredictionResponse]:
+    start = date.today()
+    return [
+        PredictionResponse(
+            date=(start + timedelta(days=i)).isoformat(),
+            predicted_price=180.0 + i * 0.1,
+            lower_bound=170.0 + i * 0.05,
+            upper_bound=190.0 + i * 0.15
+        )
+        for i in range(1, 91)
+    ]
+
+
+def news_payload() -> List[NewsItem]:
+    now = datetime.utcnow()
+    return [
+        NewsItem(
+            headline=f"Company announces quarterly results, item {i}",
+            summary="Revenue rose on strong services demand while hardware sales were flat. " * 3,
+            source="Newswire",
+            url=f"https://example.com/news/{i}",
+            datetime=now - timedelta(hours=i),
+            image=f"https://example.com/images/{i}.jpg"
+        )
+        for i in range(50)
+    ]
+
+
+def timed(func, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Response serialization benchmark")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--compresslevel", type=int, default=6, help="Matches GZIP_COMPRESS_LEVEL")
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    payloads = {
+        "history_1y": (StockHistory, history_payload("1y")),
+        "history_5y": (StockHistory, history_payload("5y")),
+        "predictions_90d": (List[PredictionResponse], prediction_payload()),
+        "news_50": (List[NewsItem], news_payload()),
+    }
+
+    results = {}
+    print(f"{'payload':<18}{'model ms':>10}{'json ms':>10}{'orjson ms':>11}{'bytes':>10}{'gzip bytes':>12}{'gzip ms':>10}")
+    for name, (model_type, value) in payloads.items():
+        adapter = TypeAdapter(model_type)
+
+        # Validation + dump to JSON-compatible data, as FastAPI's serialize_response does
+        model_ms = timed(lambda: adapter.dump_python(adapter.validate_python(value), mode="json"), args.repeat)
+        content = adapter.dump_python(value, mode="json")
+
+        json_ms = timed(lambda: JSONResponse(content), args.repeat)
+        orjson_ms = timed(lambda: ORJSONResponse(content), args.repeat)
+        body = ORJSONResponse(content).body
+        gzip_ms = timed(lambda: gzip.compress(body, compresslevel=args.compresslevel), args.repeat)
+        compressed = gzip.compress(body, compresslevel=args.compresslevel)
+
+        results[name] = {
+            "model_ms": model_ms,
+            "json_render_ms": json_ms,
+            "orjson_render_ms": orjson_ms,
+            "bytes": len(body),
+            "gzip_bytes": len(compressed),
+            "gzip_ms": gzip_ms
+        }
+        print(
+            f"{name:<18}{model_ms:>10.3f}{json_ms:>10.3f}{orjson_ms:>11.3f}"
+            f"{len(body):>10}{len(compressed):>12}{gzip_ms:>10.3f}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"repeat": args.repeat, "compresslevel": args.compresslevel, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -12,14 +12,34 @@ sys.path.insert(0, backend_dir)
 # Change to backend directory
 os.chdir(backend_dir)
 
+
+def start_worker(app):
+    """Run the app's startup once per worker process, on a long-lived event
+    loop thread (price alert refreshers keep running there), and wait for it
+    so the first request finds the database ready"""
+    import asyncio
+    import concurrent.futures
+    import threading
+    from app.main import STARTUP_BLOCKING_TIMEOUT, initialize, new_startup_state
+    
+    app.state.startup = new_startup_state()
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="startup-loop", daemon=True).start()
+    future = asyncio.run_coroutine_threadsafe(initialize(app), loop)
+    concurrent.futures.wait([future], timeout=STARTUP_BLOCKING_TIMEOUT)
+
+
 # Import ASGI-to-WSGI adapter - Use Mangum (better for Passenger)
 try:
     from mangum import Mangum
     from app.main import app
     
     # Mangum is better for Passenger/WSGI environments
-    # It properly handles ASGI to WSGI conversion
+    # It properly handles ASGI to WSGI conversion. Its lifespan would run the
+    # full startup and shutdown around every request, so it stays off and
+    # startup runs once per worker instead.
     handler = Mangum(app, lifespan="off")
+    start_worker(app)
     
     # WSGI application function
     def application(environ, start_response):
@@ -0,0 +1,30 @@
+"""Run the nightly batch forecast pipeline for every tracked symbol.
+
+Usage:
+    python run_forecast_pipeline.py                 # all watchlist/portfolio symbols
+    python run_forecast_pipeline.py AAPL MSFT       # specific symbols
+    python run_forecast_pipeline.py --workers 4
+"""
+import argparse
+import json
+import sys
+
+from app.services.forecast_pipeline import run_batch_forecasts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch forecast pipeline")
+    parser.add_argument("symbols", nargs="*", help="Symbols to forecast (default: all tracked symbols)")
+    parser.add_argument("--workers", type=int, default=None, help="Parallel fit processes")
+    args = parser.parse_args()
+
+    summary = run_batch_forecasts(
+        symbols=[s.upper() for s in args.symbols] or None,
+        workers=args.workers
+    )
+    print(json.dumps(summary, indent=2))
+    return 0 if summary["completed"] or not summary["symbols"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -20,10 +20,11 @@ export default function Dashboard() {
   const watchlistQuery = useWatchlist()
   const watchlist = watchlistQuery?.data || []
 
-  const { data: portfolio } = useQuery({
+  const { data: valuation } = useQuery({
     queryKey: ['portfolio'],
     queryFn: () => portfolioService.getPortfolio(),
   })
+  const portfolio = valuation?.positions
 
   const { data: indices, isLoading: indicesLoading } = useQuery({
     queryKey: ['indices'],
@@ -103,10 +104,10 @@ export default function Dashboard() {
     .slice(0, 5)
 
   // Calculate portfolio stats
-  const totalValue = portfolio?.reduce((sum, item) => sum + (item.current_value || 0), 0) || 0
-  const totalCost = portfolio?.reduce((sum, item) => sum + (item.total_cost || 0), 0) || 0
-  const totalPL = totalValue - totalCost
-  const totalPLPercent = totalCost > 0 ? (totalPL / totalCost) * 100 : 0
+  const totalValue = valuation?.totals.current_value || 0
+  const totalCost = valuation?.totals.total_cost || 0
+  const totalPL = valuation?.totals.profit_loss || 0
+  const totalPLPercent = valuation?.totals.profit_loss_percent || 0
   const isPLPositive = totalPL >= 0
 
   // Group indices by country
@@ -42,10 +42,11 @@ export default function Portfolio() {
   const toast = useToast()
   const { currency } = useCurrencyStore()
   
-  const { data: portfolio, isLoading } = useQuery({
+  const { data: valuation, isLoading } = useQuery({
     queryKey: ['portfolio'],
     queryFn: () => portfolioService.getPortfolio(),
   })
+  const portfolio = valuation?.positions
 
   const deleteMutation = useMutation({
     mutationFn: (itemId) => portfolioService.removeFromPortfolio(itemId),
@@ -73,10 +74,10 @@ export default function Portfolio() {
   })
 
   // Calculate totals with currency conversion
-  const totalCost = portfolio?.reduce((sum, item) => sum + (item.total_cost || 0), 0) || 0
-  const totalValue = portfolio?.reduce((sum, item) => sum + (item.current_value || 0), 0) || 0
-  const totalPL = totalValue - totalCost
-  const totalPLPercent = totalCost > 0 ? (totalPL / totalCost) * 100 : 0
+  const totalCost = valuation?.totals.total_cost || 0
+  const totalValue = valuation?.totals.current_value || 0
+  const totalPL = valuation?.totals.profit_loss || 0
+  const totalPLPercent = valuation?.totals.profit_loss_percent || 0
   
   // Convert totals to selected currency
   const convertedTotalCost = useCurrencyConversion(totalCost)
@@ -2,7 +2,21 @@ import api from './api'
 
 export const portfolioService = {
   async getPortfolio() {
-    const response = await api.get('/portfolio')
+    const response = await api.get('/portfolio/valuation')
+    return response.data
+  },
+
+  async getPortfolioHistory(period = '1y') {
+    const response = await api.get('/portfolio/history', {
+      params: { period },
+    })
+    return response.data
+  },
+
+  async getPortfolioRisk(benchmark = '^GSPC', period = '1y') {
+    const response = await api.get('/portfolio/risk', {
+      params: { benchmark, period },
+    })
     return response.data
   },
 